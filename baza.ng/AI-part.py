@@ -20,12 +20,39 @@ Usage:
 Optional:
   export AUTH_TOKEN=<jwt>
   export REQUIRE_ALL_TOOLS=true   # fail if any tool was not called
+
+Concurrent benchmark:
+  python AI-part.py --sessions 50                         # 50 conversations, one token
+  python AI-part.py --sessions 50 --phone-base +2348000000000   # one user each
+  python AI-part.py --sessions 50 --token-pool .token_pool.json  # one pre-minted user each
+
+  Reports chat-turn latency split into LLM and tool time, and p50/p95/p99
+  per tool for all EXPECTED_TOOLS. Tool time is read from durationMs on each
+  message.metadata.toolCalls entry when the backend reports it; the
+  "turn p95" column (latency of turns that used the tool) works either way.
+
+Streaming (time to first token):
+  python AI-part.py --stream                    # one conversation
+  python AI-part.py --stream --sessions 50      # 50 at once
+
+  Sends {"stream": true} with Accept: text/event-stream and reads the
+  server-sent events (tool_call, tool_result, token, done). Reports time to
+  first token next to full-turn time, decode rate in tokens/s, and when each
+  tool call was emitted relative to the start of the turn. A backend that
+  answers with plain JSON is still measured (TTFT = full turn) and flagged.
 """
 
+import argparse
+import json
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
+from baza_client import BazaClient
+from http_timing import server_time_ms
+from loadstats import LatencyRecorder, percentile
+from token_pool import TokenPool
 
 
 BASE = os.getenv("BASE_URL", "https://baza-chi.vercel.app").rstrip("/")
@@ -33,6 +60,10 @@ TEST_PHONE = os.getenv("TEST_PHONE", "+917204218098")
 AUTH_TOKEN = os.getenv("AUTH_TOKEN", "").strip()
 TEST_OTP = os.getenv("TEST_OTP", "").strip()
 REQUIRE_ALL_TOOLS = os.getenv("REQUIRE_ALL_TOOLS", "false").strip().lower() == "true"
+token_pool = None  # set by --token-pool
+
+# Login and the single-session checks; load modes build their own clients.
+client = BazaClient(BASE, timeout=45)
 
 EXPECTED_TOOLS = {
     "search_products",
@@ -80,38 +111,21 @@ def step(name, fn):
 
 
 def _req(method: str, path: str, token: str, **kwargs):
-    headers = kwargs.pop("headers", {})
-    headers.update(
-        {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-        }
-    )
-    return requests.request(method, f"{BASE}{path}", headers=headers, timeout=45, **kwargs)
+    return client.request(method, path, token=token, **kwargs)
 
 
 def get_token() -> str:
     if AUTH_TOKEN:
         return AUTH_TOKEN
 
-    r = requests.post(
-        f"{BASE}/v1/auth/otp-request",
-        headers={"Content-Type": "application/json"},
-        json={"phone": TEST_PHONE},
-        timeout=30,
-    )
+    r = client.request_otp(TEST_PHONE)
     assert r.status_code == 200, f"otp-request failed: {r.status_code} {r.text}"
 
     otp_candidates = [TEST_OTP] if TEST_OTP else ["111111", "1111"]
     last_response = None
 
     for code in otp_candidates:
-        r2 = requests.post(
-            f"{BASE}/v1/auth/otp-verify",
-            headers={"Content-Type": "application/json"},
-            json={"phone": TEST_PHONE, "otp": code},
-            timeout=30,
-        )
+        r2 = client.verify_otp(TEST_PHONE, code)
         last_response = r2
         if r2.status_code == 200:
             body = r2.json()
@@ -128,7 +142,7 @@ def get_token() -> str:
 
 
 def test_suggestions(token: str):
-    r = _req("GET", "/v1/ai/suggestions", token)
+    r = _req("GET", "/ai/suggestions", token)
     assert r.status_code == 200, f"expected 200 got {r.status_code}: {r.text}"
     body = r.json()
     assert isinstance(body.get("suggestions"), list), f"invalid suggestions response: {body}"
@@ -136,7 +150,7 @@ def test_suggestions(token: str):
 
 
 def test_sessions_list(token: str):
-    r = _req("GET", "/v1/ai/sessions", token)
+    r = _req("GET", "/ai/sessions", token)
     assert r.status_code == 200, f"expected 200 got {r.status_code}: {r.text}"
     body = r.json()
     assert isinstance(body.get("sessions"), list), f"invalid sessions response: {body}"
@@ -145,7 +159,7 @@ def test_sessions_list(token: str):
 
 def test_session_create(token: str):
     global session_id
-    r = _req("POST", "/v1/ai/sessions", token, json={"title": "Full Tool Coverage Chat"})
+    r = _req("POST", "/ai/sessions", token, json={"title": "Full Tool Coverage Chat"})
     assert r.status_code == 201, f"expected 201 got {r.status_code}: {r.text}"
     body = r.json()
     session_id = body.get("session", {}).get("id")
@@ -159,7 +173,7 @@ def send_chat(token: str, prompt: str):
 
     r = _req(
         "POST",
-        "/v1/ai/chat",
+        "/ai/chat",
         token,
         json={"sessionId": session_id, "message": prompt},
     )
@@ -295,7 +309,7 @@ def test_full_conversation(token: str):
 
 def test_history(token: str):
     assert session_id, "session_id missing"
-    r = _req("GET", f"/v1/ai/history?sessionId={session_id}", token)
+    r = _req("GET", f"/ai/history?sessionId={session_id}", token)
     assert r.status_code == 200, f"expected 200 got {r.status_code}: {r.text}"
     body = r.json()
     messages = body.get("messages")
@@ -316,7 +330,253 @@ def test_tool_coverage_report():
         assert not missing, "Missing required tools: " + ", ".join(missing)
 
 
+# ── Concurrent session benchmark ────────────────────────────────────────────
+
+LOAD_PROMPTS = [
+    "Hi, please check my profile details and show my wallet balance.",
+    "What product categories do you have?",
+    "Search products for rice and show options.",
+    "Show me available bundles.",
+    "Show me meal packs available now.",
+    "Show ready to eat meals.",
+    "Show snacks in stock.",
+    "List my saved addresses.",
+    "Show my recent orders.",
+    "Track order status for my latest order.",
+    "Show details for the first snack item you listed.",
+    "Clear my cart first.",
+    "Use add_to_cart now: product_id=puff, product_type=snack, qty=2.",
+    "Show my current cart now.",
+    "Use remove_from_cart tool now for product_id=puff and product_type=snack.",
+    "Use add_to_cart now: product_id=puff, product_type=snack, qty=1.",
+    "Use checkout_cart tool now with note='load test checkout'. Confirmed.",
+    "Now call create_order immediately with this exact payload: "
+    "items=[{name:'Puff Puff', emoji:'🍩', qty:1, itemType:'SNACK', unitPrice:20000, totalPrice:20000}], "
+    "total=20000, note='AI load test order'. I confirm and approve this order.",
+]
+
+
+def tool_duration_ms(call):
+    """Per-tool time reported by the backend, if it reports one."""
+    for key in ("durationMs", "duration_ms", "latencyMs", "elapsedMs"):
+        value = call.get(key)
+        if isinstance(value, (int, float)):
+            return float(value)
+    return None
+
+
+def stream_chat(conv_client, token, sid, prompt):
+    """One streamed chat turn; returns status, timings (s from request start) and the final body."""
+    result = {"status": 0, "streamed": False, "ttft": None, "total": 0.0, "tokens": 0,
+              "last_token": None, "tool_calls": [], "body": None}
+    start = time.perf_counter()
+    r = conv_client.request(
+        "POST", "/ai/chat", token=token,
+        json={"sessionId": sid, "message": prompt, "stream": True},
+        headers={"Accept": "text/event-stream"},
+        stream=True,
+    )
+    result["status"] = r.status_code
+    try:
+        is_stream = "text/event-stream" in r.headers.get("Content-Type", "")
+        if r.status_code == 200 and not is_stream:
+            # Backend ignored the stream flag: the whole reply is the "first token".
+            result["body"] = r.json()
+            result["ttft"] = time.perf_counter() - start
+        elif r.status_code == 200:
+            result["streamed"] = True
+            event = None
+            for line in r.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                    continue
+                if not line.startswith("data:"):
+                    continue
+                now = time.perf_counter() - start
+                data = json.loads(line[5:].strip() or "null")
+                if event == "token":
+                    result["ttft"] = result["ttft"] if result["ttft"] is not None else now
+                    result["last_token"] = now
+                    result["tokens"] += 1
+                elif event == "tool_call":
+                    result["tool_calls"].append(((data or {}).get("name") or "?", now))
+                elif event == "done":
+                    result["body"] = data
+                elif event == "error":
+                    result["status"] = (data or {}).get("status", 500)
+    finally:
+        r.close()
+    result["total"] = time.perf_counter() - start
+    return result
+
+
+def run_stream_conversation(conv_client, token, turns, emitted, rates, unstreamed):
+    r = conv_client.request("POST", "/ai/sessions", token=token, json={"title": "Streaming load test chat"})
+    assert r.status_code == 201, f"session create failed ({r.status_code}): {r.text[:200]}"
+    sid = r.json()["session"]["id"]
+
+    for prompt in LOAD_PROMPTS:
+        res = stream_chat(conv_client, token, sid, prompt)
+        ok = res["status"] == 200 and res["body"] is not None
+        turns.record("turn (full reply)", res["total"], ok=ok)
+        if not ok:
+            continue
+        turns.record("time to first token", res["ttft"] if res["ttft"] is not None else res["total"])
+        if not res["streamed"]:
+            unstreamed.append(prompt)
+            continue
+        if res["tokens"] > 1 and res["last_token"] > res["ttft"]:
+            rates.append((res["tokens"] - 1) / (res["last_token"] - res["ttft"]))
+        for name, offset in res["tool_calls"]:
+            emitted.record(name, offset)
+
+
+def run_conversation(conv_client, token, turns, tools, turns_by_tool):
+    r = conv_client.request("POST", "/ai/sessions", token=token, json={"title": "Load test chat"})
+    assert r.status_code == 201, f"session create failed ({r.status_code}): {r.text[:200]}"
+    sid = r.json()["session"]["id"]
+
+    for prompt in LOAD_PROMPTS:
+        r = conv_client.request("POST", "/ai/chat", token=token, json={"sessionId": sid, "message": prompt})
+        total_s = r.timing.total_ms / 1000
+        if r.status_code != 200:
+            turns.record("turn", total_s, ok=False)
+            continue
+
+        metadata = (r.json().get("message") or {}).get("metadata") or {}
+        calls = metadata.get("toolCalls") or []
+        durations = [tool_duration_ms(call) for call in calls]
+        tool_ms = sum(d for d in durations if d is not None)
+        server_ms = server_time_ms(r)
+
+        turns.record("turn", total_s)
+        turns.record("server", server_ms / 1000)
+        # Every turn counts towards LLM time (tool time 0 without tool calls); skip only unknown tool durations.
+        if all(d is not None for d in durations):
+            turns.record("llm (server - tools)", max(server_ms - tool_ms, 0.0) / 1000)
+        if calls and all(d is not None for d in durations):
+            turns.record("tools", tool_ms / 1000)
+        for call, duration in zip(calls, durations):
+            name = call.get("name") or "?"
+            turns_by_tool.record(name, total_s)
+            if duration is not None:
+                tools.record(name, duration / 1000)
+
+
+def conversation_client(index, phone_base):
+    """Client for conversation ``index``: drawn from --token-pool, else a fresh OTP login."""
+    if token_pool is not None:
+        return token_pool.client(index, timeout=120)
+    client = BazaClient(BASE, timeout=120)
+    client.login(f"+{int(phone_base.lstrip('+')) + index}", TEST_OTP or "1111")
+    return client
+
+
+def run_load(sessions, phone_base):
+    """Run ``sessions`` AI conversations at once and break turn latency down by tool."""
+    print(f"\n🤖 AI Chat Concurrent Benchmark\n   Base: {BASE}\n   Sessions: {sessions}\n")
+
+    turns, tools, turns_by_tool = LatencyRecorder(), LatencyRecorder(), LatencyRecorder()
+    shared = BazaClient(BASE, timeout=120, pool_maxsize=sessions) if not (phone_base or token_pool) else None
+    token = get_token() if shared else None
+
+    def worker(index):
+        # One user per conversation keeps per-user throttles out of the numbers.
+        conv_client = shared or conversation_client(index, phone_base)
+        try:
+            run_conversation(conv_client, token, turns, tools, turns_by_tool)
+            return None
+        except Exception as err:
+            return f"{type(err).__name__}: {err}"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        errors = [e for e in pool.map(worker, range(sessions)) if e]
+    wall = time.perf_counter() - start
+
+    turns.print_report(wall, title="Chat turn latency (LLM vs tool split)")
+
+    by_tool = tools.summary()
+    by_turn = turns_by_tool.summary()
+    names = EXPECTED_TOOLS | set(by_turn)
+    print(f"\n{'='*60}")
+    print("  Per-tool latency (tool ms from metadata.toolCalls; turn ms = turns using the tool)")
+    print(f"{'='*60}")
+    print(f"  {'tool':<24}  {'calls':>5}  {'tool p50':>8}  {'tool p95':>8}  {'tool p99':>8}  {'turn p95':>8}")
+    for name in sorted(names, key=lambda n: -by_tool.get(n, {}).get("p95", 0)):
+        t = by_tool.get(name)
+        u = by_turn.get(name)
+        calls = u["count"] if u else 0
+        cols = f"{t['p50']:>8.1f}  {t['p95']:>8.1f}  {t['p99']:>8.1f}" if t else f"{'n/a':>8}  {'n/a':>8}  {'n/a':>8}"
+        print(f"  {name:<24}  {calls:>5}  {cols}  {(u['p95'] if u else 0):>8.1f}")
+
+    if errors:
+        print(f"\n  ✗ {len(errors)}/{sessions} conversations failed. First errors:")
+        for msg in sorted(set(errors))[:5]:
+            print(f"    - {msg[:200]}")
+    return not errors
+
+
+def run_stream_load(sessions, phone_base):
+    """Like run_load, but streams every turn and reports time to first token."""
+    print(f"\n🤖 AI Chat Streaming Benchmark\n   Base: {BASE}\n   Sessions: {sessions}\n")
+
+    turns, emitted = LatencyRecorder(), LatencyRecorder()
+    rates, unstreamed = [], []
+    shared = BazaClient(BASE, timeout=120, pool_maxsize=sessions) if not (phone_base or token_pool) else None
+    token = get_token() if shared else None
+
+    def worker(index):
+        conv_client = shared or conversation_client(index, phone_base)
+        try:
+            run_stream_conversation(conv_client, token, turns, emitted, rates, unstreamed)
+            return None
+        except Exception as err:
+            return f"{type(err).__name__}: {err}"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        errors = [e for e in pool.map(worker, range(sessions)) if e]
+    wall = time.perf_counter() - start
+
+    turns.print_report(wall, title="Streaming chat: time to first token vs full reply")
+    rates.sort()
+    if rates:
+        print(f"  Decode rate: p50 {percentile(rates, 50):.1f} tokens/s  p5 {percentile(rates, 5):.1f} tokens/s")
+    if unstreamed:
+        print(f"  ⚠ {len(unstreamed)} turns came back as plain JSON — the backend did not stream them")
+
+    if emitted.summary():
+        emitted.print_report(wall, title="Tool call emitted (ms after the turn started)")
+
+    if errors:
+        print(f"\n  ✗ {len(errors)}/{sessions} conversations failed. First errors:")
+        for msg in sorted(set(errors))[:5]:
+            print(f"    - {msg[:200]}")
+    return not errors
+
+
 def main():
+    parser = argparse.ArgumentParser(description="AI chat conversation + tool coverage test")
+    parser.add_argument("--sessions", type=int, default=0,
+                        help="run N concurrent /v1/ai/sessions conversations and report per-tool latency")
+    parser.add_argument("--phone-base", default="",
+                        help="log in one user per conversation from this phone upward (needs TEST_OTP)")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream chat replies (SSE) and report time to first token")
+    parser.add_argument("--token-pool", metavar="PATH",
+                        help="draw one pre-minted user per conversation from PATH (see token_pool.py)")
+    args = parser.parse_args()
+
+    if args.token_pool:
+        global token_pool
+        token_pool = TokenPool.load(args.token_pool, BASE).start()
+
+    if args.stream:
+        sys.exit(0 if run_stream_load(args.sessions or 1, args.phone_base) else 1)
+    if args.sessions:
+        sys.exit(0 if run_load(args.sessions, args.phone_base) else 1)
+
     print(f"\n🤖 AI Chat Full Conversation Test\n   Base: {BASE}\n")
 
     token = get_token()
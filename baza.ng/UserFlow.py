@@ -15,6 +15,42 @@ Usage:
     # With a specific phone number:
     PHONE=+2348012345678 python UserFlow.py
 
+    # Load mode: 2500 concurrent virtual users, each with its own session,
+    # token and phone (+2348000000000, +2348000000001, ...). Needs a backend
+    # that accepts a fixed test OTP.
+    OTP=1111 python UserFlow.py --users 2500 --ramp 30
+
+    # Open-loop load: journeys start at a fixed arrival rate (ramping from
+    # --start-rate over --ramp seconds) whatever the response times, and
+    # journey latency is taken from the scheduled start, so a stalled server
+    # shows up in p99 instead of just slowing the client down.
+    OTP=1111 python UserFlow.py --rate 20 --start-rate 2 --ramp 30 --duration 120
+
+    # Catalog hydration: sequential vs parallel per-tab fetches vs /products/catalog
+    OTP=1111 python UserFlow.py --bench-catalog 50
+
+    # Export per-request timings (dns/connect/tls/ttfb/total, bytes)
+    python UserFlow.py --timings-out run.jsonl     # or run.csv
+
+    # Wallet-debit race: 300 simultaneous wallet orders against one wallet,
+    # then a ledger audit (no negative balance, one DEBIT_ORDER per confirmed
+    # order, rejections == shortfall). --fund tops the wallet up first through
+    # a signed charge.success webhook (needs PAYSTACK_SECRET_KEY).
+    OTP=1111 python UserFlow.py --wallet-race 300 --fund 15000000 --order-amount 100000
+
+    # Auth storm ("everyone opens the app at 7pm"): 1000 sessions refresh at
+    # once, 3 times, 10% of them firing two refreshes with the same cookie;
+    # then 60s of login → refresh → logout churn. Reports refresh latency,
+    # REFRESH_TOKEN_INVALID rates, lost sessions and session writes/s.
+    OTP=1111 python UserFlow.py --refresh-storm 1000 --waves 3 --churn 60
+
+    # Order → notification latency: holds /ws/notifications/ open while it
+    # places orders, pays them and tops up through signed charge.success
+    # webhooks (needs PAYSTACK_SECRET_KEY) and messages support. Reports the
+    # time from each HTTP response to the matching notification event and
+    # flags the ones that never came.
+    OTP=1111 python UserFlow.py --notify-probe 20 --notify-timeout 10
+
 Flow tested:
     1. OTP Request  → POST /v1/auth/otp-request
     2. OTP Verify   → POST /v1/auth/otp-verify  (requires manual OTP input)
@@ -39,65 +75,85 @@ Flow tested:
     21. Delete Address → DELETE /v1/user/addresses/<id>/delete
 """
 
+import argparse
 import json
 import os
+import random
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
+from baza_client import BazaClient
+from http_timing import TimingLog, server_time_ms
+from loadstats import HdrRecorder, LatencyRecorder, OpenLoop, percentile
+from paystack_webhooks import card_topup_event, post_event
+
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
 BASE_URL = os.getenv("BASE_URL", "https://baza-chi.vercel.app").rstrip("/")
 PHONE = os.getenv("PHONE", "+917204218098")
-API = f"{BASE_URL}/v1"
+OTP = os.getenv("OTP", "").strip()
+
+
+class StepFailed(Exception):
+    """Raised by a step when the API response means the journey cannot go on."""
 
-# Session keeps cookies (for baza_refresh)
-session = requests.Session()
-ACCESS_TOKEN = None
+
+class VirtualUser(BazaClient):
+    """One shopper: its own pooled client (keeps the baza_refresh cookie) and access token."""
+
+    def __init__(self, phone, otp=None, verbose=True, timing_log=None, **client_kwargs):
+        super().__init__(BASE_URL, timing_log=timing_log, **client_kwargs)
+        self.phone = phone
+        self.otp = otp
+        self.verbose = verbose
 
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
-def headers():
-    h = {"Content-Type": "application/json"}
-    if ACCESS_TOKEN:
-        h["Authorization"] = f"Bearer {ACCESS_TOKEN}"
-    return h
-
-
-def log_step(step_num, name):
+def log_step(user, step_num, name):
+    if not user.verbose:
+        return
     print(f"\n{'='*60}")
     print(f"  Step {step_num}: {name}")
     print(f"{'='*60}")
 
 
-def log_result(resp, label="Response"):
+def log_result(user, resp, label="Response"):
     status = resp.status_code
     try:
         body = resp.json()
     except Exception:
         body = resp.text[:500]
-    icon = "✅" if 200 <= status < 300 else "❌"
-    print(f"  {icon} {label}: {status}")
-    print(f"  Body: {json.dumps(body, indent=2, default=str)[:800]}")
+    if user.verbose:
+        icon = "✅" if 200 <= status < 300 else "❌"
+        print(f"  {icon} {label}: {status}")
+        print(f"  ⏱  {resp.timing.describe()}")
+        print(f"  Body: {json.dumps(body, indent=2, default=str)[:800]}")
     return body
 
 
 def fail(msg):
-    print(f"\n❌ FAILED: {msg}")
-    sys.exit(1)
+    raise StepFailed(msg)
+
+
+def say(user, msg):
+    if user.verbose:
+        print(msg)
 
 
 # ---------------------------------------------------------------------------
 # Step 1: OTP Request
 # ---------------------------------------------------------------------------
-def step_otp_request():
-    log_step(1, f"OTP Request → {PHONE}")
-    resp = session.post(f"{API}/auth/otp-request", json={"phone": PHONE}, headers=headers())
-    body = log_result(resp)
+def step_otp_request(user):
+    log_step(user, 1, f"OTP Request → {user.phone}")
+    resp = user.post("/auth/otp-request", json={"phone": user.phone})
+    body = log_result(user, resp)
     if resp.status_code != 200:
         fail(f"OTP request failed: {body}")
     return body
@@ -106,38 +162,36 @@ def step_otp_request():
 # ---------------------------------------------------------------------------
 # Step 2: OTP Verify (requires manual input)
 # ---------------------------------------------------------------------------
-def step_otp_verify():
-    log_step(2, "OTP Verify (enter OTP from SMS)")
-    otp = input("  ➡️  Enter the OTP you received: ").strip()
+def step_otp_verify(user):
+    log_step(user, 2, "OTP Verify (enter OTP from SMS)")
+    otp = user.otp or input("  ➡️  Enter the OTP you received: ").strip()
     if not otp:
         fail("No OTP entered")
 
-    resp = session.post(
-        f"{API}/auth/otp-verify",
-        json={"phone": PHONE, "otp": otp, "name": "Test User"},
-        headers=headers(),
+    resp = user.post(
+        "/auth/otp-verify",
+        json={"phone": user.phone, "otp": otp, "name": "Test User"},
     )
-    body = log_result(resp)
+    body = log_result(user, resp)
     if resp.status_code != 200:
         fail(f"OTP verify failed: {body}")
 
-    global ACCESS_TOKEN
-    ACCESS_TOKEN = body.get("accessToken")
-    if not ACCESS_TOKEN:
+    user.access_token = body.get("accessToken")
+    if not user.access_token:
         fail("No accessToken in response")
 
-    print(f"  🔑 Access token received (first 20 chars): {ACCESS_TOKEN[:20]}...")
-    print(f"  👤 User: {body.get('user', {}).get('name')} ({body.get('user', {}).get('phone')})")
+    say(user, f"  🔑 Access token received (first 20 chars): {user.access_token[:20]}...")
+    say(user, f"  👤 User: {body.get('user', {}).get('name')} ({body.get('user', {}).get('phone')})")
     return body
 
 
 # ---------------------------------------------------------------------------
 # Step 3: Get Profile
 # ---------------------------------------------------------------------------
-def step_get_profile():
-    log_step(3, "GET /user/me")
-    resp = session.get(f"{API}/user/me", headers=headers())
-    body = log_result(resp)
+def step_get_profile(user):
+    log_step(user, 3, "GET /user/me")
+    resp = user.get("/user/me")
+    body = log_result(user, resp)
     if resp.status_code != 200:
         fail(f"Get profile failed: {body}")
     return body
@@ -146,14 +200,13 @@ def step_get_profile():
 # ---------------------------------------------------------------------------
 # Step 4: Update Profile
 # ---------------------------------------------------------------------------
-def step_update_profile():
-    log_step(4, "PUT /user/profile")
-    resp = session.put(
-        f"{API}/user/profile",
+def step_update_profile(user):
+    log_step(user, 4, "PUT /user/profile")
+    resp = user.put(
+        "/user/profile",
         json={"name": "Baza Tester", "email": "tester@baza.ng"},
-        headers=headers(),
     )
-    body = log_result(resp)
+    body = log_result(user, resp)
     if resp.status_code != 200:
         fail(f"Update profile failed: {body}")
     return body
@@ -162,14 +215,13 @@ def step_update_profile():
 # ---------------------------------------------------------------------------
 # Step 5: Update Notifications
 # ---------------------------------------------------------------------------
-def step_update_notifications():
-    log_step(5, "PUT /user/notifications")
-    resp = session.put(
-        f"{API}/user/notifications",
+def step_update_notifications(user):
+    log_step(user, 5, "PUT /user/notifications")
+    resp = user.put(
+        "/user/notifications",
         json={"orders": True, "delivery": True, "deals": False, "reminders": True, "newsletter": False},
-        headers=headers(),
     )
-    body = log_result(resp)
+    body = log_result(user, resp)
     if resp.status_code != 200:
         fail(f"Update notifications failed: {body}")
     return body
@@ -178,18 +230,17 @@ def step_update_notifications():
 # ---------------------------------------------------------------------------
 # Step 6: Create Address
 # ---------------------------------------------------------------------------
-def step_create_address():
-    log_step(6, "POST /user/addresses/create")
-    resp = session.post(
-        f"{API}/user/addresses/create",
+def step_create_address(user):
+    log_step(user, 6, "POST /user/addresses/create")
+    resp = user.post(
+        "/user/addresses/create",
         json={
             "label": "Home",
             "address": "14 Akin Adesola Street, Victoria Island, Lagos",
             "landmark": "Near Access Bank",
         },
-        headers=headers(),
     )
-    body = log_result(resp)
+    body = log_result(user, resp)
     if resp.status_code not in (200, 201):
         fail(f"Create address failed: {body}")
     return body
@@ -198,10 +249,10 @@ def step_create_address():
 # ---------------------------------------------------------------------------
 # Step 7: List Addresses
 # ---------------------------------------------------------------------------
-def step_list_addresses():
-    log_step(7, "GET /user/addresses/")
-    resp = session.get(f"{API}/user/addresses/", headers=headers())
-    body = log_result(resp)
+def step_list_addresses(user):
+    log_step(user, 7, "GET /user/addresses/")
+    resp = user.get("/user/addresses/")
+    body = log_result(user, resp)
     if resp.status_code != 200:
         fail(f"List addresses failed: {body}")
     return body
@@ -210,14 +261,13 @@ def step_list_addresses():
 # ---------------------------------------------------------------------------
 # Step 8: Update Address
 # ---------------------------------------------------------------------------
-def step_update_address(address_id):
-    log_step(8, f"PUT /user/addresses/{address_id}")
-    resp = session.put(
-        f"{API}/user/addresses/{address_id}",
+def step_update_address(user, address_id):
+    log_step(user, 8, f"PUT /user/addresses/{address_id}")
+    resp = user.put(
+        f"/user/addresses/{address_id}",
         json={"label": "Home (Updated)", "landmark": "Opposite GTBank"},
-        headers=headers(),
     )
-    body = log_result(resp)
+    body = log_result(user, resp)
     if resp.status_code != 200:
         fail(f"Update address failed: {body}")
     return body
@@ -226,13 +276,12 @@ def step_update_address(address_id):
 # ---------------------------------------------------------------------------
 # Step 9: Set Default Address
 # ---------------------------------------------------------------------------
-def step_set_default(address_id):
-    log_step(9, f"PATCH /user/addresses/{address_id}/default")
-    resp = session.patch(
-        f"{API}/user/addresses/{address_id}/default",
-        headers=headers(),
+def step_set_default(user, address_id):
+    log_step(user, 9, f"PATCH /user/addresses/{address_id}/default")
+    resp = user.patch(
+        f"/user/addresses/{address_id}/default",
     )
-    body = log_result(resp)
+    body = log_result(user, resp)
     if resp.status_code != 200:
         fail(f"Set default address failed: {body}")
     return body
@@ -241,8 +290,8 @@ def step_set_default(address_id):
 # ---------------------------------------------------------------------------
 # Step 10: Browse Products (all categories)
 # ---------------------------------------------------------------------------
-def step_browse_products():
-    log_step(10, "Browse Products (all endpoints)")
+def step_browse_products(user):
+    log_step(user, 10, "Browse Products (all endpoints)")
 
     endpoints = [
         ("bundles", "/products/bundles"),
@@ -255,11 +304,11 @@ def step_browse_products():
 
     results = {}
     for name, path in endpoints:
-        resp = session.get(f"{API}{path}", headers=headers())
-        body = log_result(resp, label=name)
+        resp = user.get(path)
+        body = log_result(user, resp, label=name)
         results[name] = body
         if resp.status_code != 200:
-            print(f"  ⚠️  {name} returned {resp.status_code}")
+            say(user, f"  ⚠️  {name} returned {resp.status_code}")
 
     return results
 
@@ -267,10 +316,10 @@ def step_browse_products():
 # ---------------------------------------------------------------------------
 # Step 11: Get Wallet Balance
 # ---------------------------------------------------------------------------
-def step_wallet_balance():
-    log_step(11, "GET /wallet/balance")
-    resp = session.get(f"{API}/wallet/balance", headers=headers())
-    body = log_result(resp)
+def step_wallet_balance(user):
+    log_step(user, 11, "GET /wallet/balance")
+    resp = user.get("/wallet/balance")
+    body = log_result(user, resp)
     if resp.status_code != 200:
         fail(f"Wallet balance failed: {body}")
     return body
@@ -279,10 +328,10 @@ def step_wallet_balance():
 # ---------------------------------------------------------------------------
 # Step 12: Get Wallet Transactions
 # ---------------------------------------------------------------------------
-def step_wallet_transactions():
-    log_step(12, "GET /wallet/transactions")
-    resp = session.get(f"{API}/wallet/transactions", headers=headers())
-    body = log_result(resp)
+def step_wallet_transactions(user):
+    log_step(user, 12, "GET /wallet/transactions")
+    resp = user.get("/wallet/transactions")
+    body = log_result(user, resp)
     if resp.status_code != 200:
         fail(f"Wallet transactions failed: {body}")
     return body
@@ -291,8 +340,8 @@ def step_wallet_transactions():
 # ---------------------------------------------------------------------------
 # Step 13: Create Order
 # ---------------------------------------------------------------------------
-def step_create_order(address_id=None):
-    log_step(13, "POST /orders/create")
+def step_create_order(user, address_id=None):
+    log_step(user, 13, "POST /orders/create")
 
     order_data = {
         "items": [
@@ -312,12 +361,12 @@ def step_create_order(address_id=None):
     if address_id:
         order_data["addressId"] = address_id
 
-    resp = session.post(f"{API}/orders/create", json=order_data, headers=headers())
-    body = log_result(resp)
+    resp = user.post("/orders/create", json=order_data)
+    body = log_result(user, resp)
 
     # Order may fail with INSUFFICIENT_BALANCE — that's expected if wallet is 0
     if resp.status_code == 400 and body.get("code") == "INSUFFICIENT_BALANCE":
-        print("  ℹ️  Wallet balance is 0 — order declined as expected (INSUFFICIENT_BALANCE)")
+        say(user, "  ℹ️  Wallet balance is 0 — order declined as expected (INSUFFICIENT_BALANCE)")
         return body
 
     if resp.status_code not in (200, 201):
@@ -328,10 +377,10 @@ def step_create_order(address_id=None):
 # ---------------------------------------------------------------------------
 # Step 14: List Orders
 # ---------------------------------------------------------------------------
-def step_list_orders():
-    log_step(14, "GET /orders/")
-    resp = session.get(f"{API}/orders/", headers=headers())
-    body = log_result(resp)
+def step_list_orders(user):
+    log_step(user, 14, "GET /orders/")
+    resp = user.get("/orders/")
+    body = log_result(user, resp)
     if resp.status_code != 200:
         fail(f"List orders failed: {body}")
     return body
@@ -340,22 +389,22 @@ def step_list_orders():
 # ---------------------------------------------------------------------------
 # Step 15: Get Order Detail
 # ---------------------------------------------------------------------------
-def step_get_order(order_id):
-    log_step(15, f"GET /orders/{order_id}")
-    resp = session.get(f"{API}/orders/{order_id}", headers=headers())
-    body = log_result(resp)
+def step_get_order(user, order_id):
+    log_step(user, 15, f"GET /orders/{order_id}")
+    resp = user.get(f"/orders/{order_id}")
+    body = log_result(user, resp)
     if resp.status_code != 200:
-        print(f"  ⚠️  Order detail returned {resp.status_code}")
+        say(user, f"  ⚠️  Order detail returned {resp.status_code}")
     return body
 
 
 # ---------------------------------------------------------------------------
 # Step 16: Referral Stats
 # ---------------------------------------------------------------------------
-def step_referral_stats():
-    log_step(16, "GET /referral/stats")
-    resp = session.get(f"{API}/referral/stats", headers=headers())
-    body = log_result(resp)
+def step_referral_stats(user):
+    log_step(user, 16, "GET /referral/stats")
+    resp = user.get("/referral/stats")
+    body = log_result(user, resp)
     if resp.status_code != 200:
         fail(f"Referral stats failed: {body}")
     return body
@@ -364,10 +413,10 @@ def step_referral_stats():
 # ---------------------------------------------------------------------------
 # Step 17: Support Thread
 # ---------------------------------------------------------------------------
-def step_support_thread():
-    log_step(17, "GET /support/thread")
-    resp = session.get(f"{API}/support/thread", headers=headers())
-    body = log_result(resp)
+def step_support_thread(user):
+    log_step(user, 17, "GET /support/thread")
+    resp = user.get("/support/thread")
+    body = log_result(user, resp)
     if resp.status_code != 200:
         fail(f"Support thread failed: {body}")
     return body
@@ -376,14 +425,13 @@ def step_support_thread():
 # ---------------------------------------------------------------------------
 # Step 18: Send Support Message
 # ---------------------------------------------------------------------------
-def step_support_message():
-    log_step(18, "POST /support/message")
-    resp = session.post(
-        f"{API}/support/message",
+def step_support_message(user):
+    log_step(user, 18, "POST /support/message")
+    resp = user.post(
+        "/support/message",
         json={"text": "Hello, I have a question about my order delivery time."},
-        headers=headers(),
     )
-    body = log_result(resp)
+    body = log_result(user, resp)
     if resp.status_code != 200:
         fail(f"Support message failed: {body}")
     return body
@@ -392,104 +440,914 @@ def step_support_message():
 # ---------------------------------------------------------------------------
 # Step 19: Refresh Token
 # ---------------------------------------------------------------------------
-def step_refresh():
-    log_step(19, "POST /auth/refresh")
-    resp = session.post(f"{API}/auth/refresh", headers=headers())
-    body = log_result(resp)
+def step_refresh(user):
+    log_step(user, 19, "POST /auth/refresh")
+    resp = user.post("/auth/refresh")
+    body = log_result(user, resp)
     if resp.status_code == 200:
-        global ACCESS_TOKEN
-        ACCESS_TOKEN = body.get("accessToken", ACCESS_TOKEN)
-        print(f"  🔑 New access token received")
+        user.access_token = body.get("accessToken", user.access_token)
+        say(user, "  🔑 New access token received")
     else:
-        print(f"  ⚠️  Refresh failed (may be expected if no cookie): {body}")
+        say(user, f"  ⚠️  Refresh failed (may be expected if no cookie): {body}")
     return body
 
 
 # ---------------------------------------------------------------------------
 # Step 20: Logout
 # ---------------------------------------------------------------------------
-def step_logout():
-    log_step(20, "POST /auth/logout")
-    resp = session.post(f"{API}/auth/logout", headers=headers())
-    body = log_result(resp)
+def step_logout(user):
+    log_step(user, 20, "POST /auth/logout")
+    resp = user.post("/auth/logout")
+    body = log_result(user, resp)
     if resp.status_code != 200:
-        print(f"  ⚠️  Logout returned {resp.status_code}")
+        say(user, f"  ⚠️  Logout returned {resp.status_code}")
     return body
 
 
 # ---------------------------------------------------------------------------
 # Step 21: Delete Address (cleanup)
 # ---------------------------------------------------------------------------
-def step_delete_address(address_id):
-    log_step(21, f"DELETE /user/addresses/{address_id}/delete")
-    resp = session.delete(f"{API}/user/addresses/{address_id}/delete", headers=headers())
-    body = log_result(resp)
+def step_delete_address(user, address_id):
+    log_step(user, 21, f"DELETE /user/addresses/{address_id}/delete")
+    resp = user.delete(f"/user/addresses/{address_id}/delete")
+    body = log_result(user, resp)
     return body
 
 
 # ===========================================================================
-# Main Flow
+# Journey
 # ===========================================================================
-def main():
-    print("=" * 60)
-    print("  BAZA USER FLOW TEST")
-    print(f"  Base URL: {BASE_URL}")
-    print(f"  Phone: {PHONE}")
-    print("=" * 60)
+def run_step(user, recorder, fn, *args):
+    """Run one step, recording its latency when a recorder is attached."""
+    user.session.step = fn.__name__[len("step_"):]
+    start = time.perf_counter()
+    ok = False
+    try:
+        result = fn(user, *args)
+        ok = True
+        return result
+    finally:
+        if recorder is not None:
+            recorder.record(user.session.step, time.perf_counter() - start, ok=ok)
+
+
+def run_journey(user, recorder=None):
+    def step(fn, *args):
+        return run_step(user, recorder, fn, *args)
 
     # AUTH
-    step_otp_request()
-    step_otp_verify()
+    step(step_otp_request)
+    step(step_otp_verify)
 
     # USER PROFILE
-    step_get_profile()
-    step_update_profile()
-    step_update_notifications()
+    step(step_get_profile)
+    step(step_update_profile)
+    step(step_update_notifications)
 
     # ADDRESSES
-    addr = step_create_address()
+    addr = step(step_create_address)
     address_id = addr.get("id")
 
-    step_list_addresses()
+    step(step_list_addresses)
 
     if address_id:
-        step_update_address(address_id)
-        step_set_default(address_id)
+        step(step_update_address, address_id)
+        step(step_set_default, address_id)
 
     # PRODUCTS
-    step_browse_products()
+    step(step_browse_products)
 
     # WALLET
-    step_wallet_balance()
-    step_wallet_transactions()
+    step(step_wallet_balance)
+    step(step_wallet_transactions)
 
     # ORDERS
-    order_result = step_create_order(address_id)
-    step_list_orders()
+    order_result = step(step_create_order, address_id)
+    step(step_list_orders)
 
     order_id = None
     if isinstance(order_result, dict) and "order" in order_result:
         order_id = order_result["order"].get("id")
     if order_id:
-        step_get_order(order_id)
+        step(step_get_order, order_id)
 
     # REFERRALS
-    step_referral_stats()
+    step(step_referral_stats)
 
     # SUPPORT
-    step_support_thread()
-    step_support_message()
+    step(step_support_thread)
+    step(step_support_message)
 
     # TOKEN REFRESH
-    step_refresh()
+    step(step_refresh)
 
     # LOGOUT
-    step_logout()
+    step(step_logout)
 
     # CLEANUP
     if address_id:
         # Re-auth to delete (we logged out)
-        print("\n  ℹ️  Skipping address delete (already logged out)")
+        say(user, "\n  ℹ️  Skipping address delete (already logged out)")
+
+
+# ===========================================================================
+# Load Mode
+# ===========================================================================
+def run_load(users, phone_base, otp, ramp, timing_log=None):
+    """Run ``users`` independent journeys in parallel and report per-step latency."""
+    print("=" * 60)
+    print("  BAZA USER FLOW LOAD TEST")
+    print(f"  Base URL: {BASE_URL}")
+    print(f"  Virtual users: {users} (phones from {phone_base}, ramp {ramp:.1f}s)")
+    print("=" * 60)
+
+    steps = LatencyRecorder()
+    journeys = LatencyRecorder()
+    first_phone = int(phone_base.lstrip("+"))
+
+    def worker(index):
+        if ramp:
+            time.sleep(ramp * index / users)
+        user = VirtualUser(f"+{first_phone + index}", otp=otp, verbose=False, timing_log=timing_log)
+        start = time.perf_counter()
+        error = None
+        try:
+            run_journey(user, steps)
+        except StepFailed as e:
+            error = str(e)
+        except requests.RequestException as e:
+            error = f"{type(e).__name__}: {e}"
+        journeys.record("journey", time.perf_counter() - start, ok=error is None)
+        return error
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        errors = [e for e in pool.map(worker, range(users)) if e]
+    wall = time.perf_counter() - start
+
+    steps.print_report(wall, title="Latency by step")
+    journey = journeys.print_report(wall, title="Journeys")["journey"]
+
+    if errors:
+        print(f"\n  ❌ {len(errors)}/{users} journeys failed. First errors:")
+        for msg in sorted(set(errors))[:5]:
+            print(f"    - {msg[:200]}")
+    return journey["errors"] == 0
+
+
+# ===========================================================================
+# Open-Loop Load Mode
+# ===========================================================================
+def run_open_load(rate, duration, start_rate, ramp, phone_base, otp, max_inflight, timing_log=None):
+    """Start journeys at ``rate``/s whatever the response times; report corrected journey latency."""
+    start_rate = rate if start_rate is None else start_rate
+    print("=" * 60)
+    print("  BAZA USER FLOW OPEN-LOOP LOAD TEST")
+    print(f"  Base URL: {BASE_URL}")
+    print(f"  Arrival rate: {start_rate:g} → {rate:g} journeys/s over {ramp:g}s, {duration:g}s in total")
+    print(f"  Phones from {phone_base}, up to {max_inflight} journeys in flight")
+    print("=" * 60)
+
+    steps = HdrRecorder()
+    first_phone = int(phone_base.lstrip("+"))
+    errors = []
+
+    def journey(index):
+        user = VirtualUser(f"+{first_phone + index}", otp=otp, verbose=False, timing_log=timing_log)
+        try:
+            run_journey(user, steps)
+        except StepFailed as e:
+            errors.append(str(e))
+            return False
+        except requests.RequestException as e:
+            errors.append(f"{type(e).__name__}: {e}")
+            return False
+        return True
+
+    loop = OpenLoop(rate, duration, start_rate=start_rate, ramp=ramp, max_inflight=max_inflight)
+    started = loop.run(journey, name="journey")
+    steps.print_report(loop.wall, title="Latency by step (within each journey)")
+    loop.print_report(title="Journeys")
+
+    failed = len(errors) + loop.error_count
+    if errors:
+        print(f"\n  ❌ {failed}/{started} journeys failed. First errors:")
+        for msg in sorted(set(errors))[:5]:
+            print(f"    - {msg[:200]}")
+    return failed == 0
+
+
+# ===========================================================================
+# Catalog Hydration Benchmark
+# ===========================================================================
+CATALOG_TABS = [
+    ("bundles", "/products/bundles"),
+    ("mealpacks", "/products/mealpacks"),
+    ("readyeat", "/products/readyeat"),
+    ("snacks", "/products/snacks"),
+    ("restock", "/products/restock"),
+]
+
+
+def fetch_tabs_sequential(user, pool):
+    return [user.get(path) for _, path in CATALOG_TABS]
+
+
+def fetch_tabs_parallel(user, pool):
+    return list(pool.map(lambda tab: user.get(tab[1]), CATALOG_TABS))
+
+
+def fetch_catalog(user, pool):
+    return [user.get("/products/catalog")]
+
+
+def run_catalog_bench(user, rounds):
+    """Time the three ways of hydrating every product tab, ``rounds`` times each."""
+    variants = [
+        ("sequential per-tab", fetch_tabs_sequential),
+        ("parallel per-tab", fetch_tabs_parallel),
+        ("single /catalog", fetch_catalog),
+    ]
+    results = {name: {"wall": [], "bytes": [], "server": [], "errors": 0} for name, _ in variants}
+
+    with ThreadPoolExecutor(max_workers=len(CATALOG_TABS)) as pool:
+        # Warm-up: open pooled connections so no variant pays the handshakes.
+        fetch_tabs_parallel(user, pool)
+
+        for round_num in range(rounds):
+            # Rotate the order each round so no variant always runs first.
+            shift = round_num % len(variants)
+            for name, fn in variants[shift:] + variants[:shift]:
+                user.session.step = name
+                start = time.perf_counter()
+                responses = fn(user, pool)
+                wall = time.perf_counter() - start
+
+                entry = results[name]
+                entry["wall"].append(wall)
+                entry["bytes"].append(sum(r.timing.response_bytes for r in responses))
+                entry["server"].append(sum(server_time_ms(r) for r in responses))
+                entry["errors"] += sum(1 for r in responses if r.status_code != 200)
+
+    print(f"\n{'='*60}")
+    print(f"  Catalog hydration ({rounds} rounds)")
+    print(f"{'='*60}")
+    print(f"  {'variant':<20}  {'p50 ms':>8}  {'p95 ms':>8}  {'mean KB':>8}  {'server ms':>9}  {'err':>4}")
+    for name, entry in results.items():
+        wall = sorted(entry["wall"])
+        print(
+            f"  {name:<20}  {percentile(wall, 50) * 1000:>8.1f}  {percentile(wall, 95) * 1000:>8.1f}  "
+            f"{sum(entry['bytes']) / rounds / 1024:>8.1f}  {sum(entry['server']) / rounds:>9.1f}  {entry['errors']:>4}"
+        )
+    print("\n  server ms = summed handler time of every request in the variant (Server-Timing, else TTFB).")
+    return results
+
+
+# ===========================================================================
+# Wallet-Debit Race
+# ===========================================================================
+def uncached(**params):
+    """Query params that miss ResponseCacheMiddleware's per-user window (it keys on the full path)."""
+    return dict(params, _=time.time_ns())
+
+
+def all_pages(user, path, key, **params):
+    page = 1
+    while True:
+        body = user.get(path, params=uncached(page=page, limit=100, **params)).json()
+        yield from body.get(key, [])
+        if not body.get("pagination", {}).get("hasNext"):
+            return
+        page += 1
+
+
+def race_order(amount, n):
+    item = {"itemType": "product", "productId": "r1", "name": "Race test", "emoji": "🏁", "qty": 1,
+            "unitPrice": amount, "totalPrice": amount}
+    return {"items": [item], "total": amount, "note": f"wallet race #{n}", "paymentMethod": "wallet"}
+
+
+def fund_wallet(user, amount, timeout=15):
+    """Credit the wallet through a signed charge.success webhook and wait for it to land."""
+    before = user.get("/wallet/balance", params=uncached()).json()["balance"]
+    me = user.get("/user/me").json()
+    event = card_topup_event(f"race_fund_{int(time.time() * 1000)}", amount, me["id"],
+                             me.get("email") or f"{user.phone.lstrip('+')}@baza.ng")
+    resp = post_event(user.session, f"{user.api}/webhooks/paystack", event)
+    if resp.status_code >= 300:
+        fail(f"Funding webhook rejected: {resp.status_code} {resp.text[:200]}")
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        balance = user.get("/wallet/balance", params=uncached()).json()["balance"]
+        if balance >= before + amount:
+            return balance
+        time.sleep(0.5)
+    fail("Funding webhook accepted but the balance never moved")
+
+
+def run_wallet_race(user, orders, amount, fund, baseline=3):
+    """Fire ``orders`` wallet orders at once against one wallet, then audit the ledger."""
+    print("=" * 60)
+    print("  WALLET-DEBIT RACE")
+    print(f"  Base URL: {BASE_URL}")
+    print(f"  Orders: {orders} x {amount} kobo, all at once, one wallet ({user.phone})")
+    print("=" * 60)
+
+    if fund:
+        print(f"  💰 Funded: balance now {fund_wallet(user, fund)} kobo")
+    known_txns = {txn["id"] for txn in all_pages(user, "/wallet/transactions", "transactions")}
+    start_balance = user.get("/wallet/balance", params=uncached()).json()["balance"]
+
+    recorder = LatencyRecorder()
+    results = []  # (status, code, order_id, walletBalance); status None when no response came back
+    lock = threading.Lock()
+
+    def place(n, gate=None):
+        if gate is not None:
+            gate.wait()
+        sent = time.perf_counter()
+        try:
+            resp = user.post("/orders/create", json=race_order(amount, n))
+        except requests.RequestException as e:
+            # The server may or may not have taken the order; the audit allows for both.
+            recorder.record("race: no response", time.perf_counter() - sent, ok=False)
+            with lock:
+                results.append((None, type(e).__name__, None, None))
+            return
+        body = resp.json() if resp.headers.get("Content-Type", "").startswith("application/json") else {}
+        label = "CONFIRMED" if resp.status_code == 201 else body.get("code") or f"HTTP {resp.status_code}"
+        recorder.record(f"race: {label}", resp.timing.total_ms / 1000, ok=resp.status_code in (201, 400))
+        recorder.record("race: server time", server_time_ms(resp) / 1000)
+        with lock:
+            results.append((resp.status_code, body.get("code"), (body.get("order") or {}).get("id"),
+                            body.get("walletBalance")))
+
+    # A few one-at-a-time orders give the uncontended latency to compare against.
+    for n in range(min(baseline, start_balance // amount)):
+        resp = user.post("/orders/create", json=race_order(amount, f"baseline-{n}"))
+        recorder.record("uncontended order", resp.timing.total_ms / 1000, ok=resp.status_code == 201)
+        with lock:
+            results.append((resp.status_code, None, (resp.json().get("order") or {}).get("id"),
+                            resp.json().get("walletBalance")))
+
+    gate = threading.Barrier(orders)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=orders) as pool:
+        list(pool.map(lambda n: place(n, gate), range(orders)))
+    wall = time.perf_counter() - start
+
+    recorder.print_report(wall, title="Wallet order latency under contention")
+    summary = recorder.summary()
+    if "uncontended order" in summary and "race: CONFIRMED" in summary:
+        extra = summary["race: CONFIRMED"]["p50"] - summary["uncontended order"]["p50"]
+        print(f"  Contention cost: +{extra:.1f} ms at p50 over an uncontended order")
+    print(f"  Order throughput: {orders / wall:.1f} orders/s")
+
+    # -- Ledger audit -------------------------------------------------------
+    placed = len(results)
+    confirmed = [r for r in results if r[0] == 201]
+    rejected = [r for r in results if r[0] == 400 and r[1] == "INSUFFICIENT_BALANCE"]
+    lost = [r for r in results if r[0] is None]
+    other = placed - len(confirmed) - len(rejected) - len(lost)
+    final_balance = user.get("/wallet/balance", params=uncached()).json()["balance"]
+    new_txns = [t for t in all_pages(user, "/wallet/transactions", "transactions") if t["id"] not in known_txns]
+    debits = {}
+    for txn in new_txns:
+        if txn.get("type") == "DEBIT_ORDER":
+            key = txn.get("orderId") or txn.get("reference")
+            debits[key] = debits.get(key, 0) + 1
+
+    problems = []
+    running = start_balance
+    for txn in sorted(new_txns, key=lambda t: t.get("createdAt", "")):
+        running += -txn["amount"] if txn.get("type", "").startswith("DEBIT") else txn["amount"]
+        if running < 0:
+            problems.append(f"ledger went negative ({running} kobo) at {txn.get('reference')}")
+            break
+    if final_balance < 0 or any(r[3] is not None and r[3] < 0 for r in confirmed):
+        problems.append(f"negative balance reported (final {final_balance} kobo)")
+    for _, _, order_id, _ in confirmed:
+        if debits.get(order_id, 0) != 1:
+            problems.append(f"order {order_id} has {debits.get(order_id, 0)} DEBIT_ORDER transactions")
+    if any(count > 1 for count in debits.values()):
+        problems.append(f"{sum(1 for count in debits.values() if count > 1)} orders were debited more than once")
+    # Orders whose response was lost may or may not have gone through; the ledger says which.
+    debited = len(debits)
+    if not len(confirmed) <= debited <= len(confirmed) + len(lost):
+        problems.append(f"{debited} orders debited but {len(confirmed)} confirmed (+{len(lost)} without response)")
+    if final_balance != start_balance - debited * amount:
+        problems.append(f"balance {final_balance} != {start_balance} - {debited} x {amount}")
+    affordable = min(placed, start_balance // amount)
+    if not affordable - len(lost) <= debited <= affordable:
+        problems.append(f"{debited} orders debited but the wallet could afford {affordable}")
+    if not placed - debited - len(lost) <= len(rejected) <= placed - debited:
+        problems.append(f"rejected {len(rejected)} x {amount} does not match the shortfall of "
+                        f"{placed - debited} orders")
+    if other:
+        problems.append(f"{other} orders failed with something other than INSUFFICIENT_BALANCE")
+
+    print(f"\n  Start balance: {start_balance}  Final: {final_balance}  "
+          f"Confirmed: {len(confirmed)}  Rejected: {len(rejected)}  Other: {other}  No response: {len(lost)}")
+    if lost:
+        print(f"  ⚠️  {len(lost)} orders got no response ({', '.join(sorted({r[1] for r in lost}))}); "
+              f"{debited - len(confirmed)} of them were debited")
+    if problems:
+        print(f"  ❌ Ledger audit failed ({len(problems)} problems):")
+        for problem in problems[:10]:
+            print(f"    - {problem}")
+        return False
+    print("  ✅ Ledger audit passed: never negative, one DEBIT_ORDER per confirmed order, "
+          "rejections match the shortfall")
+    return True
+
+
+# ===========================================================================
+# Auth Storm
+# ===========================================================================
+CHURN_BACKOFF = 0.5  # seconds after a failed churn cycle, doubling up to CHURN_BACKOFF_MAX
+CHURN_BACKOFF_MAX = 8.0
+
+
+def error_code(resp):
+    try:
+        return resp.json().get("code") or f"HTTP {resp.status_code}"
+    except ValueError:
+        return f"HTTP {resp.status_code}"
+
+
+def quiet_login(phone, otp, timing_log=None):
+    # No auto-refresh: a 401 must reach the storm's checks, and a hidden refresh
+    # would rotate the cookie the next wave presents.
+    user = VirtualUser(phone, otp=otp, verbose=False, timing_log=timing_log, auto_refresh=False)
+    step_otp_request(user)
+    step_otp_verify(user)
+    return user
+
+
+def refresh_with(user, cookie, recorder, label):
+    """POST /auth/refresh presenting ``cookie``; returns (code, new cookie, new access token)."""
+    try:
+        resp = user.post("/auth/refresh", cookies={"baza_refresh": cookie})
+    except requests.RequestException as e:
+        return type(e).__name__, None, None
+    recorder.record(label, resp.timing.total_ms / 1000, ok=resp.status_code in (200, 401))
+    recorder.record("refresh server time", server_time_ms(resp) / 1000)
+    if resp.status_code != 200:
+        return error_code(resp), None, None
+    return "OK", resp.cookies.get("baza_refresh"), resp.json().get("accessToken")
+
+
+def run_refresh_storm(sessions, phone_base, otp, waves, gap, duplicate_share, churn, timing_log=None):
+    """Log ``sessions`` users in, then refresh them all at once ``waves`` times; optionally churn."""
+    print("=" * 60)
+    print("  AUTH STORM")
+    print(f"  Base URL: {BASE_URL}")
+    print(f"  Sessions: {sessions} (phones from {phone_base}), {waves} waves {gap:.1f}s apart, "
+          f"{duplicate_share:.0%} double refreshes")
+    print("=" * 60)
+
+    recorder = LatencyRecorder()
+    first_phone = int(phone_base.lstrip("+"))
+    users, cookies = [], []
+
+    def login(index):
+        start = time.perf_counter()
+        user = quiet_login(f"+{first_phone + index}", otp, timing_log)
+        recorder.record("login (otp-request + verify)", time.perf_counter() - start)
+        return user
+
+    with ThreadPoolExecutor(max_workers=min(sessions, 200)) as pool:
+        users = list(pool.map(login, range(sessions)))
+    cookies = [user.session.cookies.get("baza_refresh") for user in users]
+    if not all(cookies):
+        fail("otp-verify did not set a baza_refresh cookie for every session")
+
+    # Every session that survived a wave must be able to use its new access token.
+    def check(index):
+        return users[index].get("/user/me").status_code == 401
+
+    # A token the server rejects has to show up as a 401 here, or the check below counts nothing.
+    token, users[0].access_token = users[0].access_token, "stale-access-token"
+    if not check(0):
+        fail("/user/me accepted a bogus access token: the stale-access check cannot count 401s")
+    users[0].access_token = token
+
+    # Sole refreshes should never fail; of a double refresh (two requests racing with
+    # the same cookie, like an app resuming with two calls in flight) exactly one
+    # should win. A pair where both lose logs the user out.
+    outcomes = {"sole": {}, "pair": {}}
+    lost_sessions = stale_access = 0
+    lock = threading.Lock()
+    rng = random.Random(7)
+    wall_total = 0.0
+
+    for wave in range(waves):
+        doubled = set(rng.sample(range(sessions), int(sessions * duplicate_share)))
+        calls = [(i, "pair" if i in doubled else "sole") for i in range(sessions)]
+        calls += [(i, "pair") for i in doubled]
+        results = {i: [] for i in range(sessions)}
+        gate = threading.Barrier(len(calls))
+
+        def fire(call):
+            index, kind = call
+            gate.wait()
+            outcome = refresh_with(users[index], cookies[index], recorder, f"refresh ({kind})")
+            with lock:
+                results[index].append(outcome)
+                outcomes[kind][outcome[0]] = outcomes[kind].get(outcome[0], 0) + 1
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+            list(pool.map(fire, calls))
+        wave_wall = time.perf_counter() - start
+        wall_total += wave_wall
+
+        for index, got in results.items():
+            winners = [(cookie, access) for code, cookie, access in got if code == "OK"]
+            if not winners:
+                lost_sessions += 1
+                continue
+            cookies[index], users[index].access_token = winners[0]
+        print(f"  🌩  wave {wave + 1}: {len(calls)} refreshes in {wave_wall:.2f}s "
+              f"({len(calls) / wave_wall:.0f}/s)")
+
+        with ThreadPoolExecutor(max_workers=min(sessions, 200)) as pool:
+            stale_access += sum(pool.map(check, range(sessions)))
+        if wave < waves - 1:
+            time.sleep(gap)
+
+    recorder.print_report(wall_total, title="Refresh storm latency")
+    for kind, counts in outcomes.items():
+        total = sum(counts.values())
+        if total:
+            invalid = counts.get("REFRESH_TOKEN_INVALID", 0)
+            detail = ", ".join(f"{code} {n}" for code, n in sorted(counts.items()))
+            print(f"  {kind:<5} refreshes: {total:>6}  REFRESH_TOKEN_INVALID {invalid / total:6.1%}  ({detail})")
+    print(f"  Sessions logged out by the storm: {lost_sessions}   /user/me 401 after refresh: {stale_access}")
+
+    problems = outcomes["sole"].get("REFRESH_TOKEN_INVALID", 0) + lost_sessions + stale_access
+    if churn:
+        problems += run_churn(min(sessions, 200), first_phone + sessions, otp, churn, timing_log)
+    if problems:
+        print(f"\n  ❌ {problems} auth problems under concurrency")
+    else:
+        print("\n  ✅ No session lost: every sole refresh succeeded and one of each double refresh won")
+    return problems == 0
+
+
+def run_churn(workers, first_phone, otp, seconds, timing_log=None):
+    """login → refresh → logout → refresh again (must be rejected), in a loop for ``seconds``.
+
+    Worker ``index`` logs in phone ``first_phone + cycle * workers + index`` on each cycle.
+    """
+    print(f"\n  🔁 Login/logout churn: {workers} workers for {seconds:.0f}s")
+    recorder = LatencyRecorder()
+    counts = {"cycles": 0, "session_ops": 0, "revoked_ok": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(index):
+        cycle = 0
+        backoff = 0.0
+        while time.perf_counter() < deadline:
+            # A fresh phone every cycle: otp-request allows 3 per phone per 10 minutes.
+            phone = f"+{first_phone + cycle * workers + index}"
+            cycle += 1
+            try:
+                start = time.perf_counter()
+                user = quiet_login(phone, otp, timing_log)
+                recorder.record("churn: login", time.perf_counter() - start)
+                cookie = user.session.cookies.get("baza_refresh")
+                code, cookie, _ = refresh_with(user, cookie, recorder, "churn: refresh")
+                resp = user.post("/auth/logout", cookies={"baza_refresh": cookie or ""})
+                recorder.record("churn: logout", resp.timing.total_ms / 1000, ok=resp.status_code == 200)
+                after, _, _ = refresh_with(user, cookie, recorder, "churn: refresh after logout")
+                user.close()
+            except (StepFailed, requests.RequestException):
+                with lock:
+                    counts["errors"] += 1
+                backoff = min(CHURN_BACKOFF_MAX, backoff * 2 or CHURN_BACKOFF)
+                time.sleep(min(backoff, max(0.0, deadline - time.perf_counter())))
+                continue
+            backoff = 0.0
+            with lock:
+                counts["cycles"] += 1
+                counts["session_ops"] += 3  # create, rotate, delete
+                counts["revoked_ok"] += after == "OK"  # a logged-out cookie must not refresh
+                counts["errors"] += code != "OK" or resp.status_code != 200
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(worker, range(workers)))
+    wall = time.perf_counter() - start
+
+    recorder.print_report(wall, title="Login/logout churn")
+    print(f"  Cycles: {counts['cycles']}  Session writes: {counts['session_ops'] / wall:.0f}/s "
+          f"(create + rotate + delete)  Errors: {counts['errors']}")
+    if counts["revoked_ok"]:
+        print(f"  ❌ {counts['revoked_ok']} refresh tokens still worked after logout")
+    return counts["revoked_ok"] + counts["errors"]
+
+
+# ===========================================================================
+# Notification Probe
+# ===========================================================================
+# Notification each probed action should push on /ws/notifications/. Support
+# replies have no event type in the app yet; set NOTIFY_SUPPORT_EVENT to wait
+# for one.
+SUPPORT_EVENT = os.getenv("NOTIFY_SUPPORT_EVENT", "").strip()
+
+
+class NotificationListener:
+    """Keeps /ws/notifications/ open in a thread and timestamps every notification as it arrives."""
+
+    def __init__(self, user):
+        self.url = f"{user.base_url.replace('http', 'ws', 1)}/ws/notifications/?token={user.access_token}"
+        self.arrivals = []  # (perf_counter, notification)
+        self.claimed = set()  # arrival indexes already matched to an action
+        self.cond = threading.Condition()
+        self.closed = None
+        self.ws = None
+        self.ready = threading.Event()
+
+    def start(self, timeout=10):
+        threading.Thread(target=self._read, args=(timeout,), daemon=True).start()
+        if not self.ready.wait(timeout * 2) or self.ws is None:
+            fail(f"Notification socket did not open: {self.closed or 'timed out'}")
+
+    def _read(self, timeout):
+        # Only the notification probe needs websockets; the other modes run without it.
+        try:
+            from websockets.exceptions import ConnectionClosed
+            from websockets.sync.client import connect as ws_connect
+        except ImportError as e:
+            self.closed = e
+            self.ready.set()
+            return
+
+        try:
+            with ws_connect(self.url, open_timeout=timeout) as ws:
+                hello = json.loads(ws.recv(timeout))
+                if hello.get("type") != "connected":
+                    raise ValueError(f"opened with {hello} instead of connected")
+                self.ws = ws
+                self.ready.set()
+                for raw in ws:
+                    arrived = time.perf_counter()
+                    message = json.loads(raw)
+                    if message.get("type") == "notification":
+                        with self.cond:
+                            self.arrivals.append((arrived, message["notification"]))
+                            self.cond.notify_all()
+        except (OSError, TimeoutError, ValueError, ConnectionClosed) as e:
+            with self.cond:
+                self.closed = e
+                self.cond.notify_all()
+        finally:
+            self.ready.set()
+
+    def wait_for(self, match, timeout):
+        """Arrival time of the first unclaimed notification ``match`` accepts, or None after ``timeout``."""
+        deadline = time.perf_counter() + timeout
+        with self.cond:
+            while True:
+                for index, (arrived, notification) in enumerate(self.arrivals):
+                    if index not in self.claimed and match(notification):
+                        self.claimed.add(index)
+                        return arrived
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or self.closed:
+                    return None
+                self.cond.wait(remaining)
+
+    def unclaimed(self):
+        with self.cond:
+            return [n for index, (_, n) in enumerate(self.arrivals) if index not in self.claimed]
+
+    def close(self):
+        self.ws.close()
+
+
+def is_event(event_type, order_id=None):
+    def match(notification):
+        data = notification.get("data") or {}
+        return notification.get("eventType") == event_type and data.get("orderId") == order_id
+    return match
+
+
+def run_notification_probe(user, rounds, amount, timeout, interval=1.0):
+    """Place orders, pay them, top up and message support; time each action to its notification."""
+    print("=" * 60)
+    print("  ORDER → NOTIFICATION LATENCY")
+    print(f"  Base URL: {BASE_URL}")
+    print(f"  Rounds: {rounds} x (order, order payment, top-up, support message), timeout {timeout:g}s")
+    print("=" * 60)
+
+    me = user.get("/user/me").json()
+    email = me.get("email") or f"{user.phone.lstrip('+')}@baza.ng"
+    listener = NotificationListener(user)
+    listener.start()
+    recorder = LatencyRecorder()
+    missed = []  # (action, event, orderId)
+    early = 0
+    webhook_url = f"{user.api}/webhooks/paystack"
+
+    def expect(action, resp, event, order_id=None):
+        """Time ``resp`` (just returned) to its notification; 0 when the push beat the response."""
+        nonlocal early
+        responded = time.perf_counter()
+        recorder.record(f"http: {action}", resp.timing.total_ms / 1000, ok=resp.status_code < 300)
+        if resp.status_code >= 300:
+            fail(f"{action} failed: {resp.status_code} {resp.text[:200]}")
+        if not event:
+            return
+        arrived = listener.wait_for(is_event(event, order_id), timeout)
+        if arrived is None:
+            missed.append((action, event, order_id))
+            return
+        if arrived < responded:
+            early += 1
+        recorder.record(f"{event} ← {action}", max(0.0, arrived - responded))
+
+    start = time.perf_counter()
+    for n in range(rounds):
+        order = dict(race_order(amount, f"notify-{n}"), paymentMethod="paystack", note=f"notification probe #{n}")
+        resp = user.post("/orders/create", json=order)
+        body = resp.json() if resp.status_code < 300 else {}
+        order_id = (body.get("order") or {}).get("id")
+        expect("create order", resp, "order_created", order_id)
+
+        event = card_topup_event(body.get("reference") or f"notify_order_{n}_{int(time.time() * 1000)}", amount,
+                                 me["id"], email, purpose="order_payment", order_id=order_id)
+        expect("pay order webhook", post_event(user.session, webhook_url, event), "payment_success", order_id)
+
+        resp = user.post("/wallet/topup", json={"amount": amount})
+        reference = resp.json().get("reference") if resp.status_code < 300 else None
+        event = card_topup_event(reference or f"notify_topup_{n}_{int(time.time() * 1000)}", amount, me["id"], email)
+        expect("top-up webhook", post_event(user.session, webhook_url, event), "payment_success")
+
+        resp = user.post("/support/message", json={"text": f"Notification probe #{n}: where is my order?"})
+        expect("support message", resp, SUPPORT_EVENT)
+        time.sleep(interval)
+    wall = time.perf_counter() - start
+    listener.close()
+
+    recorder.print_report(wall, title="HTTP response → notification arrival")
+    if early:
+        print(f"  ⚡ {early} notifications arrived before their HTTP response (counted as 0 ms)")
+    if listener.closed:
+        print(f"  ⚠️  Notification socket closed mid-run: {listener.closed}")
+    extra = listener.unclaimed()
+    if extra:
+        kinds = sorted({n.get("eventType", "?") for n in extra})
+        print(f"  ℹ️  {len(extra)} notifications matched no probe ({', '.join(kinds)})")
+    if not missed:
+        print(f"  ✅ Every expected notification arrived within {timeout:g}s")
+        return True
+
+    # Stored but never pushed points at the socket path; not stored at all points at the signal.
+    stored = user.get("/notifications", params={"limit": 100}).json().get("notifications", [])
+    print(f"  ❌ {len(missed)} notifications missed (no push within {timeout:g}s):")
+    for action, event, order_id in missed[:20]:
+        found = any(is_event(event, order_id)(n) for n in stored)
+        print(f"    - {action}: {event}{f' for order {order_id}' if order_id else ''} — "
+              f"{'stored but never pushed' if found else 'not in GET /notifications either'}")
+    return False
+
+
+# ===========================================================================
+# Main Flow
+# ===========================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Baza end-to-end user flow test")
+    parser.add_argument("--users", type=int, default=0,
+                        help="run N concurrent virtual users instead of the interactive flow")
+    parser.add_argument("--phone-base", default=os.getenv("PHONE_BASE", "+2348000000000"),
+                        help="first phone number in load mode; user i gets phone-base + i")
+    parser.add_argument("--otp", default=OTP, help="OTP accepted by the test backend (env OTP)")
+    parser.add_argument("--ramp", type=float, default=0.0,
+                        help="seconds over which to stagger virtual user start times (--rate: to reach the rate)")
+    parser.add_argument("--rate", type=float, default=0, metavar="JOURNEYS_PER_S",
+                        help="open-loop load: start journeys at this rate whatever the response times")
+    parser.add_argument("--start-rate", type=float, help="open-loop rate at the start of --ramp (default: --rate)")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of open-loop arrivals")
+    parser.add_argument("--max-inflight", type=int, default=1000, help="open-loop journeys in flight at most")
+    parser.add_argument("--bench-catalog", type=int, default=0, metavar="ROUNDS",
+                        help="log in, then benchmark per-tab product fetches against /products/catalog")
+    parser.add_argument("--timings-out", metavar="PATH",
+                        help="write per-request timings to PATH (.jsonl or .csv)")
+    parser.add_argument("--wallet-race", type=int, default=0, metavar="ORDERS",
+                        help="fire ORDERS concurrent wallet orders at one wallet and audit the ledger")
+    parser.add_argument("--order-amount", type=int, default=100000, help="kobo per race order")
+    parser.add_argument("--fund", type=int, default=0, metavar="KOBO",
+                        help="top the wallet up via a signed webhook before the race")
+    parser.add_argument("--refresh-storm", type=int, default=0, metavar="SESSIONS",
+                        help="log SESSIONS users in and refresh them all at once")
+    parser.add_argument("--waves", type=int, default=3, help="refresh storms to fire")
+    parser.add_argument("--wave-gap", type=float, default=2.0, help="seconds between storms")
+    parser.add_argument("--duplicate-share", type=float, default=0.1,
+                        help="share of sessions that refresh twice at once with the same cookie")
+    parser.add_argument("--churn", type=float, default=0, metavar="SECONDS",
+                        help="after the storm, loop login/refresh/logout for SECONDS")
+    parser.add_argument("--notify-probe", type=int, default=0, metavar="ROUNDS",
+                        help="time order/payment/top-up/support actions to their /ws/notifications/ event")
+    parser.add_argument("--notify-timeout", type=float, default=10.0,
+                        help="seconds to wait for each notification before calling it missed")
+    args = parser.parse_args()
+
+    # Kept only when exported: a long load run would otherwise hold every request's timing.
+    timing_log = TimingLog() if args.timings_out else None
+
+    if args.users:
+        if not args.otp:
+            parser.error("load mode needs a fixed test OTP (--otp or OTP env var)")
+        ok = run_load(args.users, args.phone_base, args.otp, args.ramp, timing_log)
+        if args.timings_out:
+            print(f"\n  📝 {timing_log.export(args.timings_out)} request timings → {args.timings_out}")
+        sys.exit(0 if ok else 1)
+
+    if args.rate:
+        if not args.otp:
+            parser.error("--rate needs a fixed test OTP (--otp or OTP env var)")
+        ok = run_open_load(args.rate, args.duration, args.start_rate, args.ramp, args.phone_base, args.otp,
+                           args.max_inflight, timing_log)
+        if args.timings_out:
+            print(f"\n  📝 {timing_log.export(args.timings_out)} request timings → {args.timings_out}")
+        sys.exit(0 if ok else 1)
+
+    if args.refresh_storm:
+        if not args.otp:
+            parser.error("--refresh-storm needs a fixed test OTP (--otp or OTP env var)")
+        try:
+            ok = run_refresh_storm(args.refresh_storm, args.phone_base, args.otp, args.waves, args.wave_gap,
+                                   args.duplicate_share, args.churn, timing_log)
+        except StepFailed as e:
+            print(f"\n❌ FAILED: {e}")
+            sys.exit(1)
+        if args.timings_out:
+            print(f"\n  📝 {timing_log.export(args.timings_out)} request timings → {args.timings_out}")
+        sys.exit(0 if ok else 1)
+
+    if args.wallet_race:
+        user = VirtualUser(PHONE, otp=args.otp, timing_log=timing_log, pool_maxsize=args.wallet_race)
+        try:
+            step_otp_request(user)
+            step_otp_verify(user)
+            user.verbose = False
+            ok = run_wallet_race(user, args.wallet_race, args.order_amount, args.fund)
+        except StepFailed as e:
+            print(f"\n❌ FAILED: {e}")
+            sys.exit(1)
+        if args.timings_out:
+            print(f"\n  📝 {timing_log.export(args.timings_out)} request timings → {args.timings_out}")
+        sys.exit(0 if ok else 1)
+
+    if args.notify_probe:
+        user = VirtualUser(PHONE, otp=args.otp, timing_log=timing_log)
+        try:
+            step_otp_request(user)
+            step_otp_verify(user)
+            user.verbose = False
+            ok = run_notification_probe(user, args.notify_probe, args.order_amount, args.notify_timeout)
+        except StepFailed as e:
+            print(f"\n❌ FAILED: {e}")
+            sys.exit(1)
+        if args.timings_out:
+            print(f"\n  📝 {timing_log.export(args.timings_out)} request timings → {args.timings_out}")
+        sys.exit(0 if ok else 1)
+
+    if args.bench_catalog:
+        user = VirtualUser(PHONE, otp=args.otp, timing_log=timing_log)
+        try:
+            step_otp_request(user)
+            step_otp_verify(user)
+        except StepFailed as e:
+            print(f"\n❌ FAILED: {e}")
+            sys.exit(1)
+        user.verbose = False
+        run_catalog_bench(user, args.bench_catalog)
+        if args.timings_out:
+            print(f"\n  📝 {timing_log.export(args.timings_out)} request timings → {args.timings_out}")
+        return
+
+    print("=" * 60)
+    print("  BAZA USER FLOW TEST")
+    print(f"  Base URL: {BASE_URL}")
+    print(f"  Phone: {PHONE}")
+    print("=" * 60)
+
+    timing_log = timing_log or TimingLog()  # the single-user flow always prints its breakdown
+    user = VirtualUser(PHONE, otp=args.otp, timing_log=timing_log)
+    try:
+        run_journey(user)
+    except StepFailed as e:
+        print(f"\n❌ FAILED: {e}")
+        sys.exit(1)
+    finally:
+        if args.timings_out:
+            print(f"\n  📝 {timing_log.export(args.timings_out)} request timings → {args.timings_out}")
+
+    timing_log.print_breakdown()
 
     # SUMMARY
     print("\n" + "=" * 60)
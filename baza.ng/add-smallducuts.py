@@ -1,12 +1,64 @@
+"""
+add-smallducuts.py — Import restock products into Baza
+======================================================
+
+With no arguments the hardcoded PRODUCTS list below is posted to
+/v1/products/import-smallproducts. For supplier catalogs, pass --input: rows
+are streamed from CSV or JSONL, sent in batches over a bounded number of
+parallel requests, and every finished batch is written to a checkpoint file.
+If a run fails part-way, running the same command again skips the batches
+that already landed.
+
+Usage:
+    ACCESS_TOKEN="<token>" python add-smallducuts.py
+    ACCESS_TOKEN="<token>" python add-smallducuts.py --input catalog.csv
+    ACCESS_TOKEN="<token>" python add-smallducuts.py --input catalog.jsonl --batch-size 1000 --concurrency 8
+    some-generator | ACCESS_TOKEN="<token>" python add-smallducuts.py --input -   # JSONL on stdin
+
+CSV files need a header row with the product fields
+(id,name,brand,emoji,price,category[,quantityInStock]).
+
+Checkpoint:
+    <input>.checkpoint (or --checkpoint PATH) is an append-only JSONL file:
+    one header line with the input and batch size, then one line per batch
+    that the server accepted. It is deleted once every batch has landed.
+    Use --fresh to ignore an existing checkpoint.
+
+Delta sync:
+    ACCESS_TOKEN="<token>" python add-smallducuts.py --delta --dry-run
+    ACCESS_TOKEN="<token>" python add-smallducuts.py --input catalog.csv --delta [--prune]
+
+    Fetches the live restock catalog, hashes each product by id over the
+    fields the source row sets, and sends only new and changed rows. Live
+    products missing from the source are listed as removed; --prune delists
+    them (quantityInStock = 0, which hides them from every listing). A
+    delta run needs no checkpoint: rerunning it only sends what is still
+    different.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
+from baza_client import BazaClient
+
 
 API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000/v1")
 ACCESS_TOKEN = os.getenv("ACCESS_TOKEN", "")
 
+BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+CONCURRENCY = int(os.getenv("IMPORT_CONCURRENCY", "4"))
+RETRIES = 3
+INT_FIELDS = ("price", "quantityInStock")
+
 PRODUCTS = [
     {"id": "i1", "name": "Rolled Oats 1kg", "brand": "Quaker", "emoji": "🌾", "price": 180000, "category": "Grains"},
     {"id": "i2", "name": "Eggs (crate of 30)", "brand": "Farm Fresh", "emoji": "🥚", "price": 280000, "category": "Protein"},
@@ -86,29 +138,278 @@ PRODUCTS = [
 ]
 
 
+# ---------------------------------------------------------------------------
+# Input
+# ---------------------------------------------------------------------------
+def iter_rows(path):
+    """Yield product dicts one at a time from a .csv or JSONL file ("-" = JSONL on stdin)."""
+    if path == "-":
+        yield from _iter_jsonl(sys.stdin)
+        return
+    with open(path, newline="", encoding="utf-8") as fh:
+        if path.lower().endswith(".csv"):
+            for row in csv.DictReader(fh):
+                product = {k: v for k, v in row.items() if k and v not in (None, "")}
+                for field in INT_FIELDS:
+                    if field in product:
+                        product[field] = int(float(product[field]))
+                yield product
+        else:
+            yield from _iter_jsonl(fh)
+
+
+def _iter_jsonl(fh):
+    for line in fh:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_batches(rows, size):
+    """Yield (batch_number, rows) without holding more than one batch in memory."""
+    batch, number = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield number, batch
+            batch, number = [], number + 1
+    if batch:
+        yield number, batch
+
+
+# ---------------------------------------------------------------------------
+# Checkpoint
+# ---------------------------------------------------------------------------
+class Checkpoint:
+    """Append-only record of the batches the server has accepted."""
+
+    def __init__(self, path, source, batch_size, fresh=False):
+        self.path = path
+        self.done = set()
+        self._lock = threading.Lock()
+        header = {"input": source, "batchSize": batch_size}
+
+        if path and os.path.exists(path) and not fresh:
+            with open(path, encoding="utf-8") as fh:
+                lines = [json.loads(line) for line in fh if line.strip()]
+            if lines and lines[0] != header:
+                sys.exit(f"Checkpoint {path} was written for {lines[0]}, not {header}. "
+                         "Use the same --batch-size, another --checkpoint, or --fresh.")
+            self.done = {entry["batch"] for entry in lines[1:]}
+        elif path:
+            with open(path, "w", encoding="utf-8") as fh:
+                fh.write(json.dumps(header) + "\n")
+
+    def mark(self, number, rows):
+        if not self.path:
+            return
+        with self._lock, open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps({"batch": number, "rows": rows}) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def remove(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# ---------------------------------------------------------------------------
+# Delta
+# ---------------------------------------------------------------------------
+def fetch_live(client):
+    """Current restock catalog as {id: row}."""
+    resp = client.products("restock", timeout=120)
+    if resp.status_code != 200:
+        sys.exit(f"Could not fetch the live catalog: {resp.status_code} {resp.text[:200]}")
+    return {row["id"]: row for row in resp.json().get("items", [])}
+
+
+def content_hash(row, fields):
+    return hashlib.sha1(json.dumps([row.get(f) for f in fields], ensure_ascii=False).encode()).hexdigest()
+
+
+def diff_catalog(rows, live):
+    """Split source rows into inserts and changes against ``live``; also return live ids the source lacks."""
+    inserts, changes, unchanged, seen = [], [], 0, set()
+    for row in rows:
+        seen.add(row["id"])
+        current = live.get(row["id"])
+        if current is None and row.get("quantityInStock") == 0:
+            # Listings only return in-stock rows, so a delisted row already matches.
+            unchanged += 1
+            continue
+        if current is None:
+            inserts.append(row)
+            continue
+        fields = sorted(k for k in row if k != "id")
+        if content_hash(row, fields) == content_hash(current, fields):
+            unchanged += 1
+        else:
+            changes.append(row)
+    removed = [live[pid] for pid in live if pid not in seen]
+    return {"inserts": inserts, "changes": changes, "removed": removed, "unchanged": unchanged}
+
+
+def print_diff(diff, live, limit=20):
+    print(f"Delta: {len(diff['inserts']):,} new, {len(diff['changes']):,} changed, "
+          f"{len(diff['removed']):,} removed, {diff['unchanged']:,} unchanged")
+    for row in diff["inserts"][:limit]:
+        print(f"  + {row['id']}  {row.get('name', '')}")
+    for row in diff["changes"][:limit]:
+        current = live[row["id"]]
+        fields = ", ".join(f"{k}: {current.get(k)!r} → {v!r}" for k, v in row.items() if current.get(k) != v)
+        print(f"  ~ {row['id']}  {fields}")
+    for row in diff["removed"][:limit]:
+        print(f"  - {row['id']}  {row.get('name', '')}")
+    hidden = max(0, len(diff["inserts"]) - limit) + max(0, len(diff["changes"]) - limit) \
+        + max(0, len(diff["removed"]) - limit)
+    if hidden:
+        print(f"  … and {hidden:,} more")
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+def send_batch(client, rows, timeout):
+    """POST one batch, retrying connection errors, 429 and 5xx with backoff."""
+    for attempt in range(RETRIES + 1):
+        try:
+            resp = client.import_products(rows, timeout=timeout)
+        except requests.RequestException as e:
+            error = f"{type(e).__name__}: {e}"
+        else:
+            if resp.status_code < 400:
+                try:
+                    return resp.json(), None
+                except ValueError:
+                    return None, f"{resp.status_code} with a non-JSON body: {resp.text[:200]}"
+            error = f"{resp.status_code} {resp.text[:200]}"
+            if resp.status_code != 429 and resp.status_code < 500:
+                break
+        if attempt < RETRIES:
+            time.sleep(2 ** attempt)
+    return None, error
+
+
+def bulk_import(client, rows, checkpoint, batch_size, concurrency, timeout):
+    stats = {"sent": 0, "skipped": 0, "created": 0, "updated": 0, "failed": []}
+    lock = threading.Lock()
+    # At most two batches per worker are parsed and waiting, so memory stays flat.
+    slots = threading.BoundedSemaphore(concurrency * 2)
+    start = time.perf_counter()
+
+    def work(number, batch):
+        try:
+            try:
+                body, error = send_batch(client, batch, timeout)
+            except Exception as e:  # nobody reads the future: an escaped error would lose the batch silently
+                body, error = None, f"{type(e).__name__}: {e}"
+            with lock:
+                if error:
+                    stats["failed"].append((number, error))
+                    print(f"  ✗ batch {number}: {error}")
+                    return
+                checkpoint.mark(number, len(batch))
+                stats["sent"] += len(batch)
+                stats["created"] += body.get("created", 0)
+                stats["updated"] += body.get("updated", 0)
+                rate = stats["sent"] / (time.perf_counter() - start)
+                print(f"  ✓ batch {number}: {len(batch)} rows — {stats['sent']:,} sent, {rate:,.0f} rows/s")
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for number, batch in iter_batches(rows, batch_size):
+            if number in checkpoint.done:
+                stats["skipped"] += len(batch)
+                continue
+            slots.acquire()
+            pool.submit(work, number, batch)
+
+    stats["wall"] = time.perf_counter() - start
+    return stats
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Import restock products into Baza")
+    parser.add_argument("--input", help="CSV or JSONL file of products ('-' for JSONL on stdin); "
+                                        "default: the PRODUCTS list in this file")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per request")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="parallel import requests")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <input>.checkpoint)")
+    parser.add_argument("--fresh", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--timeout", type=float, default=60, help="per-request timeout in seconds")
+    parser.add_argument("--delta", action="store_true", help="send only rows that differ from the live catalog")
+    parser.add_argument("--dry-run", action="store_true", help="with --delta: print the diff and send nothing")
+    parser.add_argument("--prune", action="store_true",
+                        help="with --delta: delist live products that are not in the source")
+    args = parser.parse_args()
+
     if not ACCESS_TOKEN:
         print("Set ACCESS_TOKEN in your environment before running this script.")
         print("Example:")
         print('  ACCESS_TOKEN="<token>" python add-smallducuts.py')
         sys.exit(1)
 
-    endpoint = f"{API_BASE_URL.rstrip('/')}/products/import-smallproducts"
-    headers = {
-        "Authorization": f"Bearer {ACCESS_TOKEN}",
-        "Content-Type": "application/json",
-    }
+    client = BazaClient(API_BASE_URL, token=ACCESS_TOKEN, pool_maxsize=args.concurrency)
+
+    if args.delta or args.dry_run:
+        run_delta(client, args)
+        return
+
+    if not args.input:
+        response = client.import_products(PRODUCTS, timeout=args.timeout)
+        try:
+            payload = response.json()
+        except Exception:
+            payload = {"raw": response.text}
+
+        print("status:", response.status_code)
+        print("response:", payload)
+
+        if response.status_code >= 400:
+            sys.exit(1)
+        return
+
+    checkpoint_path = args.checkpoint or (None if args.input == "-" else f"{args.input}.checkpoint")
+    checkpoint = Checkpoint(checkpoint_path, args.input, args.batch_size, fresh=args.fresh)
+    if checkpoint.done:
+        print(f"Resuming from {checkpoint_path}: {len(checkpoint.done)} batches already imported")
+
+    print(f"Importing {args.input} in batches of {args.batch_size} ({args.concurrency} in flight)")
+    stats = bulk_import(client, iter_rows(args.input), checkpoint, args.batch_size, args.concurrency, args.timeout)
+
+    rate = stats["sent"] / stats["wall"] if stats["wall"] > 0 else 0.0
+    print(f"\nSent {stats['sent']:,} rows ({stats['created']:,} created, {stats['updated']:,} updated) "
+          f"in {stats['wall']:.1f}s — {rate:,.0f} rows/s")
+    if stats["skipped"]:
+        print(f"Skipped {stats['skipped']:,} rows already imported by an earlier run")
+
+    if stats["failed"]:
+        print(f"{len(stats['failed'])} batches failed; run the same command again to retry only those.")
+        sys.exit(1)
+    checkpoint.remove()
+
 
-    response = requests.post(endpoint, json={"products": PRODUCTS}, headers=headers, timeout=60)
-    try:
-        payload = response.json()
-    except Exception:
-        payload = {"raw": response.text}
+def run_delta(client, args):
+    live = fetch_live(client)
+    diff = diff_catalog(iter_rows(args.input) if args.input else PRODUCTS, live)
+    print_diff(diff, live)
 
-    print("status:", response.status_code)
-    print("response:", payload)
+    rows = diff["inserts"] + diff["changes"]
+    if args.prune:
+        rows += [dict(row, quantityInStock=0) for row in diff["removed"]]
+    elif diff["removed"]:
+        print("Removed rows are left alone; pass --prune to delist them.")
+    if args.dry_run or not rows:
+        return
 
-    if response.status_code >= 400:
+    stats = bulk_import(client, iter(rows), Checkpoint(None, None, args.batch_size),
+                        args.batch_size, args.concurrency, args.timeout)
+    rate = stats["sent"] / stats["wall"] if stats["wall"] > 0 else 0.0
+    print(f"\nSent {stats['sent']:,} of {len(rows):,} delta rows in {stats['wall']:.1f}s — {rate:,.0f} rows/s")
+    if stats["failed"]:
+        print(f"{len(stats['failed'])} batches failed; run the same command again to resend what is still different.")
         sys.exit(1)
 
 
@@ -0,0 +1,264 @@
+"""
+baza_client.py — Shared pooled HTTP client for the Baza scripts
+===============================================================
+
+Every script talks to the API through BazaClient so that:
+
+  * connections are kept alive in a urllib3 pool (size configurable), so TLS
+    handshakes happen once per connection instead of once per request and
+    high-concurrency runs do not exhaust local sockets;
+  * the bearer token is attached automatically, and a 401 on a protected
+    route triggers one /auth/refresh (using the baza_refresh cookie) and a
+    retry;
+  * every request is timed by http_timing.TimedSession.
+
+Usage:
+    from baza_client import BazaClient
+
+    client = BazaClient("http://localhost:8000", pool_maxsize=50)
+    client.login("+2348012345678", "1111")
+    resp = client.wallet_balance()
+
+Helpers return the raw requests.Response so callers keep full control over
+status-code handling. The base URL may be given with or without the /v1
+suffix; paths are relative to /v1.
+"""
+
+import os
+import threading
+
+from http_timing import TimedSession
+
+BASE_URL = os.getenv("BASE_URL", "https://baza-chi.vercel.app").rstrip("/")
+POOL_SIZE = int(os.getenv("BAZA_POOL_SIZE", "10"))
+DEFAULT_TIMEOUT = 30
+
+_NO_REFRESH = ("/auth/otp-request", "/auth/otp-verify", "/auth/refresh", "/auth/logout")
+
+
+class BazaClient:
+    def __init__(
+        self,
+        base_url=BASE_URL,
+        token=None,
+        pool_connections=POOL_SIZE,
+        pool_maxsize=POOL_SIZE,
+        pool_block=False,
+        timeout=DEFAULT_TIMEOUT,
+        timing_log=None,
+        auto_refresh=True,
+    ):
+        base = base_url.rstrip("/")
+        if base.endswith("/v1"):
+            base = base[: -len("/v1")]
+        self.base_url = base
+        self.api = f"{base}/v1"
+        self.access_token = token
+        self.timeout = timeout
+        self.auto_refresh = auto_refresh
+        self.session = TimedSession(timing_log, pool_connections, pool_maxsize, pool_block)
+        self._refresh_lock = threading.Lock()
+
+    # -----------------------------------------------------------------------
+    # Core
+    # -----------------------------------------------------------------------
+    def headers(self, token=None):
+        h = {"Content-Type": "application/json"}
+        token = token or self.access_token
+        if token:
+            h["Authorization"] = f"Bearer {token}"
+        return h
+
+    def request(self, method, path, token=None, headers=None, **kwargs):
+        """Send ``method`` to ``/v1{path}``; ``token`` overrides the client token for this call."""
+        kwargs.setdefault("timeout", self.timeout)
+        h = self.headers(token)
+        if headers:
+            h.update(headers)
+        resp = self.session.request(method, f"{self.api}{path}", headers=h, **kwargs)
+
+        if (
+            resp.status_code == 401
+            and self.auto_refresh
+            and token is None
+            and path not in _NO_REFRESH
+            and self.session.cookies.get("baza_refresh")
+        ):
+            used = h.get("Authorization")
+            with self._refresh_lock:
+                # Another thread may already have refreshed while we waited.
+                if self.headers().get("Authorization") == used:
+                    self.refresh()
+            h.update(self.headers())
+            resp = self.session.request(method, f"{self.api}{path}", headers=h, **kwargs)
+        return resp
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request("PATCH", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    # -----------------------------------------------------------------------
+    # Auth
+    # -----------------------------------------------------------------------
+    def request_otp(self, phone, intent=None):
+        body = {"phone": phone}
+        if intent:
+            body["intent"] = intent
+        return self.post("/auth/otp-request", json=body)
+
+    def verify_otp(self, phone, otp, name=None, referral_code=None):
+        body = {"phone": phone, "otp": otp}
+        if name:
+            body["name"] = name
+        if referral_code:
+            body["referralCode"] = referral_code
+        resp = self.post("/auth/otp-verify", json=body)
+        if resp.status_code == 200:
+            self.access_token = resp.json().get("accessToken") or self.access_token
+        return resp
+
+    def login(self, phone, otp, name="Test User"):
+        """otp-request + otp-verify; returns the access token or raises RuntimeError."""
+        resp = self.request_otp(phone)
+        if resp.status_code != 200:
+            raise RuntimeError(f"otp-request failed: {resp.status_code} {resp.text[:200]}")
+        resp = self.verify_otp(phone, otp, name=name)
+        if resp.status_code != 200 or not self.access_token:
+            raise RuntimeError(f"otp-verify failed: {resp.status_code} {resp.text[:200]}")
+        return self.access_token
+
+    def refresh(self):
+        resp = self.post("/auth/refresh")
+        if resp.status_code == 200:
+            self.access_token = resp.json().get("accessToken", self.access_token)
+        return resp
+
+    def logout(self):
+        return self.post("/auth/logout")
+
+    # -----------------------------------------------------------------------
+    # User & addresses
+    # -----------------------------------------------------------------------
+    def me(self):
+        return self.get("/user/me")
+
+    def update_profile(self, **fields):
+        return self.put("/user/profile", json=fields)
+
+    def update_notifications(self, **prefs):
+        return self.put("/user/notifications", json=prefs)
+
+    def addresses(self):
+        return self.get("/user/addresses/")
+
+    def create_address(self, label, address, landmark=""):
+        return self.post("/user/addresses/create", json={"label": label, "address": address, "landmark": landmark})
+
+    def update_address(self, address_id, **fields):
+        return self.put(f"/user/addresses/{address_id}", json=fields)
+
+    def set_default_address(self, address_id):
+        return self.patch(f"/user/addresses/{address_id}/default")
+
+    def delete_address(self, address_id):
+        return self.delete(f"/user/addresses/{address_id}/delete")
+
+    # -----------------------------------------------------------------------
+    # Products
+    # -----------------------------------------------------------------------
+    def products(self, kind, **params):
+        """kind is one of bundles, mealpacks, readyeat, snacks, restock."""
+        return self.get(f"/products/{kind}", params=params or None)
+
+    def catalog(self):
+        return self.get("/products/catalog")
+
+    def import_products(self, rows, **kwargs):
+        return self.post("/products/import-smallproducts", json={"products": rows}, **kwargs)
+
+    # -----------------------------------------------------------------------
+    # Orders
+    # -----------------------------------------------------------------------
+    def create_order(self, items, total, **fields):
+        return self.post("/orders/create", json={"items": items, "total": total, **fields})
+
+    def orders(self, page=1, limit=20, status=None):
+        params = {"page": page, "limit": limit}
+        if status:
+            params["status"] = status
+        return self.get("/orders/", params=params)
+
+    def order(self, order_id):
+        return self.get(f"/orders/{order_id}")
+
+    def verify_order_payment(self, reference, order_id=None):
+        params = {"reference": reference}
+        if order_id:
+            params["orderId"] = order_id
+        return self.get("/orders/verify-payment", params=params)
+
+    # -----------------------------------------------------------------------
+    # Wallet
+    # -----------------------------------------------------------------------
+    def paystack_config(self):
+        return self.get("/wallet/paystack-config")
+
+    def wallet_balance(self):
+        return self.get("/wallet/balance")
+
+    def wallet_account(self):
+        return self.get("/wallet/account")
+
+    def wallet_transactions(self, page=1, limit=20):
+        return self.get("/wallet/transactions", params={"page": page, "limit": limit})
+
+    def topup(self, amount, callback_url=None):
+        body = {"amount": amount}
+        if callback_url:
+            body["callbackUrl"] = callback_url
+        return self.post("/wallet/topup", json=body)
+
+    def verify_topup(self, reference):
+        return self.get("/wallet/verify-topup", params={"reference": reference})
+
+    # -----------------------------------------------------------------------
+    # Referral, support & AI
+    # -----------------------------------------------------------------------
+    def referral_stats(self):
+        return self.get("/referral/stats")
+
+    def support_thread(self):
+        return self.get("/support/thread")
+
+    def support_message(self, text):
+        return self.post("/support/message", json={"text": text})
+
+    def ai_suggestions(self):
+        return self.get("/ai/suggestions")
+
+    def ai_sessions(self):
+        return self.get("/ai/sessions")
+
+    def ai_create_session(self, title):
+        return self.post("/ai/sessions", json={"title": title})
+
+    def ai_chat(self, session_id, message, **kwargs):
+        return self.post("/ai/chat", json={"sessionId": session_id, "message": message}, **kwargs)
+
+    def ai_history(self, session_id):
+        return self.get("/ai/history", params={"sessionId": session_id})
+
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+catalog_storm.py — Catalog reads while a restock import runs
+============================================================
+
+Product views cache their responses in Redis for 120s, and the product save
+signal clears that cache for every saved row. A mid-day add-smallducuts.py
+import therefore empties the cache hundreds of times while shoppers browse.
+This script reproduces that: reader threads poll /products/catalog and
+/products/restock the whole time, and after a quiet warm-up one importer
+re-imports a block of marker products (ids storm-0000…) every few seconds,
+bumping their price each time. The last row of the block marks the import
+as landed: once the import has returned, every read should show its new
+price. It then reports:
+
+    latency      per endpoint before, during and after the import
+    timeline     reads, cache hit ratio, p50/p99 and stale reads per bucket
+    staleness    how long after each import finished readers still got the
+                 previous price (the read/set race can pin an old body in the
+                 cache until the TTL expires)
+
+A read counts as a cache hit when the response says X-Cache: HIT, or, when
+the backend sends no X-Cache header, when its Server-Timing handler time is
+under --hit-ms.
+
+ResponseCacheMiddleware keeps every GET per user for 5s, in front of the
+view cache. A read less than 5s after the same user's last read of the same
+endpoint may come from that window instead of the product cache. Such reads
+are left out of the hit ratio, timeline and staleness figures. With
+--token-pool, readers spread their reads round-robin over every user in
+the pool. Once there are more users than reads per 5s, no read falls in a
+window. With ACCESS_TOKEN alone, nearly every read does; when more than half
+of the reads fall in a window, hit ratio and staleness are reported as not
+measured and the run fails.
+
+Usage:
+    ACCESS_TOKEN="<token>" python catalog_storm.py
+    ACCESS_TOKEN="<token>" python catalog_storm.py --readers 200 --rows 500 --interval 5 --duration 60
+    ACCESS_TOKEN="<token>" python catalog_storm.py --warmup 20 --cooldown 150 --bucket 10   # see the TTL tail
+    ACCESS_TOKEN="<admin token>" python catalog_storm.py --token-pool .token_pool.json --readers 20
+
+The marker products are delisted (quantityInStock 0) at the end; --keep
+leaves them in the catalog.
+"""
+
+import argparse
+import bisect
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from baza_client import BazaClient
+from http_timing import cache_hit
+from loadstats import LatencyRecorder, percentile
+from token_pool import TokenPool
+
+
+API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000/v1")
+ACCESS_TOKEN = os.getenv("ACCESS_TOKEN", "")
+
+READERS = int(os.getenv("STORM_READERS", "50"))
+HIT_MS = 20.0
+RESPONSE_WINDOW = 5.0  # ResponseCacheMiddleware TTL: per user and URL
+WINDOWED_LIMIT = 0.5  # share of windowed reads above which the cache figures are not measured
+MARKER_PRICE = 100000  # marker price = MARKER_PRICE + import generation
+ENDPOINTS = {"catalog": "/products/catalog", "restock": "/products/restock"}
+
+
+def storm_rows(count, generation, in_stock=True):
+    return [
+        {"id": f"storm-{k:04d}", "name": f"Storm test {k}", "brand": "Baza", "emoji": "🌪️",
+         "price": MARKER_PRICE + generation, "category": "Storm test", "quantityInStock": 1 if in_stock else 0}
+        for k in range(count)
+    ]
+
+
+def visible_generation(body, endpoint, marker_id):
+    """Generation of the marker product in a response, or -1 when it is not listed."""
+    items = body["catalog"]["restock"]["items"] if endpoint == "catalog" else body["items"]
+    for item in items:
+        if item["id"] == marker_id:
+            return item["price"] - MARKER_PRICE
+    return -1
+
+
+# ---------------------------------------------------------------------------
+# Workload
+# ---------------------------------------------------------------------------
+class Storm:
+    def __init__(self, client, rows, hit_ms, catalog_share, pool=None):
+        self.client = client
+        self.pool = pool  # readers draw users from it; without one they all read as ACCESS_TOKEN
+        self.rows = rows
+        self.marker_id = storm_rows(rows, 0)[-1]["id"]
+        self.hit_ms = hit_ms
+        self.catalog_share = catalog_share
+        self.reads = []  # (start, end, endpoint, hit, generation, ok, inside a response-cache window)
+        self.last_read = {}  # (user, endpoint) -> start of that user's previous read
+        self.writes = []  # (generation, start, done, ok)
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.recorder = LatencyRecorder()
+        self.import_window = (float("inf"), float("inf"))
+
+    def phase(self, at):
+        begin, end = self.import_window
+        return "before" if at < begin else "during" if at <= end else "after"
+
+    def read_loop(self, seed):
+        rng = random.Random(seed)
+        while not self.stop.is_set():
+            endpoint = "catalog" if rng.random() < self.catalog_share else "restock"
+            user = self.pool.draw() if self.pool else None
+            start = time.perf_counter()
+            with self.lock:
+                windowed = start - self.last_read.get((user, endpoint), float("-inf")) < RESPONSE_WINDOW
+                self.last_read[(user, endpoint)] = start
+            try:
+                token = self.pool.token(user) if user else None
+                resp = self.client.get(ENDPOINTS[endpoint], token=token)
+                end = start + resp.timing.total_ms / 1000  # without the JSON parse below
+                ok = resp.status_code == 200
+                generation = visible_generation(resp.json(), endpoint, self.marker_id) if ok else None
+                hit = ok and cache_hit(resp, self.hit_ms)
+            except (requests.RequestException, ValueError, KeyError):
+                end = time.perf_counter()
+                ok, generation, hit = False, None, False
+            phase = "response-cache window" if windowed else self.phase(start)
+            self.recorder.record(f"{endpoint} ({phase})", end - start, ok=ok)
+            with self.lock:
+                self.reads.append((start, end, endpoint, hit, generation, ok, windowed))
+
+    def write(self, generation, in_stock=True):
+        start = time.perf_counter()
+        try:
+            ok = self.client.import_products(storm_rows(self.rows, generation, in_stock), timeout=120).ok
+        except requests.RequestException:
+            ok = False
+        done = time.perf_counter()
+        self.recorder.record(f"import ({self.rows} rows)", done - start, ok=ok)
+        with self.lock:
+            self.writes.append((generation, start, done, ok))
+        return ok
+
+    def import_loop(self, interval, duration):
+        start = time.perf_counter()
+        self.import_window = (start, float("inf"))
+        generation = 0
+        while time.perf_counter() - start < duration:
+            generation += 1
+            began = time.perf_counter()
+            self.write(generation)
+            time.sleep(max(0.0, interval - (time.perf_counter() - began)))
+        self.import_window = (start, time.perf_counter())
+
+
+# ---------------------------------------------------------------------------
+# Analysis
+# ---------------------------------------------------------------------------
+def staleness(reads, writes):
+    """Stale reads and, per import, how long after it finished readers still saw older data.
+
+    The generation 0 seed write lands before the reads start; it is not an import and gets no window.
+    """
+    landed = sorted((done, generation) for generation, _, done, ok in writes if ok)
+    done_at = [done for done, _ in landed]
+    windows = {generation: 0.0 for _, generation in landed if generation}
+    stale = []  # (read start, age in s)
+    for start, _, _, _, seen, ok, _ in reads:
+        index = bisect.bisect_right(done_at, start)
+        if not ok or index == 0 or seen is None:
+            continue
+        expected = landed[index - 1][1]
+        if seen >= expected:
+            continue
+        # Oldest import this read should already have reflected.
+        first_missed = next(i for i in range(index) if landed[i][1] > seen)
+        stale.append((start, start - done_at[first_missed]))
+        for done, generation in landed[first_missed:index]:
+            if generation:
+                windows[generation] = max(windows[generation], start - done)
+    return stale, windows
+
+
+def print_timeline(storm, reads, origin, bucket, stale):
+    stale_starts = sorted(start for start, _ in stale)
+    print(f"\n  {'t (s)':>7}  {'phase':<7} {'reads':>6}  {'hit %':>6}  {'p50 ms':>7}  {'p99 ms':>7}  "
+          f"{'stale %':>7}  imports")
+    end = max(r[1] for r in reads)
+    t = origin
+    while t < end:
+        rows = [r for r in reads if t <= r[0] < t + bucket and r[5]]
+        if rows:
+            latencies = sorted(r[1] - r[0] for r in rows)
+            hits = sum(1 for r in rows if r[3])
+            stale_count = bisect.bisect_left(stale_starts, t + bucket) - bisect.bisect_left(stale_starts, t)
+            imports = sum(1 for w in storm.writes if t <= w[2] < t + bucket)
+            print(f"  {t - origin:>7.0f}  {storm.phase(t):<7} {len(rows):>6}  {hits / len(rows) * 100:>6.1f}  "
+                  f"{percentile(latencies, 50) * 1000:>7.1f}  {percentile(latencies, 99) * 1000:>7.1f}  "
+                  f"{stale_count / len(rows) * 100:>7.1f}  {'▮' * imports}")
+        t += bucket
+
+
+def report(storm, origin, bucket):
+    wall = max(r[1] for r in storm.reads) - origin
+    storm.recorder.print_report(wall, title="Catalog reads and imports")
+
+    # Reads inside a user's response-cache window say nothing about the product cache.
+    reads = [r for r in storm.reads if not r[6]]
+    windowed = len(storm.reads) - len(reads)
+    if windowed:
+        print(f"\n  {windowed:,}/{len(storm.reads):,} reads came less than {RESPONSE_WINDOW:g}s after the same "
+              "user's previous read and are left out below (ResponseCacheMiddleware could answer them)")
+    if windowed > len(storm.reads) * WINDOWED_LIMIT:
+        print(f"  ❌ More than {WINDOWED_LIMIT:.0%} of the reads fell inside a response-cache window: hit ratio "
+              "and staleness not measured. Spread the readers over more users (--token-pool)")
+        return False
+    stale, windows = staleness(reads, storm.writes)
+    print_timeline(storm, reads, origin, bucket, stale)
+
+    summary = storm.recorder.summary()
+    print()
+    for endpoint in ENDPOINTS:
+        before, during = summary.get(f"{endpoint} (before)"), summary.get(f"{endpoint} (during)")
+        if before and during and before["p99"]:
+            print(f"  {endpoint}: p99 {before['p99']:.1f} → {during['p99']:.1f} ms during the import "
+                  f"(x{during['p99'] / before['p99']:.1f})")
+
+    for phase in ("before", "during", "after"):
+        rows = [r for r in reads if r[5] and storm.phase(r[0]) == phase]
+        if rows:
+            print(f"  Cache hit ratio {phase:<6}: {sum(1 for r in rows if r[3]) / len(rows) * 100:5.1f}% "
+                  f"of {len(rows):,} reads")
+
+    ok_reads = sum(1 for r in reads if r[5])
+    failed = sum(1 for r in storm.reads if not r[5])
+    ages = sorted(age for _, age in stale)
+    spans = sorted(windows.values())
+    print(f"\n  Stale reads: {len(stale):,}/{ok_reads:,} ({len(stale) / max(ok_reads, 1) * 100:.2f}%)"
+          + (f", {failed:,} reads failed" if failed else ""))
+    if spans:
+        print(f"  Stale window per import: p50 {percentile(spans, 50) * 1000:.0f} ms, "
+              f"p95 {percentile(spans, 95) * 1000:.0f} ms, max {spans[-1]:.1f} s "
+              f"({sum(1 for s in spans if s > 0)}/{len(spans)} imports served stale data)")
+    if ages:
+        print(f"  Oldest data served: {ages[-1]:.1f} s after the import that replaced it landed")
+    if storm.writes and windows and max(windows.values()) > 0:
+        last_done, last_generation = max((w[2], w[0]) for w in storm.writes if w[3])
+        tail = [r for r in reads if r[5] and r[0] > last_done and r[4] is not None]
+        if tail and tail[-1][4] < last_generation:
+            print(f"  ⚠️  Readers still saw generation {tail[-1][4]} (< {last_generation}) at the end of the run: "
+                  "an old body is pinned in the cache until its TTL expires")
+    return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog read latency, cache hit ratio and staleness during imports")
+    parser.add_argument("--readers", type=int, default=READERS, help="reader threads polling the catalog")
+    parser.add_argument("--catalog-share", type=float, default=0.5,
+                        help="share of reads that go to /products/catalog (the rest hit /products/restock)")
+    parser.add_argument("--rows", type=int, default=200, help="marker products re-imported per import")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between imports")
+    parser.add_argument("--warmup", type=float, default=10.0, help="seconds of reads before the first import")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds the importer runs")
+    parser.add_argument("--cooldown", type=float, default=15.0, help="seconds of reads after the last import")
+    parser.add_argument("--bucket", type=float, default=2.0, help="timeline bucket in seconds")
+    parser.add_argument("--hit-ms", type=float, default=HIT_MS,
+                        help="handler time under which a read counts as a hit when there is no X-Cache header")
+    parser.add_argument("--keep", action="store_true", help="leave the marker products listed afterwards")
+    parser.add_argument("--token-pool", metavar="PATH",
+                        help="spread reads round-robin over the users of a token_pool.py file")
+    args = parser.parse_args()
+
+    if not ACCESS_TOKEN:
+        sys.exit("Set ACCESS_TOKEN (imports need an authenticated user).")
+    client = BazaClient(API_BASE_URL, token=ACCESS_TOKEN, pool_maxsize=args.readers + 2, auto_refresh=False)
+    pool = TokenPool.load(args.token_pool, API_BASE_URL.removesuffix("/v1")) if args.token_pool else None
+    storm = Storm(client, args.rows, args.hit_ms, args.catalog_share, pool)
+
+    print(f"🌪️  Catalog storm against {API_BASE_URL}: {args.readers} readers "
+          f"({f'{len(pool):,} users' if pool else 'one user'}), {args.rows} rows every {args.interval:g}s for "
+          f"{args.duration:g}s (warm-up {args.warmup:g}s, cool-down {args.cooldown:g}s)")
+    if not pool:
+        print(f"  ⚠️  Without --token-pool nearly every read repeats within {RESPONSE_WINDOW:g}s for the one user; "
+              "hit ratio and staleness will not be measured")
+    if not storm.write(0):
+        sys.exit("Seeding the marker products failed; check ACCESS_TOKEN and the import endpoint.")
+
+    origin = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.readers) as pool:
+        for n in range(args.readers):
+            pool.submit(storm.read_loop, n)
+        time.sleep(args.warmup)
+        print("  📦 Importing…")
+        storm.import_loop(args.interval, args.duration)
+        print(f"  ✓ {len(storm.writes) - 1} imports done; cooling down")
+        time.sleep(args.cooldown)
+        storm.stop.set()
+
+    ok = report(storm, origin, args.bucket)
+    if not args.keep:
+        client.import_products(storm_rows(args.rows, 0, in_stock=False), timeout=120)
+        print(f"\n🧹 Delisted {args.rows} storm-* marker products")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+dva_backfill.py — Bulk DVA provisioning against Paystack
+========================================================
+
+provision_dvas walks users one at a time with a fixed --delay. This harness
+runs the same two-step flow (POST /customer, then POST /dedicated_account)
+for a whole user base with many requests in flight. The request rate adapts
+to the provider: it climbs about 10% per second while calls succeed, and
+drops to 70% (after waiting out Retry-After) whenever Paystack answers 429. At the end it reports
+provisioned users per minute and the latency of each step and of the full
+customer→DVA round trip.
+
+Usage:
+    # Stand-in that throttles at 50 req/s
+    python paystack_mock.py --port 8100 --profile fast --rate-limit 50
+    python dva_backfill.py --users 5000 --concurrency 64
+
+    # Real user export (JSONL: id, email, first_name, last_name, phone), resumable
+    PAYSTACK_BASE_URL=http://127.0.0.1:8100 python dva_backfill.py \\
+        --input users.jsonl --out dvas.jsonl --rate 20 --max-rate 100
+
+--out gets one JSONL line per provisioned user (id, email, customer_code,
+account_number, account_name, bank) — the paystack_dva_* fields to write
+back. Users already in --out are skipped, so an interrupted run resumes.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from loadstats import LatencyRecorder
+from paystack_webhooks import PAYSTACK_SECRET_KEY
+
+PAYSTACK_BASE_URL = os.getenv("PAYSTACK_BASE_URL", "http://127.0.0.1:8100")
+PREFERRED_BANK = os.getenv("PAYSTACK_DVA_PREFERRED_BANK", "test-bank")
+
+RETRIES = 6
+MAX_BACKOFF = 30
+MIN_RATE = 1.0
+INCREASE = 0.1  # rate grows ~10% per second of clean calls
+DECREASE = 0.7  # and drops to 70% on a 429 (once per Retry-After window)
+
+
+# ---------------------------------------------------------------------------
+# Adaptive rate
+# ---------------------------------------------------------------------------
+class AdaptiveRate:
+    """Grow the rate while calls succeed, back off multiplicatively on 429.
+
+    Every request already in flight when the limit is hit comes back 429
+    too, so the rate is cut at most once per Retry-After window; otherwise a
+    single burst would drive it to the floor.
+    """
+
+    def __init__(self, rate, max_rate):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.next_slot = time.monotonic()
+        self.lowest = rate
+        self.highest = rate
+        self.throttled = 0
+        self.cut_until = 0.0
+
+    async def acquire(self):
+        # Single event loop: no lock needed between reading and moving next_slot.
+        now = time.monotonic()
+        slot = max(now, self.next_slot)
+        self.next_slot = slot + 1 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def success(self):
+        self.rate = min(self.max_rate, self.rate + INCREASE)
+        self.highest = max(self.highest, self.rate)
+
+    def limited(self, retry_after):
+        self.throttled += 1
+        now = time.monotonic()
+        if now >= self.cut_until:
+            self.rate = max(MIN_RATE, self.rate * DECREASE)
+            self.lowest = min(self.lowest, self.rate)
+            self.cut_until = now + retry_after
+        self.next_slot = max(self.next_slot, now + retry_after)
+
+
+# ---------------------------------------------------------------------------
+# Users
+# ---------------------------------------------------------------------------
+def synthetic_users(count, start=0):
+    for n in range(start, start + count):
+        yield {"id": f"backfill-{n}", "email": f"backfill{n}@seed.baza.ng", "first_name": "Backfill",
+               "last_name": f"User{n}", "phone": f"+234800{n:07d}"}
+
+
+def read_users(path):
+    with (sys.stdin if path == "-" else open(path, encoding="utf-8")) as fh:
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
+
+
+def already_done(path):
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as fh:
+        return {json.loads(line)["id"] for line in fh if line.strip()}
+
+
+# ---------------------------------------------------------------------------
+# Provisioning
+# ---------------------------------------------------------------------------
+class Backfill:
+    def __init__(self, base_url, secret, rate, max_rate, concurrency, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.limiter = AdaptiveRate(rate, max_rate)
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Bearer {secret}", "Content-Type": "application/json"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.recorder = LatencyRecorder()
+        self.retries = 0
+
+    async def call(self, label, path, body):
+        """POST with the shared rate; 429 waits Retry-After, 5xx/connection errors back off."""
+        error = ""
+        for attempt in range(RETRIES + 1):
+            await self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                resp = await asyncio.to_thread(self.session.post, f"{self.base_url}{path}", json=body,
+                                               timeout=self.timeout)
+            except requests.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                elapsed = time.perf_counter() - start
+                if resp.status_code < 300:
+                    self.recorder.record(label, elapsed)
+                    self.limiter.success()
+                    return resp.json()["data"], None
+                error = f"{resp.status_code} {resp.text[:120]}"
+                if resp.status_code == 429:
+                    self.limiter.limited(float(resp.headers.get("Retry-After") or 1))
+                    self.retries += 1
+                    continue
+                self.recorder.record(label, elapsed, ok=False)
+                if resp.status_code < 500:
+                    return None, error
+            self.retries += 1
+            await asyncio.sleep(min(MAX_BACKOFF, 2 ** attempt) * random.uniform(0.5, 1.0))
+        return None, f"gave up: {error}"
+
+    async def provision(self, user):
+        start = time.perf_counter()
+        customer, error = await self.call("POST /customer", "/customer", {
+            key: user[key] for key in ("email", "first_name", "last_name", "phone") if user.get(key)})
+        if error:
+            return None, f"customer: {error}"
+        account, error = await self.call("POST /dedicated_account", "/dedicated_account", {
+            "customer": customer["customer_code"], "preferred_bank": PREFERRED_BANK})
+        if error:
+            return None, f"dedicated_account: {error}"
+        self.recorder.record("customer→DVA", time.perf_counter() - start)
+        return {
+            "id": user["id"],
+            "email": user["email"],
+            "customer_code": customer["customer_code"],
+            "account_number": account["account_number"],
+            "account_name": account["account_name"],
+            "bank": account["bank"]["name"],
+        }, None
+
+
+async def run(backfill, users, concurrency, out):
+    # to_thread's default pool is sized for the CPU count; give every in-flight user a thread.
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    stats = {"provisioned": 0, "failed": []}
+    start = time.perf_counter()
+
+    async def worker():
+        while True:
+            user = await queue.get()
+            if user is None:
+                return
+            result, error = await backfill.provision(user)
+            if error:
+                stats["failed"].append((user["id"], error))
+                continue
+            stats["provisioned"] += 1
+            if out:
+                out.write(json.dumps(result) + "\n")
+            if stats["provisioned"] % 500 == 0:
+                minutes = (time.perf_counter() - start) / 60
+                print(f"  … {stats['provisioned']:,} provisioned ({stats['provisioned'] / minutes:,.0f}/min, "
+                      f"rate {backfill.limiter.rate:.1f} req/s, {backfill.limiter.throttled} × 429)")
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    for user in users:
+        await queue.put(user)  # blocks while the queue is full, so the input stays a stream
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+    stats["wall"] = time.perf_counter() - start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provision Paystack DVAs for many users at once")
+    parser.add_argument("--users", type=int, default=1000, help="synthetic users to provision (without --input)")
+    parser.add_argument("--input", help="JSONL users (id, email, first_name, last_name, phone); '-' for stdin")
+    parser.add_argument("--out", help="append provisioned users here (JSONL); users already in it are skipped")
+    parser.add_argument("--concurrency", type=int, default=32, help="users in flight")
+    parser.add_argument("--rate", type=float, default=10, help="starting Paystack requests per second")
+    parser.add_argument("--max-rate", type=float, default=200, help="ceiling for the adaptive rate")
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    parser.add_argument("--base-url", default=PAYSTACK_BASE_URL, help="Paystack API base URL")
+    args = parser.parse_args()
+
+    done = already_done(args.out)
+    users = read_users(args.input) if args.input else synthetic_users(args.users)
+    users = (user for user in users if user["id"] not in done)
+    backfill = Backfill(args.base_url, PAYSTACK_SECRET_KEY, args.rate, args.max_rate, args.concurrency,
+                        args.timeout)
+
+    print(f"🏦 Provisioning DVAs via {args.base_url} — {args.concurrency} in flight, "
+          f"rate {args.rate:g}→≤{args.max_rate:g} req/s" + (f", skipping {len(done):,} done" if done else ""))
+    out = open(args.out, "a", encoding="utf-8") if args.out else None
+    try:
+        stats = asyncio.run(run(backfill, users, args.concurrency, out))
+    finally:
+        if out:
+            out.close()
+
+    backfill.recorder.print_report(stats["wall"], title="DVA provisioning latency")
+    limiter = backfill.limiter
+    print(f"  ✅ {stats['provisioned']:,} provisioned in {stats['wall']:.1f}s — "
+          f"{stats['provisioned'] / stats['wall'] * 60:,.0f} users/min")
+    print(f"  Rate: {limiter.lowest:.1f}–{limiter.highest:.1f} req/s (ended at {limiter.rate:.1f}), "
+          f"{limiter.throttled:,} × 429, {backfill.retries:,} retries")
+    if stats["failed"]:
+        print(f"  ❌ {len(stats['failed']):,} failed:")
+        for user_id, error in stats["failed"][:10]:
+            print(f"    - {user_id}: {error}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
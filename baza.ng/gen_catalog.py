@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+gen_catalog.py — Synthetic restock catalog for scale testing
+=============================================================
+
+Builds catalogs of any size (10k to 1M+ rows) from the categories, brands and
+price bands of the PRODUCTS list in add-smallducuts.py. Category sizes follow
+a Zipf curve (a few big aisles, a long tail), about 5% of rows are out of
+stock, and the same --seed always produces the same rows. Rows are written
+one at a time, so memory stays flat no matter how large the catalog is, and
+a larger catalog always starts with the rows of a smaller one.
+
+Usage:
+    python gen_catalog.py --rows 100000 --out catalog.jsonl
+    python gen_catalog.py --rows 50000 --format csv --out catalog.csv
+    python gen_catalog.py --rows 100000 | ACCESS_TOKEN="<token>" python add-smallducuts.py --input -
+
+Scale sweep:
+    ACCESS_TOKEN="<admin token>" API_BASE_URL=http://127.0.0.1:8000/v1 \\
+        python gen_catalog.py --sweep 10000,100000,1000000 --sweep-out sweep.csv
+
+    Imports the catalog in steps (only the new rows each time) and after each
+    step times /products/restock (plain, ?category= and ?q=) and
+    /products/catalog, recording p50/p95 latency and payload size per size.
+    The CSV is ready to plot.
+
+    The import has just cleared the product cache, so the first read of each
+    endpoint is reported on its own as cold_ms. The repeated reads carry a
+    throwaway query parameter, so neither ResponseCacheMiddleware nor the
+    URL-keyed product view cache can answer them. The hits column counts the
+    ones that were served from a cache anyway.
+"""
+
+import argparse
+import csv
+import importlib.util
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+from baza_client import BazaClient
+from http_timing import cache_hit
+from loadstats import percentile
+
+API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000/v1")
+ACCESS_TOKEN = os.getenv("ACCESS_TOKEN", "")
+
+FIELDS = ["id", "name", "brand", "emoji", "price", "category", "quantityInStock"]
+VARIANTS = ["", "Mini", "Value Pack", "Family Size", "Premium", "×2", "×3", "×6", "Carton", "Bulk"]
+OUT_OF_STOCK = 0.05
+SWEEP_REQUESTS = 10
+
+
+def load_importer():
+    """add-smallducuts.py has a dash in its name, so load it by path."""
+    path = Path(__file__).with_name("add-smallducuts.py")
+    spec = importlib.util.spec_from_file_location("add_smallducuts", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ---------------------------------------------------------------------------
+# Generator
+# ---------------------------------------------------------------------------
+def build_profile(products):
+    """Per-category seed names, brands and price band, biggest category first."""
+    profile = {}
+    for row in products:
+        entry = profile.setdefault(row["category"], {"rows": [], "brands": set(), "prices": []})
+        entry["rows"].append(row)
+        entry["brands"].add(row["brand"])
+        entry["prices"].append(row["price"])
+    return sorted(profile.items(), key=lambda kv: (-len(kv[1]["rows"]), kv[0]))
+
+
+def generate(count, seed=42, skew=1.0, id_prefix="g"):
+    """Yield ``count`` product rows; the first N rows are the same for any count >= N."""
+    rng = random.Random(seed)
+    categories = build_profile(load_importer().PRODUCTS)
+    weights = [1 / (rank ** skew) for rank in range(1, len(categories) + 1)]
+    brands = {name: sorted(entry["brands"]) for name, entry in categories}
+
+    for n in range(count):
+        category, entry = rng.choices(categories, weights)[0]
+        base = rng.choice(entry["rows"])
+        low, high = min(entry["prices"]) / 2, max(entry["prices"]) * 1.5
+        # Log-uniform inside the band, rounded to whole naira x 50.
+        price = int(math.exp(rng.uniform(math.log(low), math.log(high))) // 5000 * 5000) or 5000
+        variant = rng.choice(VARIANTS)
+        yield {
+            "id": f"{id_prefix}{n}",
+            "name": f"{base['name']} {variant}".strip() if variant else base["name"],
+            "brand": rng.choice(brands[category]),
+            "emoji": base["emoji"],
+            "price": price,
+            "category": category,
+            "quantityInStock": 0 if rng.random() < OUT_OF_STOCK else rng.randint(1, 200),
+        }
+
+
+def write_rows(rows, fh, fmt):
+    if fmt == "csv":
+        writer = csv.DictWriter(fh, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+    else:
+        for row in rows:
+            fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+# ---------------------------------------------------------------------------
+# Sweep
+# ---------------------------------------------------------------------------
+def measure(client, label, path, params=None):
+    totals, sizes = [], []
+    cold_ms, hits = None, 0
+    for n in range(SWEEP_REQUESTS + 1):
+        # The first read is the plain URL, the rest a fresh URL each so no cache can answer them.
+        resp = client.get(path, params=params if n == 0 else dict(params or {}, _=time.time_ns()))
+        if resp.status_code != 200:
+            raise RuntimeError(f"{label} failed: {resp.status_code} {resp.text[:200]}")
+        if n == 0:
+            cold_ms = resp.timing.total_ms
+            continue
+        totals.append(resp.timing.total_ms)
+        sizes.append(resp.timing.response_bytes)
+        hits += cache_hit(resp)
+    totals.sort()
+    return {
+        "endpoint": label,
+        "cold_ms": round(cold_ms, 1),
+        "p50_ms": round(percentile(totals, 50), 1),
+        "p95_ms": round(percentile(totals, 95), 1),
+        "hits": hits,
+        "kb": round(sum(sizes) / len(sizes) / 1024, 1),
+    }
+
+
+def run_sweep(sizes, seed, skew, batch_size, concurrency, out_path):
+    if not ACCESS_TOKEN:
+        sys.exit("Set ACCESS_TOKEN (admin) to import the generated rows.")
+    importer = load_importer()
+    client = BazaClient(API_BASE_URL, token=ACCESS_TOKEN, pool_maxsize=concurrency, timeout=120)
+    top = build_profile(importer.PRODUCTS)[0][0]
+    endpoints = [
+        ("restock", "/products/restock", None),
+        (f"restock?category={top}", "/products/restock", {"category": top}),
+        ("restock?q=rice", "/products/restock", {"q": "rice"}),
+        ("catalog", "/products/catalog", None),
+    ]
+
+    rows = generate(max(sizes), seed, skew)
+    loaded, results = 0, []
+    for size in sorted(sizes):
+        print(f"\n📦 Catalog size {size:,}: importing {size - loaded:,} new rows")
+        stats = importer.bulk_import(
+            client, itertools.islice(rows, size - loaded), importer.Checkpoint(None, None, batch_size),
+            batch_size, concurrency, timeout=120,
+        )
+        if stats["failed"]:
+            sys.exit(f"{len(stats['failed'])} import batches failed; stopping the sweep.")
+        loaded = size
+        for label, path, params in endpoints:
+            result = dict(measure(client, label, path, params), size=size)
+            results.append(result)
+            print(f"  {label:<28} cold {result['cold_ms']:>9.1f} ms  p50 {result['p50_ms']:>9.1f} ms  "
+                  f"p95 {result['p95_ms']:>9.1f} ms  {result['kb']:>10.1f} KB"
+                  + (f"  ⚠️  {result['hits']}/{SWEEP_REQUESTS} cache hits" if result["hits"] else ""))
+
+    if out_path:
+        with open(out_path, "w", newline="") as fh:
+            writer = csv.DictWriter(fh, fieldnames=["size", "endpoint", "cold_ms", "p50_ms", "p95_ms", "hits", "kb"])
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"\n💾 Wrote {len(results)} rows to {out_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic restock catalog")
+    parser.add_argument("--rows", type=int, default=10000, help="number of products to generate")
+    parser.add_argument("--seed", type=int, default=42, help="random seed (same seed, same catalog)")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent for category sizes (0 = even)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="output format (default: from --out, else jsonl)")
+    parser.add_argument("--out", help="output file (default: stdout)")
+    parser.add_argument("--sweep", help="comma-separated catalog sizes to import and benchmark")
+    parser.add_argument("--sweep-out", help="CSV file for the sweep results")
+    parser.add_argument("--batch-size", type=int, default=1000, help="import batch size for --sweep")
+    parser.add_argument("--concurrency", type=int, default=4, help="parallel import requests for --sweep")
+    args = parser.parse_args()
+
+    if args.sweep:
+        sizes = [int(size) for size in args.sweep.split(",") if size.strip()]
+        run_sweep(sizes, args.seed, args.skew, args.batch_size, args.concurrency, args.sweep_out)
+        return
+
+    fmt = args.format or ("csv" if args.out and args.out.lower().endswith(".csv") else "jsonl")
+    rows = generate(args.rows, args.seed, args.skew)
+    if not args.out:
+        try:
+            write_rows(rows, sys.stdout, fmt)
+        except BrokenPipeError:
+            # Reader went away (e.g. piped into head); stop quietly.
+            sys.stderr.close()
+        return
+
+    start = time.perf_counter()
+    with open(args.out, "w", newline="", encoding="utf-8") as fh:
+        write_rows(rows, fh, fmt)
+    print(f"✅ Wrote {args.rows:,} products to {args.out} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+http_timing.py — Per-request phase timing for requests.Session
+==============================================================
+
+TimedSession is a drop-in requests.Session that records, for every request:
+
+    dns_ms        name resolution (0 when a pooled connection was reused)
+    connect_ms    TCP connect
+    tls_ms        TLS handshake (https only)
+    ttfb_ms       time to first byte, measured from the start of the request
+                  like curl's time_starttransfer (includes dns/connect/tls)
+    total_ms      until the body has been read
+    request_bytes / response_bytes   start line + headers + body
+
+The phases are captured by hooking urllib3's connection classes, so nothing
+outside this module has to change. Each timing is attached to the response as
+``resp.timing`` and, when a TimingLog is given, appended to it for export.
+
+Usage:
+    from http_timing import TimedSession, TimingLog
+
+    log = TimingLog()
+    s = TimedSession(log)
+    s.step = "get_profile"          # optional label for grouping
+    resp = s.get(url)
+    print(resp.timing.total_ms)
+    log.export("run.jsonl")         # or run.csv
+"""
+
+import csv
+import json
+import socket
+import threading
+import time
+from dataclasses import asdict, dataclass, fields
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+_active = threading.local()
+
+
+@dataclass
+class RequestTiming:
+    ts: float
+    step: str
+    method: str
+    path: str
+    status: int = 0
+    dns_ms: float = 0.0
+    connect_ms: float = 0.0
+    tls_ms: float = 0.0
+    ttfb_ms: float = 0.0
+    total_ms: float = 0.0
+    request_bytes: int = 0
+    response_bytes: int = 0
+    new_connection: bool = False
+    error: str = ""
+
+    def describe(self):
+        conn = "new conn" if self.new_connection else "reused conn"
+        return (
+            f"{self.total_ms:.1f} ms (dns {self.dns_ms:.1f} / connect {self.connect_ms:.1f} / "
+            f"tls {self.tls_ms:.1f} / ttfb {self.ttfb_ms:.1f}, {conn}) "
+            f"↑{self.request_bytes} B ↓{self.response_bytes} B"
+        )
+
+
+def _current():
+    return getattr(_active, "timing", None)
+
+
+# ---------------------------------------------------------------------------
+# urllib3 hooks
+# ---------------------------------------------------------------------------
+class _TimedConnectionMixin:
+    def _new_conn(self):
+        timing = _current()
+        host = self._dns_host
+        start = time.perf_counter()
+        try:
+            address = socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)[0][4][0]
+        except OSError:
+            address = None  # let urllib3 raise its usual NameResolutionError
+        resolved = time.perf_counter()
+
+        if address:
+            self._dns_host = address
+        try:
+            sock = super()._new_conn()
+        finally:
+            self._dns_host = host
+
+        if timing is not None:
+            timing.new_connection = True
+            timing.dns_ms += (resolved - start) * 1000
+            timing.connect_ms += (time.perf_counter() - resolved) * 1000
+        return sock
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        timing = _current()
+        if timing is not None:
+            timing.ttfb_ms = (time.perf_counter() - timing._started) * 1000
+        return response
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        timing = _current()
+        if timing is None:
+            return super().connect()
+        socket_ms = timing.dns_ms + timing.connect_ms
+        start = time.perf_counter()
+        super().connect()
+        elapsed = (time.perf_counter() - start) * 1000
+        timing.tls_ms += elapsed - (timing.dns_ms + timing.connect_ms - socket_ms)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools use the timing connection classes."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Session
+# ---------------------------------------------------------------------------
+def _header_bytes(start_line, headers):
+    return len(start_line) + 2 + sum(len(k) + len(str(v)) + 4 for k, v in headers.items()) + 2
+
+
+class TimedSession(requests.Session):
+    def __init__(self, timing_log=None, pool_connections=10, pool_maxsize=10, pool_block=False):
+        super().__init__()
+        self.timing_log = timing_log
+        self.step = ""
+        for prefix in ("http://", "https://"):
+            self.mount(prefix, TimedHTTPAdapter(
+                pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block,
+            ))
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        timing = RequestTiming(ts=time.time(), step=self.step, method=request.method, path=path)
+        body = request.body or b""
+        timing.request_bytes = _header_bytes(f"{request.method} {path} HTTP/1.1", request.headers) + len(body)
+
+        timing._started = time.perf_counter()
+        _active.timing = timing
+        try:
+            resp = super().send(request, **kwargs)
+        except requests.RequestException as e:
+            timing.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _active.timing = None
+            timing.total_ms = (time.perf_counter() - timing._started) * 1000
+            if self.timing_log is not None:
+                self.timing_log.add(timing)
+
+        timing.status = resp.status_code
+        timing.response_bytes = _header_bytes(f"HTTP/1.1 {resp.status_code} {resp.reason}", resp.headers)
+        if not kwargs.get("stream"):
+            # Wire bytes (before gzip decoding) when urllib3 tracked them.
+            timing.response_bytes += (resp.raw.tell() if resp.raw is not None else 0) or len(resp.content)
+        resp.timing = timing
+        return resp
+
+
+def server_timings(resp):
+    """All ``Server-Timing`` metrics with a duration, e.g. {"app": 12.3, "paystack": 340.0}."""
+    metrics = {}
+    for metric in resp.headers.get("Server-Timing", "").split(","):
+        name, *params = metric.split(";")
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "dur":
+                try:
+                    metrics[name.strip()] = float(value)
+                except ValueError:
+                    pass
+    return metrics
+
+
+def server_time_ms(resp):
+    """Handler time from a ``Server-Timing: app;dur=<ms>`` header, else TTFB as an upper bound."""
+    metrics = server_timings(resp)
+    if metrics:
+        return metrics.get("app", next(iter(metrics.values())))
+    return resp.timing.ttfb_ms - resp.timing.dns_ms - resp.timing.connect_ms - resp.timing.tls_ms
+
+
+def cache_hit(resp, hit_ms=20.0):
+    """``X-Cache: HIT`` when the backend says so, else a handler time under ``hit_ms``."""
+    header = resp.headers.get("X-Cache")
+    if header:
+        return header.upper().startswith("HIT")
+    return server_time_ms(resp) < hit_ms
+
+
+# ---------------------------------------------------------------------------
+# Collection & export
+# ---------------------------------------------------------------------------
+FIELDS = [f.name for f in fields(RequestTiming)]
+
+
+class TimingLog:
+    """Thread-safe list of RequestTiming rows with JSONL/CSV export."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rows = []
+
+    def add(self, timing):
+        with self._lock:
+            self.rows.append(timing)
+
+    def export(self, path):
+        with self._lock:
+            rows = [asdict(row) for row in self.rows]
+        with open(path, "w", newline="") as fh:
+            if str(path).endswith(".csv"):
+                writer = csv.DictWriter(fh, fieldnames=FIELDS)
+                writer.writeheader()
+                writer.writerows(rows)
+            else:
+                for row in rows:
+                    fh.write(json.dumps(row) + "\n")
+        return len(rows)
+
+    def print_breakdown(self, title="Where the time went"):
+        """Print total time per step (or per request when unlabelled), largest first."""
+        with self._lock:
+            rows = list(self.rows)
+        totals = {}
+        for row in rows:
+            key = row.step or f"{row.method} {row.path.split('?')[0]}"
+            entry = totals.setdefault(key, [0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += row.total_ms
+            entry[2] += row.response_bytes
+        grand = sum(entry[1] for entry in totals.values()) or 1.0
+        width = max([len(key) for key in totals] + [4])
+
+        print(f"\n{'='*60}")
+        print(f"  {title}")
+        print(f"{'='*60}")
+        print(f"  {'step':<{width}}  {'reqs':>5}  {'total ms':>10}  {'share':>6}  {'↓ bytes':>9}")
+        for key, (count, total_ms, received) in sorted(totals.items(), key=lambda kv: -kv[1][1]):
+            print(f"  {key:<{width}}  {count:>5}  {total_ms:>10.1f}  {total_ms / grand:>6.1%}  {received:>9}")
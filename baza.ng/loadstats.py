@@ -0,0 +1,289 @@
+"""
+loadstats.py — Latency bookkeeping shared by the Baza load scripts
+===================================================================
+
+Collects (name, seconds, ok) samples from many worker threads and prints a
+per-name report with p50/p95/p99 latency, error counts and throughput.
+
+HdrRecorder has the same interface but keeps each name in a Histogram
+(HdrHistogram-style log-linear buckets, 2 significant digits) instead of
+every sample, so long runs stay small and p99.9 is cheap.
+
+OpenLoop is the scheduler for those histograms. The other loops in these
+scripts are closed: the next request waits for the previous response, so
+when the server stalls the client stops sending and the stall is measured
+once instead of for every request that should have gone out meanwhile
+(coordinated omission). OpenLoop starts tasks at a fixed or linearly ramped
+arrival rate whatever the response times, and times every task from when
+it was scheduled to start, not from when a thread got round to it. It
+reports both: "service" (send → response, what a closed loop sees) and
+"response" (scheduled start → response, the corrected number).
+
+Usage:
+    from loadstats import LatencyRecorder
+
+    rec = LatencyRecorder()
+    rec.record("GET /user/me", 0.123, ok=True)
+    rec.print_report(wall_seconds=12.5)
+
+    from loadstats import OpenLoop
+
+    loop = OpenLoop(rate=50, duration=60, start_rate=5, ramp=20)
+    loop.run(lambda n: client.me().ok, name="GET /user/me")
+    loop.print_report()
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list (pct in 0-100)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class LatencyRecorder:
+    """Thread-safe store of latency samples grouped by name (step or endpoint)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = OrderedDict()
+        self._errors = OrderedDict()
+
+    def record(self, name, seconds, ok=True):
+        with self._lock:
+            self._samples.setdefault(name, []).append(seconds)
+            self._errors.setdefault(name, 0)
+            if not ok:
+                self._errors[name] += 1
+
+    def summary(self):
+        """Return {name: {count, errors, p50, p95, p99, max}} with times in ms."""
+        with self._lock:
+            snapshot = [(name, sorted(values), self._errors[name]) for name, values in self._samples.items()]
+
+        result = OrderedDict()
+        for name, values, errors in snapshot:
+            result[name] = {
+                "count": len(values),
+                "errors": errors,
+                "p50": percentile(values, 50) * 1000,
+                "p95": percentile(values, 95) * 1000,
+                "p99": percentile(values, 99) * 1000,
+                "max": (values[-1] if values else 0.0) * 1000,
+            }
+        return result
+
+    def print_report(self, wall_seconds, title="Latency by step"):
+        rows = self.summary()
+        total = sum(r["count"] for r in rows.values())
+        errors = sum(r["errors"] for r in rows.values())
+        width = max([len(name) for name in rows] + [4])
+
+        print(f"\n{'='*60}")
+        print(f"  {title}")
+        print(f"{'='*60}")
+        print(f"  {'name':<{width}}  {'count':>6}  {'err':>5}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  {'max ms':>8}")
+        for name, r in rows.items():
+            print(
+                f"  {name:<{width}}  {r['count']:>6}  {r['errors']:>5}  "
+                f"{r['p50']:>8.1f}  {r['p95']:>8.1f}  {r['p99']:>8.1f}  {r['max']:>8.1f}"
+            )
+
+        rate = total / wall_seconds if wall_seconds > 0 else 0.0
+        print(f"\n  Samples: {total}  Errors: {errors}  Wall: {wall_seconds:.2f}s  Throughput: {rate:.1f}/s")
+        return rows
+
+
+# ---------------------------------------------------------------------------
+# HDR-style histograms
+# ---------------------------------------------------------------------------
+class Histogram:
+    """Log-linear histogram of durations, kept in integer microseconds.
+
+    Like HdrHistogram, every power-of-two range is split into equal
+    sub-buckets, enough of them for ``significant_digits`` of precision, so
+    any recorded value is reported to within that relative error.
+    """
+
+    def __init__(self, significant_digits=2):
+        self.sub_bits = math.ceil(math.log2(2 * 10 ** significant_digits))
+        self.counts = {}  # lowest value of the bucket (us) -> count
+        self.count = 0
+        self.max = 0
+
+    def record(self, seconds, count=1):
+        value = max(0, round(seconds * 1_000_000))
+        shift = max(0, value.bit_length() - self.sub_bits)
+        bucket = value >> shift << shift
+        self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += count
+        self.max = max(self.max, value)
+
+    def value_at(self, pct):
+        """Nearest-rank percentile in seconds, as the highest value of its bucket (never above the max)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                shift = max(0, bucket.bit_length() - self.sub_bits)
+                return min(bucket + (1 << shift) - 1, self.max) / 1_000_000
+        return self.max / 1_000_000
+
+
+class HdrRecorder:
+    """LatencyRecorder with a Histogram per name instead of the raw samples; adds p99.9."""
+
+    def __init__(self, significant_digits=2):
+        self.significant_digits = significant_digits
+        self._lock = threading.Lock()
+        self._histograms = OrderedDict()
+        self._errors = OrderedDict()
+
+    def record(self, name, seconds, ok=True):
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(self.significant_digits)
+                self._errors[name] = 0
+            self._histograms[name].record(seconds)
+            if not ok:
+                self._errors[name] += 1
+
+    def summary(self):
+        """Return {name: {count, errors, p50, p95, p99, p99.9, max}} with times in ms."""
+        with self._lock:
+            result = OrderedDict()
+            for name, histogram in self._histograms.items():
+                result[name] = {
+                    "count": histogram.count,
+                    "errors": self._errors[name],
+                    "p50": histogram.value_at(50) * 1000,
+                    "p95": histogram.value_at(95) * 1000,
+                    "p99": histogram.value_at(99) * 1000,
+                    "p99.9": histogram.value_at(99.9) * 1000,
+                    "max": histogram.max / 1000,
+                }
+        return result
+
+    def print_report(self, wall_seconds, title="Latency by step"):
+        rows = self.summary()
+        total = sum(r["count"] for r in rows.values())
+        errors = sum(r["errors"] for r in rows.values())
+        width = max([len(name) for name in rows] + [4])
+
+        print(f"\n{'='*60}")
+        print(f"  {title}")
+        print(f"{'='*60}")
+        print(f"  {'name':<{width}}  {'count':>6}  {'err':>5}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  "
+              f"{'p99.9 ms':>8}  {'max ms':>8}")
+        for name, r in rows.items():
+            print(
+                f"  {name:<{width}}  {r['count']:>6}  {r['errors']:>5}  "
+                f"{r['p50']:>8.1f}  {r['p95']:>8.1f}  {r['p99']:>8.1f}  {r['p99.9']:>8.1f}  {r['max']:>8.1f}"
+            )
+
+        rate = total / wall_seconds if wall_seconds > 0 else 0.0
+        print(f"\n  Samples: {total}  Errors: {errors}  Wall: {wall_seconds:.2f}s  Throughput: {rate:.1f}/s")
+        return rows
+
+
+# ---------------------------------------------------------------------------
+# Open-loop scheduler
+# ---------------------------------------------------------------------------
+class OpenLoop:
+    """Start tasks at a fixed (or ramped) arrival rate, whatever the response times.
+
+    The rate climbs linearly from ``start_rate`` to ``rate`` over ``ramp``
+    seconds, then holds until ``duration``. Tasks run on up to
+    ``max_inflight`` threads; when all of them are busy, tasks queue and
+    start late, and that wait counts in their response time.
+    """
+
+    MIN_RATE = 0.1  # tasks/s, so a ramp from 0 still gets going
+    LATE = 0.1  # seconds behind schedule before a start counts as late
+    ERROR_SAMPLES = 5  # exception messages kept; later ones are only counted
+
+    def __init__(self, rate, duration, start_rate=None, ramp=0.0, max_inflight=1000):
+        self.rate = rate
+        self.duration = duration
+        self.start_rate = rate if start_rate is None else start_rate
+        self.ramp = ramp
+        self.max_inflight = max_inflight
+        self.service = HdrRecorder()  # actual start -> done
+        self.response = HdrRecorder()  # scheduled start -> done
+        self.lag = Histogram()  # scheduled start -> actual start
+        self.late = 0
+        self.errors = []  # the first ERROR_SAMPLES messages
+        self.error_count = 0
+        self.wall = 0.0
+        self._lock = threading.Lock()
+
+    def rate_at(self, t):
+        if t < self.ramp:
+            return self.start_rate + (self.rate - self.start_rate) * t / self.ramp
+        return self.rate
+
+    def _call(self, fn, index, name, scheduled):
+        started = time.perf_counter()
+        ok = False
+        try:
+            ok = bool(fn(index))
+        except Exception as e:  # a task's failure is a sample, not the end of the run
+            with self._lock:
+                self.error_count += 1
+                if len(self.errors) < self.ERROR_SAMPLES:
+                    self.errors.append(f"{type(e).__name__}: {e}")
+        finally:
+            done = time.perf_counter()
+            self.service.record(name, done - started, ok=ok)
+            self.response.record(name, done - scheduled, ok=ok)
+            with self._lock:
+                self.lag.record(started - scheduled)
+                self.late += started - scheduled > self.LATE
+
+    def run(self, fn, name="task"):
+        """Call ``fn(index)`` on schedule until ``duration``; ``fn`` returns truthy on success."""
+        origin = time.perf_counter()
+        t = 0.0
+        index = 0
+        with ThreadPoolExecutor(max_workers=self.max_inflight) as pool:
+            while t < self.duration:
+                delay = origin + t - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self._call, fn, index, name, origin + t)
+                index += 1
+                t += 1 / max(self.rate_at(t), self.MIN_RATE)
+        self.wall = time.perf_counter() - origin
+        return index
+
+    def print_report(self, title="Open-loop latency"):
+        self.service.print_report(self.wall, title=f"{title}: service time (send → response, uncorrected)")
+        rows = self.response.print_report(self.wall, title=f"{title}: response time (scheduled → response)")
+        sent = self.lag.count
+        print(f"\n  Arrival rate: {self.start_rate:g} → {self.rate:g}/s over {self.ramp:g}s, held to "
+              f"{self.duration:g}s; {sent:,} started ({sent / self.duration:.1f}/s on average)")
+        print(f"  Start lag: p50 {self.lag.value_at(50) * 1000:.1f} ms, p99 {self.lag.value_at(99) * 1000:.1f} ms, "
+              f"max {self.lag.max / 1000:.1f} ms")
+        if self.late:
+            print(f"  ⚠️  {self.late:,}/{sent:,} started more than {self.LATE * 1000:.0f} ms late "
+                  f"(all {self.max_inflight} threads busy); their wait is in the response time")
+        for name, r in rows.items():
+            service = self.service.summary()[name]
+            if service["p99"] and r["p99"] > service["p99"] * 1.1:
+                print(f"  {name}: coordinated omission hides x{r['p99'] / service['p99']:.1f} at p99 "
+                      f"({service['p99']:.1f} → {r['p99']:.1f} ms)")
+        if self.error_count:
+            print(f"  {self.error_count:,} tasks raised; first {len(self.errors)}:")
+        for error in self.errors:
+            print(f"    - {error[:200]}")
+        return rows
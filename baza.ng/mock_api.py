@@ -0,0 +1,1624 @@
+#!/usr/bin/env python3
+"""
+mock_api.py — Offline stand-in for the Baza /v1 API
+====================================================
+
+A dependency-free ASGI app that implements the contract in API_USAGE.md with
+in-memory state and configurable per-route latency, so UserFlow.py,
+test_runner.py, AI-part.py, test_paystack.py and add-smallducuts.py can be run
+at full speed without touching production.
+
+Usage:
+    # Serve on :8000 with production-like latency
+    python mock_api.py
+
+    # No artificial latency, every new user starts with ₦50,000
+    python mock_api.py --latency-scale 0 --wallet-balance 5000000
+
+    # Or under daphne directly (config from MOCK_* env vars)
+    MOCK_LATENCY_SCALE=0.5 daphne -b 127.0.0.1 -p 8000 mock_api:app
+
+    # Then point any script at it
+    BASE_URL=http://localhost:8000 OTP=1111 python UserFlow.py --users 500
+
+Covered routes:
+    auth      otp-request, otp-verify, refresh, logout
+    user      me, profile, notifications, addresses (list/create/update/default/delete)
+    products  bundles, mealpacks, readyeat, snacks, restock, catalog, import-smallproducts
+    orders    create (wallet / paystack / paystack_inline), list, detail, verify-payment
+    wallet    paystack-config, balance, account, transactions, topup, verify-topup
+    webhooks  paystack (HMAC-SHA512 signed; charge.success card / dedicated_nuban,
+              dedicatedaccount.assign.success; idempotent per reference)
+    referral  stats
+    support   thread, message
+    notifications  list (limit / offset)
+    ai        suggestions, sessions, chat (simulated LLM + per-tool latency), history
+
+Streaming chat:
+    POST /v1/ai/chat with {"stream": true} (or Accept: text/event-stream)
+    answers with server-sent events instead of one JSON body:
+
+        event: tool_call     data: {"name": ..., "arguments": {...}}
+        event: tool_result   data: {"name": ..., "durationMs": ...}
+        event: token         data: {"delta": "next "}
+        event: done          data: <the usual non-streaming response body>
+
+Latency:
+    Each route group has a median latency (LATENCY_MS, in ms) taken from
+    production traces. Every request sleeps for a log-normal sample around
+    that median (sigma = --latency-sigma) multiplied by --latency-scale.
+    --latency-scale 0 disables the delay entirely. Paginated lists add
+    PAGE_OFFSET_MS per row skipped, like LIMIT/OFFSET on a heavy user's
+    orders. Responses carry a ``Server-Timing: app;dur=<ms>`` header with the
+    time spent in the handler.
+
+WebSockets:
+    ws://<host>/ws/orders/?token=<accessToken>    user_{id}_orders (+ admin_orders for MOCK_ADMIN_PHONES)
+    ws://<host>/ws/products/?token=<accessToken>  the global products group
+    ws://<host>/ws/notifications/?token=<accessToken>  user_{id}_notifications
+
+    Order create / confirm and product imports broadcast order_created,
+    order_update, product_created and product_updated like the Django
+    signals do. Order creates, order payments and top-ups also store an
+    AppNotification (order_created / payment_success) and push it to the
+    notifications socket after the "notify" latency. Groups live in an
+    in-process stand-in for the Redis channel layer: every socket has a queue
+    of CHANNEL_CAPACITY messages and, like channels_redis, messages to a full
+    queue are dropped.
+
+Concurrency limit:
+    Like ConcurrencyLimitMiddleware, at most CONCURRENCY_LIMIT requests
+    (--concurrency-limit / MOCK_CONCURRENCY_LIMIT, 2500) are in flight; above
+    that every request gets 503 {"error": "Server Busy", "code": "SERVER_BUSY"}
+    with Retry-After: 1 before any other work.
+
+Caches:
+    GET product and catalog views are cached for CATALOG_CACHE_TTL seconds
+    (MOCK_CATALOG_CACHE_TTL, 120 like the backend) and the whole cache is
+    invalidated on every imported row, as the product save signal does. A hit
+    pays the "cache" latency and is marked ``X-Cache: HIT``. A miss reads the
+    rows, pays the view's latency and then stores the body, so an import that
+    lands in between is hidden behind the older body until the TTL expires —
+    the same read/set race the real views have.
+
+    In front of every authenticated GET sits the ResponseCacheMiddleware
+    stand-in: whole 200 responses per user and path + query for
+    RESPONSE_CACHE_TTL seconds (MOCK_RESPONSE_CACHE_TTL, default 5), not
+    invalidated by the user's own writes. Its hits are X-Cache: HIT as well.
+
+Paystack:
+    By default Paystack calls are simulated by the "paystack" latency group
+    and nothing is ever paid. With --paystack-url pointing at paystack_mock.py,
+    top-up, order-payment and DVA routes call the stand-in for real; the time
+    spent there is added to Server-Timing as ``paystack;dur=<ms>``, and
+    payments settle through verify calls or the stand-in's webhooks.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import math
+import os
+import random
+import re
+import secrets
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import requests
+
+from paystack_webhooks import PAYSTACK_SECRET_KEY, SIGNATURE_HEADER, verify as verify_paystack_signature
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+OTP_CODE = os.getenv("MOCK_OTP", "1111")
+LATENCY_SCALE = float(os.getenv("MOCK_LATENCY_SCALE", "1.0"))
+LATENCY_SIGMA = float(os.getenv("MOCK_LATENCY_SIGMA", "0.35"))
+START_BALANCE = int(os.getenv("MOCK_WALLET_BALANCE", "0"))
+OTP_RATE_LIMIT = int(os.getenv("MOCK_OTP_RATE_LIMIT", "3"))
+ACCESS_TOKEN_TTL = int(os.getenv("MOCK_ACCESS_TOKEN_TTL", str(15 * 60)))
+PAYSTACK_URL = os.getenv("MOCK_PAYSTACK_URL", "").rstrip("/")
+ADMIN_PHONES = {phone.strip() for phone in os.getenv("MOCK_ADMIN_PHONES", "").split(",") if phone.strip()}
+CONCURRENCY_LIMIT = int(os.getenv("MOCK_CONCURRENCY_LIMIT", "2500"))  # in-flight HTTP requests; 0 disables
+BUSY_RETRY_AFTER = 1  # seconds, on the 503 above the limit
+RESPONSE_CACHE_TTL = int(os.getenv("MOCK_RESPONSE_CACHE_TTL", "5"))  # per-user GET cache; 0 disables
+CATALOG_CACHE_TTL = int(os.getenv("MOCK_CATALOG_CACHE_TTL", "120"))  # product views' Redis cache; 0 disables
+CHANNEL_CAPACITY = 100  # channels_redis default: per-channel queue length before messages are dropped
+REFRESH_TOKEN_TTL = 30 * 24 * 3600
+OTP_WINDOW = 10 * 60
+
+# Median latency per route group, in milliseconds.
+LATENCY_MS = {
+    "auth.otp": 350,  # Supabase round-trip + SMS provider
+    "auth": 60,
+    "user": 35,
+    "products": 45,
+    "catalog": 90,
+    "import": 400,
+    "orders.write": 120,
+    "orders": 50,
+    "wallet": 40,
+    "paystack": 450,  # initialise / verify against Paystack
+    "referral": 40,
+    "support": 250,  # includes the AI reply
+    "ai": 20,  # plus LLM and tool time, simulated per turn
+    "webhook": 30,
+    "cache": 6,  # product view served from the Redis cache
+    "notify": 150,  # signal → notification row → channel layer push
+}
+IMPORT_ROW_MS = 0.3  # per imported row: save + signal fan-out
+IMPORT_YIELD_ROWS = 20  # rows saved between yields to other requests
+PAGE_OFFSET_MS = 0.02  # per row skipped by ?page= (LIMIT/OFFSET still reads the skipped rows)
+
+PAYSTACK_PUBLIC_KEY = "pk_test_mockbaza000000000000000000000000"
+
+
+def configure(otp=None, latency_scale=None, latency_sigma=None, wallet_balance=None, otp_rate_limit=None,
+              paystack_url=None, concurrency_limit=None):
+    global OTP_CODE, LATENCY_SCALE, LATENCY_SIGMA, START_BALANCE, OTP_RATE_LIMIT, PAYSTACK_URL, CONCURRENCY_LIMIT
+    if otp is not None:
+        OTP_CODE = otp
+    if latency_scale is not None:
+        LATENCY_SCALE = latency_scale
+    if latency_sigma is not None:
+        LATENCY_SIGMA = latency_sigma
+    if wallet_balance is not None:
+        START_BALANCE = wallet_balance
+    if otp_rate_limit is not None:
+        OTP_RATE_LIMIT = otp_rate_limit
+    if paystack_url is not None:
+        PAYSTACK_URL = paystack_url.rstrip("/")
+    if concurrency_limit is not None:
+        CONCURRENCY_LIMIT = concurrency_limit
+    if PAYSTACK_URL:
+        # Real calls to the stand-in replace the simulated Paystack round-trip.
+        LATENCY_MS["paystack"] = LATENCY_MS["wallet"]
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def new_id():
+    return str(uuid.uuid4())
+
+
+async def simulate_latency(group):
+    if LATENCY_SCALE <= 0:
+        return
+    median = LATENCY_MS.get(group, 40) / 1000
+    await asyncio.sleep(median * math.exp(random.gauss(0, LATENCY_SIGMA)) * LATENCY_SCALE)
+
+
+# ---------------------------------------------------------------------------
+# Catalog seed
+# ---------------------------------------------------------------------------
+def load_restock_products():
+    """Reuse the PRODUCTS rows from add-smallducuts.py as the restock catalog."""
+    path = Path(__file__).with_name("add-smallducuts.py")
+    try:
+        spec = importlib.util.spec_from_file_location("add_smallducuts", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        rows = module.PRODUCTS
+    except (OSError, ImportError):
+        rows = [
+            {"id": "r1", "name": "Golden Penny Rice 5kg", "brand": "Golden Penny", "emoji": "🌾",
+             "price": 720000, "category": "Grains"},
+        ]
+    return [dict(row, imageUrl="", quantityInStock=50) for row in rows]
+
+
+def build_catalog():
+    restock = {row["id"]: row for row in load_restock_products()}
+    first = list(restock.values())
+
+    bundles = [
+        {
+            "id": f"b{n}",
+            "name": name,
+            "emoji": emoji,
+            "imageUrl": "",
+            "description": description,
+            "basePrice": sum(item["price"] for item in first[start:start + 4]),
+            "savings": 15 + n,
+            "color": color,
+            "tags": ["Feeds 4", "7 days"],
+            "category": "Family",
+            "quantityInStock": 20,
+            "items": [
+                {
+                    "id": item["id"],
+                    "productId": f"prod_{item['id']}",
+                    "name": item["name"],
+                    "emoji": item["emoji"],
+                    "imageUrl": "",
+                    "unitPrice": item["price"],
+                    "defaultQty": 1,
+                    "minQty": 0,
+                    "maxQty": 5,
+                }
+                for item in first[start:start + 4]
+            ],
+        }
+        for n, (name, emoji, description, color, start) in enumerate(
+            [
+                ("Breakfast Bundle", "🌅", "Everything for a solid week of breakfasts", "#f5a623", 0),
+                ("Protein Bundle", "🍗", "Meat, fish and eggs for the week", "#e85c3a", 8),
+                ("Pantry Bundle", "🥫", "Staples to restock the kitchen", "#4caf50", 16),
+            ],
+            start=1,
+        )
+    ]
+
+    mealpacks = [
+        {
+            "id": f"m{n}",
+            "name": name,
+            "emoji": emoji,
+            "imageUrl": "",
+            "description": description,
+            "baseTime": 45,
+            "basePlates": 4,
+            "basePrice": price,
+            "color": "#e85c3a",
+            "category": "Party",
+            "quantityInStock": 20,
+            "ingredients": [
+                {"name": ing, "emoji": "🧂", "imageUrl": "", "unit": "portion", "perPlate": 1,
+                 "pricePerPlate": price // 16}
+                for ing in ingredients
+            ],
+        }
+        for n, (name, emoji, description, price, ingredients) in enumerate(
+            [
+                ("Jollof Pack", "🍚", "Everything for a full pot of party jollof", 890000,
+                 ["Rice", "Tomato paste", "Pepper mix", "Chicken"]),
+                ("Egusi Pack", "🍲", "Egusi soup for the whole family", 1120000,
+                 ["Egusi", "Palm oil", "Stockfish", "Spinach"]),
+            ],
+            start=1,
+        )
+    ]
+
+    readyeat = [
+        {
+            "id": f"re{n}",
+            "name": name,
+            "kitchen": kitchen,
+            "emoji": emoji,
+            "imageUrl": "",
+            "price": price,
+            "oldPrice": None,
+            "deliveryTime": "35 min",
+            "tags": ["Hot"],
+            "description": f"{name} from {kitchen}",
+            "color": "#f5a623",
+            "category": "Lunch",
+            "quantityInStock": 30,
+        }
+        for n, (name, kitchen, emoji, price) in enumerate(
+            [
+                ("Jollof Rice & Chicken", "Mama Put", "🍛", 350000),
+                ("Amala & Ewedu", "Iya Basira", "🥣", 280000),
+                ("Shawarma", "Grill House", "🌯", 250000),
+                ("Fried Rice & Turkey", "Mama Put", "🍗", 420000),
+            ],
+            start=1,
+        )
+    ]
+
+    snacks = [
+        {
+            "id": f"s{n}",
+            "name": name,
+            "emoji": emoji,
+            "imageUrl": "",
+            "price": price,
+            "category": category,
+            "tag": "",
+            "color": "#f5a623",
+            "quantityInStock": 40,
+        }
+        for n, (name, emoji, price, category) in enumerate(
+            [
+                ("Puff Puff", "🍩", 20000, "Snacks"),
+                ("Egg Roll", "🥚", 40000, "Snacks"),
+                ("Plantain Chips", "🍌", 50000, "Snacks"),
+                ("Agege Bread", "🍞", 70000, "Breads"),
+                ("Chapman", "🍹", 120000, "Drinks"),
+                ("Zobo 50cl", "🧃", 60000, "Drinks"),
+            ],
+            start=1,
+        )
+    ]
+
+    return {
+        "restock": restock,
+        "bundles": {row["id"]: row for row in bundles},
+        "mealpacks": {row["id"]: row for row in mealpacks},
+        "readyeat": {row["id"]: row for row in readyeat},
+        "snacks": {row["id"]: row for row in snacks},
+    }
+
+
+def categories_of(rows):
+    seen = []
+    for row in rows:
+        if row.get("category") and row["category"] not in seen:
+            seen.append(row["category"])
+    return ["All"] + seen
+
+
+# ---------------------------------------------------------------------------
+# In-memory state
+# ---------------------------------------------------------------------------
+class Store:
+    def __init__(self):
+        self.users = {}  # id -> user dict
+        self.users_by_phone = {}  # phone -> id
+        self.access_tokens = {}  # token -> (user_id, expires_at)
+        self.refresh_tokens = {}  # token -> (user_id, expires_at)
+        self.otp_requests = {}  # phone -> [timestamps]
+        self.addresses = {}  # user_id -> [address]
+        self.orders = {}  # user_id -> [order] (newest first)
+        self.transactions = {}  # user_id -> [txn] (newest first)
+        self.pending_topups = {}  # reference -> (user_id, amount)
+        self.credited = {}  # Paystack reference -> amount, once a charge has been applied
+        self.customers = {}  # Paystack customer_code -> user_id
+        self.support = {}  # user_id -> [message]
+        self.notifications = {}  # user_id -> [notification] (newest first)
+        self.ai_sessions = {}  # session_id -> session (with messages)
+        self.catalog = build_catalog()
+
+    def create_user(self, phone, name):
+        user_id = new_id()
+        user = {
+            "id": user_id,
+            "name": name or "Baza User",
+            "phone": phone,
+            "email": None,
+            "memberSince": now_iso(),
+            "walletBalance": START_BALANCE,
+            "accountNumber": None,
+            "bankName": "Providus Bank",
+            "accountName": "Baza NG Ltd",
+            "referralCode": secrets.token_hex(6),
+            "dvaAssigned": False,
+            "paystackCustomerCode": f"CUS_{secrets.token_hex(7)}",
+            "notifications": {"orders": True, "delivery": True, "deals": True, "reminders": False, "newsletter": False},
+        }
+        self.users[user_id] = user
+        self.users_by_phone[phone] = user_id
+        self.customers[user["paystackCustomerCode"]] = user_id
+        self.addresses[user_id] = []
+        self.orders[user_id] = []
+        self.transactions[user_id] = []
+        self.notifications[user_id] = []
+        self.support[user_id] = [
+            {"id": new_id(), "text": "Hey! I'm Baza's support assistant.", "sender": "AI", "flagged": False,
+             "createdAt": now_iso()},
+        ]
+        return user
+
+    def issue_tokens(self, user_id):
+        access = f"mock_at_{secrets.token_urlsafe(24)}"
+        refresh = f"mock_rt_{secrets.token_urlsafe(32)}"
+        now = time.time()
+        self.access_tokens[access] = (user_id, now + ACCESS_TOKEN_TTL)
+        self.refresh_tokens[refresh] = (user_id, now + REFRESH_TOKEN_TTL)
+        return access, refresh
+
+    def add_transaction(self, user_id, amount, txn_type, description, reference):
+        txn = {
+            "id": new_id(),
+            "amount": amount,
+            "type": txn_type,
+            "description": description,
+            "reference": reference,
+            "createdAt": now_iso(),
+        }
+        self.transactions[user_id].insert(0, txn)
+        return txn
+
+
+store = Store()
+
+
+# ---------------------------------------------------------------------------
+# Request / response plumbing
+# ---------------------------------------------------------------------------
+class ApiError(Exception):
+    def __init__(self, status, code, message):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+class Request:
+    def __init__(self, scope, body):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.query = {k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+        self.headers = {k.decode().lower(): v.decode() for k, v in scope.get("headers", [])}
+        self.raw_body = body
+        self.params = {}
+        self.user = None
+        self.paystack_ms = 0.0
+        self.cookies = {}
+        for part in self.headers.get("cookie", "").split(";"):
+            if "=" in part:
+                key, value = part.strip().split("=", 1)
+                self.cookies[key] = value
+
+    def json(self):
+        if not self.raw_body:
+            return {}
+        try:
+            data = json.loads(self.raw_body)
+        except ValueError:
+            raise ApiError(400, "MISSING_FIELDS", "Request body must be JSON")
+        return data if isinstance(data, dict) else {}
+
+
+class Response:
+    def __init__(self, body, status=200, cookies=None):
+        self.body = body
+        self.status = status
+        self.cookies = cookies or []
+
+
+class StreamingResponse:
+    """Server-sent events: ``events`` is an async iterator of (event, data) pairs."""
+
+    def __init__(self, events, status=200):
+        self.events = events
+        self.status = status
+
+
+class TTLCache:
+    """Values that expire ``ttl`` seconds after they are set, like keys in the django-redis cache."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.entries = {}  # key -> (expires_at, value)
+        self.invalidations = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        now = time.monotonic()
+        if len(self.entries) > 50000:
+            self.entries = {k: entry for k, entry in self.entries.items() if entry[0] > now}
+        self.entries[key] = (now + self.ttl, value)
+
+    def invalidate(self):
+        self.entries.clear()
+        self.invalidations += 1
+
+
+def snapshot(body):
+    """What the cache stores is the serialized body, not the live dicts handlers keep mutating."""
+    return json.loads(json.dumps(body, default=str))
+
+
+response_cache = TTLCache(RESPONSE_CACHE_TTL)  # ResponseCacheMiddleware: (user, path + query) -> (body, status)
+
+ROUTES = []
+
+
+def route(method, pattern, group, auth=True):
+    regex = re.compile("^/v1" + re.sub(r"<(\w+)>", r"(?P<\1>[^/]+)", pattern) + "$")
+
+    def register(fn):
+        ROUTES.append((method, regex, group, auth, fn))
+        return fn
+
+    return register
+
+
+def authenticate(req):
+    header = req.headers.get("authorization", "")
+    token = header[7:] if header.startswith("Bearer ") else ""
+    entry = store.access_tokens.get(token)
+    if not entry or entry[1] < time.time():
+        raise ApiError(401, "UNAUTHORIZED", "Missing or invalid access token")
+    return store.users[entry[0]]
+
+
+async def paginate(rows, req, key):
+    try:
+        page = max(1, int(req.query.get("page", 1)))
+        limit = min(100, max(1, int(req.query.get("limit", 20))))
+    except ValueError:
+        raise ApiError(400, "MISSING_FIELDS", "page and limit must be integers")
+    total = len(rows)
+    total_pages = math.ceil(total / limit) if total else 0
+    start = (page - 1) * limit
+    if LATENCY_SCALE > 0 and start:
+        await asyncio.sleep(min(start, total) * PAGE_OFFSET_MS / 1000 * LATENCY_SCALE)
+    return {
+        key: rows[start:start + limit],
+        "pagination": {
+            "page": page,
+            "limit": limit,
+            "total": total,
+            "totalPages": total_pages,
+            "hasNext": page < total_pages,
+            "hasPrev": page > 1,
+        },
+    }
+
+
+def refresh_cookie(token, max_age=REFRESH_TOKEN_TTL):
+    return f"baza_refresh={token}; Path=/; HttpOnly; SameSite=Lax; Max-Age={max_age}"
+
+
+# ---------------------------------------------------------------------------
+# Auth
+# ---------------------------------------------------------------------------
+@route("POST", "/auth/otp-request", "auth.otp", auth=False)
+async def otp_request(req):
+    data = req.json()
+    phone = data.get("phone")
+    if not phone:
+        raise ApiError(400, "MISSING_FIELDS", "phone is required")
+
+    intent = data.get("intent")
+    if intent == "signup" and phone in store.users_by_phone:
+        raise ApiError(409, "PHONE_ALREADY_REGISTERED", "Phone number already registered")
+    if intent == "login" and phone not in store.users_by_phone:
+        raise ApiError(404, "ACCOUNT_NOT_FOUND", "No account for this phone number")
+
+    if OTP_RATE_LIMIT:
+        now = time.time()
+        recent = [t for t in store.otp_requests.get(phone, []) if now - t < OTP_WINDOW]
+        if len(recent) >= OTP_RATE_LIMIT:
+            raise ApiError(429, "RATE_LIMIT_EXCEEDED", "Too many OTP requests")
+        recent.append(now)
+        store.otp_requests[phone] = recent
+    return Response({"message": "OTP sent", "expiresIn": 300})
+
+
+@route("POST", "/auth/otp-verify", "auth.otp", auth=False)
+async def otp_verify(req):
+    data = req.json()
+    phone, otp = data.get("phone"), data.get("otp")
+    if not phone or not otp:
+        raise ApiError(400, "MISSING_FIELDS", "phone and otp are required")
+    if str(otp) != OTP_CODE:
+        raise ApiError(400, "INVALID_OTP", "Wrong OTP entered")
+
+    user_id = store.users_by_phone.get(phone)
+    is_new = user_id is None
+    if is_new:
+        user = store.create_user(phone, data.get("name"))
+    else:
+        user = store.users[user_id]
+
+    access, refresh = store.issue_tokens(user["id"])
+    return Response(
+        {"accessToken": access, "isNewUser": is_new, "user": user},
+        cookies=[refresh_cookie(refresh)],
+    )
+
+
+@route("POST", "/auth/refresh", "auth", auth=False)
+async def auth_refresh(req):
+    token = req.cookies.get("baza_refresh", "")
+    entry = store.refresh_tokens.pop(token, None)
+    if not entry:
+        raise ApiError(401, "REFRESH_TOKEN_INVALID", "Bad refresh token")
+    if entry[1] < time.time():
+        raise ApiError(401, "REFRESH_TOKEN_EXPIRED", "Refresh token expired")
+
+    # Rotation: the old refresh token is single-use.
+    access, refresh = store.issue_tokens(entry[0])
+    return Response({"accessToken": access}, cookies=[refresh_cookie(refresh)])
+
+
+@route("POST", "/auth/logout", "auth", auth=False)
+async def auth_logout(req):
+    store.refresh_tokens.pop(req.cookies.get("baza_refresh", ""), None)
+    return Response({"message": "Logged out"}, cookies=[refresh_cookie("", max_age=0)])
+
+
+# ---------------------------------------------------------------------------
+# User
+# ---------------------------------------------------------------------------
+@route("GET", "/user/me", "user")
+async def user_me(req):
+    return Response(req.user)
+
+
+@route("PUT", "/user/profile", "user")
+async def user_profile(req):
+    data = req.json()
+    for field in ("name", "email"):
+        if field in data:
+            req.user[field] = data[field]
+    return Response(req.user)
+
+
+@route("PUT", "/user/notifications", "user")
+async def user_notifications(req):
+    data = req.json()
+    prefs = req.user["notifications"]
+    for key in prefs:
+        if key in data:
+            prefs[key] = bool(data[key])
+    return Response({"notifications": prefs})
+
+
+@route("GET", "/user/addresses/", "user")
+async def address_list(req):
+    return Response({"addresses": store.addresses[req.user["id"]]})
+
+
+@route("POST", "/user/addresses/create", "user")
+async def address_create(req):
+    data = req.json()
+    if not data.get("label") or not data.get("address"):
+        raise ApiError(400, "MISSING_FIELDS", "label and address are required")
+    addresses = store.addresses[req.user["id"]]
+    address = {
+        "id": new_id(),
+        "label": data["label"],
+        "address": data["address"],
+        "landmark": data.get("landmark", ""),
+        "isDefault": not addresses,
+    }
+    addresses.append(address)
+    return Response(address, status=201)
+
+
+def find_address(req):
+    for address in store.addresses[req.user["id"]]:
+        if address["id"] == req.params["id"]:
+            return address
+    raise ApiError(404, "NOT_FOUND", "Address not found")
+
+
+@route("PUT", "/user/addresses/<id>", "user")
+async def address_update(req):
+    address = find_address(req)
+    data = req.json()
+    for field in ("label", "address", "landmark"):
+        if field in data:
+            address[field] = data[field]
+    return Response(address)
+
+
+@route("PATCH", "/user/addresses/<id>/default", "user")
+async def address_default(req):
+    target = find_address(req)
+    for address in store.addresses[req.user["id"]]:
+        address["isDefault"] = address is target
+    return Response({"message": "Default address updated"})
+
+
+@route("DELETE", "/user/addresses/<id>/delete", "user")
+async def address_delete(req):
+    target = find_address(req)
+    store.addresses[req.user["id"]].remove(target)
+    return Response({"message": "Address deleted"})
+
+
+# ---------------------------------------------------------------------------
+# Products
+# ---------------------------------------------------------------------------
+CACHED_GROUPS = ("products", "catalog")
+
+
+product_cache = TTLCache(CATALOG_CACHE_TTL)  # rendered product views by path + query
+
+
+async def cached_view(req, group, fn, key):
+    body = product_cache.get(key)
+    if body is not None:
+        await simulate_latency("cache")
+        return Response(body), "HIT"
+    resp = await fn(req)
+    await simulate_latency(group)  # query + render; a save landing now is overwritten by this older body
+    product_cache.set(key, snapshot(resp.body))
+    return resp, "MISS"
+
+
+def in_stock(kind):
+    return [row for row in store.catalog[kind].values() if row.get("quantityInStock", 0) > 0]
+
+
+@route("GET", "/products/bundles", "products")
+async def products_bundles(req):
+    return Response({"bundles": in_stock("bundles")})
+
+
+@route("GET", "/products/mealpacks", "products")
+async def products_mealpacks(req):
+    return Response({"mealPacks": in_stock("mealpacks")})
+
+
+@route("GET", "/products/readyeat", "products")
+async def products_readyeat(req):
+    return Response({"items": in_stock("readyeat")})
+
+
+@route("GET", "/products/snacks", "products")
+async def products_snacks(req):
+    rows = in_stock("snacks")
+    category = req.query.get("category")
+    items = [row for row in rows if not category or category == "All" or row["category"] == category]
+    return Response({"items": items, "categories": categories_of(rows)})
+
+
+@route("GET", "/products/restock", "products")
+async def products_restock(req):
+    rows = in_stock("restock")
+    category = req.query.get("category")
+    q = req.query.get("q", "").lower()
+    items = [
+        row for row in rows
+        if (not category or category == "All" or row["category"] == category)
+        and (not q or q in row["name"].lower() or q in row.get("brand", "").lower())
+    ]
+    return Response({"items": items, "categories": categories_of(rows)})
+
+
+@route("GET", "/products/catalog", "catalog")
+async def products_catalog(req):
+    catalog = {}
+    for kind in ("restock", "snacks", "bundles", "mealpacks", "readyeat"):
+        rows = in_stock(kind)
+        catalog[kind] = {"categories": categories_of(rows), "items": rows}
+    return Response({"catalog": catalog})
+
+
+@route("POST", "/products/import-smallproducts", "import")
+async def products_import(req):
+    rows = req.json().get("products")
+    if not isinstance(rows, list) or not rows:
+        raise ApiError(400, "MISSING_FIELDS", "products must be a non-empty list")
+
+    created = updated = 0
+    restock = store.catalog["restock"]
+    for number, row in enumerate(rows, 1):
+        if not row.get("id") or not row.get("name"):
+            raise ApiError(400, "MISSING_FIELDS", "every product needs id and name")
+        event = "product_updated" if row["id"] in restock else "product_created"
+        if row["id"] in restock:
+            updated += 1
+        else:
+            created += 1
+        restock[row["id"]] = dict(row, imageUrl=row.get("imageUrl", ""), quantityInStock=row.get("quantityInStock", 50))
+        product_cache.invalidate()  # post_save signal, once per row
+        channels.group_send("products", {"type": event, "productType": "restock", "product": restock[row["id"]]})
+        if LATENCY_SCALE > 0 and (number % IMPORT_YIELD_ROWS == 0 or number == len(rows)):
+            # Rows save one after another, so reads interleave with a running import.
+            await asyncio.sleep(IMPORT_YIELD_ROWS * IMPORT_ROW_MS * LATENCY_SCALE / 1000)
+    return Response({"created": created, "updated": updated, "total": len(rows)})
+
+
+# ---------------------------------------------------------------------------
+# Orders
+# ---------------------------------------------------------------------------
+def order_summary(order):
+    summary = dict(order)
+    summary["items"] = [
+        {"name": item["name"], "emoji": item["emoji"], "imageUrl": item.get("imageUrl", ""), "qty": item["qty"]}
+        for item in order["items"]
+    ]
+    return summary
+
+
+def find_order(user_id, order_id):
+    for order in store.orders[user_id]:
+        if order["id"] == order_id:
+            return order
+    raise ApiError(404, "NOT_FOUND", "Order not found")
+
+
+@route("POST", "/orders/create", "orders.write")
+async def orders_create(req):
+    data = req.json()
+    items = data.get("items") or []
+    if not items:
+        raise ApiError(400, "EMPTY_CART", "Order submitted with no items")
+    total = data.get("total")
+    if not isinstance(total, int) or total <= 0:
+        raise ApiError(400, "MISSING_FIELDS", "total must be a positive integer (kobo)")
+
+    method = data.get("paymentMethod", "wallet")
+    if method not in ("wallet", "paystack", "paystack_inline"):
+        raise ApiError(400, "INVALID_PAYMENT_METHOD", f"Unknown paymentMethod: {method}")
+
+    user = req.user
+    if method == "wallet" and user["walletBalance"] < total:
+        raise ApiError(400, "INSUFFICIENT_BALANCE", "Wallet balance too low for order")
+
+    order = {
+        "id": new_id(),
+        "status": "CONFIRMED" if method == "wallet" else "PENDING",
+        "total": total,
+        "note": data.get("note", ""),
+        "eta": "Tomorrow by 10am",
+        "paymentMethod": method,
+        "paymentReference": None,
+        "addressId": data.get("addressId"),
+        "items": [
+            {
+                "id": new_id(),
+                "itemType": item.get("itemType", "product"),
+                "name": item.get("name", ""),
+                "emoji": item.get("emoji", ""),
+                "imageUrl": item.get("imageUrl", ""),
+                "qty": item.get("qty", 1),
+                "unitPrice": item.get("unitPrice", 0),
+                "totalPrice": item.get("totalPrice", 0),
+                "meta": item.get("meta"),
+            }
+            for item in items
+        ],
+        "createdAt": now_iso(),
+    }
+    store.orders[user["id"]].insert(0, order)
+    broadcast_order(user["id"], order, "order_created")
+    notify(user["id"], "order_created", "Order placed", f"Order {order['id'][:8]} has been placed.",
+           orderId=order["id"], status=order["status"])
+
+    if method == "wallet":
+        user["walletBalance"] -= total
+        store.add_transaction(user["id"], total, "DEBIT_ORDER", f"Order {order['id'][:8]}", order["id"])
+        return Response({"order": order, "walletBalance": user["walletBalance"]}, status=201)
+
+    reference = f"order_{secrets.token_hex(8)}"
+    order["paymentReference"] = reference
+    body = {"order": order, "reference": reference}
+    if method == "paystack":
+        access_code = secrets.token_hex(5)
+        if PAYSTACK_URL:
+            data = await paystack_initialize(req, total, reference, purpose="order_payment", order_id=order["id"])
+            access_code = data["access_code"]
+        body.update({"authorizationUrl": f"https://checkout.paystack.com/{access_code}", "accessCode": access_code})
+    return Response(body, status=201)
+
+
+@route("GET", "/orders/", "orders")
+async def orders_list(req):
+    rows = store.orders[req.user["id"]]
+    status = req.query.get("status")
+    if status:
+        rows = [order for order in rows if order["status"] == status]
+    return Response(await paginate([order_summary(order) for order in rows], req, "orders"))
+
+
+@route("GET", "/orders/verify-payment", "paystack")
+async def orders_verify_payment(req):
+    reference = req.query.get("reference")
+    if not reference:
+        raise ApiError(400, "MISSING_REFERENCE", "reference is required")
+    for order in store.orders[req.user["id"]]:
+        if order["paymentReference"] == reference:
+            if order["status"] == "PENDING" and PAYSTACK_URL:
+                apply_charge(await paystack_verify(req, reference))
+            # Without a Paystack stand-in nothing is ever paid, so a pending order stays pending.
+            if order["status"] == "PENDING":
+                raise ApiError(400, "PAYMENT_NOT_SUCCESSFUL", "Payment has not been completed")
+            return Response({"status": "success", "message": "Order confirmed", "order": order})
+    raise ApiError(404, "NOT_FOUND", "No order for this reference")
+
+
+@route("GET", "/orders/<id>", "orders")
+async def orders_detail(req):
+    return Response({"order": find_order(req.user["id"], req.params["id"])})
+
+
+# ---------------------------------------------------------------------------
+# Paystack (only with --paystack-url; see paystack_mock.py)
+# ---------------------------------------------------------------------------
+def paystack_email(user):
+    return user["email"] or f"{user['phone'].lstrip('+')}@baza.ng"
+
+
+async def paystack_call(req, method, path, body=None):
+    """Call the Paystack stand-in; the time spent is reported as ``Server-Timing: paystack;dur``."""
+    start = time.perf_counter()
+    try:
+        resp = await asyncio.to_thread(
+            requests.request, method, f"{PAYSTACK_URL}{path}", json=body, timeout=30,
+            headers={"Authorization": f"Bearer {PAYSTACK_SECRET_KEY}"},
+        )
+        payload = resp.json()
+    except (requests.RequestException, ValueError) as e:
+        raise ApiError(502, "PAYSTACK_ERROR", f"Paystack request failed: {e}")
+    finally:
+        req.paystack_ms += (time.perf_counter() - start) * 1000
+    if resp.status_code >= 300 or not payload.get("status"):
+        raise ApiError(502, "PAYSTACK_ERROR", payload.get("message") or "Paystack error")
+    return payload.get("data")
+
+
+async def paystack_initialize(req, amount, reference, purpose, **metadata):
+    return await paystack_call(req, "POST", "/transaction/initialize", {
+        "email": paystack_email(req.user),
+        "amount": amount,
+        "reference": reference,
+        "metadata": {"user_id": req.user["id"], "purpose": purpose, **metadata},
+    })
+
+
+async def paystack_verify(req, reference):
+    data = await paystack_call(req, "GET", f"/transaction/verify/{reference}")
+    if data.get("status") != "success":
+        raise ApiError(400, "PAYMENT_NOT_SUCCESSFUL", f"Payment status: {data.get('status')}")
+    if (data.get("metadata") or {}).get("user_id") != req.user["id"]:
+        raise ApiError(404, "NOT_FOUND", "No payment for this reference")
+    return data
+
+
+# ---------------------------------------------------------------------------
+# Wallet
+# ---------------------------------------------------------------------------
+@route("GET", "/wallet/paystack-config", "wallet")
+async def wallet_paystack_config(req):
+    return Response({"publicKey": PAYSTACK_PUBLIC_KEY})
+
+
+@route("GET", "/wallet/balance", "wallet")
+async def wallet_balance(req):
+    user = req.user
+    return Response({
+        "balance": user["walletBalance"],
+        "accountNumber": user["accountNumber"],
+        "bankName": user["bankName"],
+        "accountName": user["accountName"],
+    })
+
+
+@route("GET", "/wallet/account", "paystack")
+async def wallet_account(req):
+    user = req.user
+    if not user["dvaAssigned"] and PAYSTACK_URL:
+        customer = await paystack_call(req, "POST", "/customer", {
+            "email": paystack_email(user), "phone": user["phone"], "first_name": user["name"],
+        })
+        store.customers[customer["customer_code"]] = user["id"]
+        user["paystackCustomerCode"] = customer["customer_code"]
+        account = await paystack_call(req, "POST", "/dedicated_account", {"customer": customer["customer_code"]})
+        user.update({
+            "accountNumber": account["account_number"],
+            "bankName": account["bank"]["name"],
+            "accountName": account["account_name"],
+            "dvaAssigned": True,
+        })
+    elif not user["dvaAssigned"]:
+        user.update({
+            "accountNumber": "".join(random.choice("0123456789") for _ in range(10)),
+            "bankName": "Test Bank",
+            "accountName": f"BAZA/{user['name']}",
+            "dvaAssigned": True,
+        })
+    return Response({
+        "accountNumber": user["accountNumber"],
+        "bankName": user["bankName"],
+        "accountName": user["accountName"],
+        "assigned": user["dvaAssigned"],
+        "walletBalance": user["walletBalance"],
+    })
+
+
+@route("GET", "/wallet/transactions", "wallet")
+async def wallet_transactions(req):
+    return Response(await paginate(store.transactions[req.user["id"]], req, "transactions"))
+
+
+@route("POST", "/wallet/topup", "paystack")
+async def wallet_topup(req):
+    amount = req.json().get("amount")
+    if not isinstance(amount, int) or amount <= 0:
+        raise ApiError(400, "MISSING_FIELDS", "amount must be a positive integer (kobo)")
+    reference = f"topup_{secrets.token_hex(8)}"
+    access_code = secrets.token_hex(5)
+    if PAYSTACK_URL:
+        access_code = (await paystack_initialize(req, amount, reference, purpose="wallet_topup"))["access_code"]
+    store.pending_topups[reference] = (req.user["id"], amount)
+    return Response({
+        "authorizationUrl": f"https://checkout.paystack.com/{access_code}",
+        "accessCode": access_code,
+        "reference": reference,
+    })
+
+
+@route("GET", "/wallet/verify-topup", "paystack")
+async def wallet_verify_topup(req):
+    reference = req.query.get("reference")
+    if not reference:
+        raise ApiError(400, "MISSING_REFERENCE", "reference is required")
+    if reference not in store.credited and PAYSTACK_URL:
+        apply_charge(await paystack_verify(req, reference))
+    if reference in store.credited:
+        return Response({"status": "success", "message": "Wallet credited",
+                         "walletBalance": req.user["walletBalance"], "amount": store.credited[reference]})
+    if reference in store.pending_topups:
+        raise ApiError(400, "PAYMENT_NOT_SUCCESSFUL", "Payment has not been completed")
+    raise ApiError(502, "PAYSTACK_ERROR", "Transaction reference not found")
+
+
+# ---------------------------------------------------------------------------
+# Webhooks
+# ---------------------------------------------------------------------------
+def apply_charge(data):
+    reference = data.get("reference")
+    amount = data.get("amount")
+    if not reference or not isinstance(amount, int) or reference in store.credited:
+        return  # Paystack redelivers: a reference is applied at most once
+    metadata = data.get("metadata") or {}
+    if data.get("channel") == "dedicated_nuban":
+        user = store.users.get(store.customers.get((data.get("customer") or {}).get("customer_code")))
+    else:
+        user = store.users.get(metadata.get("user_id"))
+    if user is None:
+        return
+
+    store.credited[reference] = amount
+    if metadata.get("purpose") == "order_payment":
+        for order in store.orders[user["id"]]:
+            if order["paymentReference"] == reference and order["status"] == "PENDING":
+                order["status"] = "CONFIRMED"
+                store.add_transaction(user["id"], amount, "DEBIT_ORDER", f"Order {order['id'][:8]}", reference)
+                broadcast_order(user["id"], order, "order_update")
+                notify(user["id"], "payment_success", "Payment received",
+                       f"Payment for order {order['id'][:8]} was successful.", orderId=order["id"],
+                       status=order["status"])
+        return
+
+    store.pending_topups.pop(reference, None)
+    user["walletBalance"] += amount
+    if data.get("channel") == "dedicated_nuban":
+        store.add_transaction(user["id"], amount, "CREDIT_TRANSFER", "Bank transfer", reference)
+    else:
+        store.add_transaction(user["id"], amount, "CREDIT_CARD", "Card top-up", reference)
+    notify(user["id"], "payment_success", "Wallet funded", f"₦{amount / 100:,.2f} was added to your wallet.")
+
+
+@route("POST", "/webhooks/paystack", "webhook", auth=False)
+async def webhooks_paystack(req):
+    if not verify_paystack_signature(req.raw_body, req.headers.get(SIGNATURE_HEADER)):
+        raise ApiError(400, "INVALID_SIGNATURE", "Invalid Paystack signature")
+    event = req.json()
+    data = event.get("data") or {}
+    if event.get("event") == "charge.success":
+        apply_charge(data)
+    elif event.get("event") == "dedicatedaccount.assign.success":
+        user = store.users.get(store.customers.get((data.get("customer") or {}).get("customer_code")))
+        account = data.get("dedicated_account") or {}
+        if user is not None and account.get("account_number"):
+            user.update({
+                "accountNumber": account["account_number"],
+                "accountName": account.get("account_name", user["accountName"]),
+                "bankName": (account.get("bank") or {}).get("name", user["bankName"]),
+                "dvaAssigned": True,
+            })
+    return Response({"received": True})
+
+
+# ---------------------------------------------------------------------------
+# Referral & Support
+# ---------------------------------------------------------------------------
+@route("GET", "/referral/stats", "referral")
+async def referral_stats(req):
+    return Response({
+        "code": req.user["referralCode"],
+        "totalReferrals": 0,
+        "pendingCredits": 0,
+        "paidCredits": 0,
+        "referrals": [],
+    })
+
+
+@route("GET", "/support/thread", "support")
+async def support_thread(req):
+    return Response({"messages": store.support[req.user["id"]], "humanJoined": False})
+
+
+@route("POST", "/support/message", "support")
+async def support_message(req):
+    text = (req.json().get("text") or "").strip()
+    if not text:
+        raise ApiError(400, "MISSING_FIELDS", "text is required")
+    flagged = any(word in text.lower() for word in ("wrong", "missing", "refund", "complaint"))
+    user_message = {"id": new_id(), "text": text, "sender": "USER", "flagged": flagged, "createdAt": now_iso()}
+    ai_reply = {
+        "id": new_id(),
+        "text": "Thanks for reaching out! I'm here to help. Could you provide more details about your question?",
+        "sender": "AI",
+        "flagged": flagged,
+        "createdAt": now_iso(),
+    }
+    store.support[req.user["id"]].extend([user_message, ai_reply])
+    return Response({"userMessage": user_message, "aiReply": ai_reply, "humanJoined": False, "flagged": flagged})
+
+
+# ---------------------------------------------------------------------------
+# Notifications
+# ---------------------------------------------------------------------------
+def notify(user_id, event_type, title, body, **data):
+    """Store an AppNotification now and push it to the user's socket after the "notify" latency."""
+    notification = {
+        "id": new_id(),
+        "eventType": event_type,
+        "title": title,
+        "body": body,
+        "audience": "customer",
+        "data": dict(data, userId=user_id),
+        "isRead": False,
+        "readAt": None,
+        "createdAt": now_iso(),
+    }
+    store.notifications[user_id].insert(0, notification)
+    delay = 0.0
+    if LATENCY_SCALE > 0:
+        delay = LATENCY_MS["notify"] / 1000 * math.exp(random.gauss(0, LATENCY_SIGMA)) * LATENCY_SCALE
+    asyncio.get_running_loop().call_later(delay, channels.group_send, f"user_{user_id}_notifications",
+                                          {"type": "notification", "notification": notification})
+
+
+@route("GET", "/notifications", "user")
+async def notifications_list(req):
+    rows = store.notifications[req.user["id"]]
+    try:
+        limit = min(100, max(1, int(req.query.get("limit", 20))))
+        offset = max(0, int(req.query.get("offset", 0)))
+    except ValueError:
+        raise ApiError(400, "MISSING_FIELDS", "limit and offset must be integers")
+    return Response({
+        "notifications": rows[offset:offset + limit],
+        "count": len(rows),
+        "unreadCount": sum(1 for row in rows if not row["isRead"]),
+        "pagination": {"limit": limit, "offset": offset},
+    })
+
+
+# ---------------------------------------------------------------------------
+# AI assistant
+# ---------------------------------------------------------------------------
+# Median tool latency in ms; chat turns also pay LLM_MS per model round-trip.
+TOOL_LATENCY_MS = {
+    "search_products": 140,
+    "list_bundles": 60,
+    "list_mealpacks": 60,
+    "list_readyeat": 60,
+    "list_snacks": 60,
+    "get_product_details": 40,
+    "get_product_categories": 30,
+    "get_user_profile": 25,
+    "get_wallet_balance": 25,
+    "list_orders": 70,
+    "get_order_status": 45,
+    "list_addresses": 30,
+    "create_order": 260,
+    "add_to_cart": 50,
+    "view_cart": 35,
+    "remove_from_cart": 45,
+    "clear_cart": 40,
+    "checkout_cart": 320,
+}
+LLM_MS = 900
+TOKENS_PER_SEC = 45
+
+# Phrases that make the stand-in "decide" to call a tool (explicit tool names always do).
+TOOL_TRIGGERS = [
+    ("profile", "get_user_profile"),
+    ("wallet balance", "get_wallet_balance"),
+    ("categor", "get_product_categories"),
+    ("search", "search_products"),
+    ("bundle", "list_bundles"),
+    ("meal pack", "list_mealpacks"),
+    ("ready to eat", "list_readyeat"),
+    ("snacks in stock", "list_snacks"),
+    ("address", "list_addresses"),
+    ("recent orders", "list_orders"),
+    ("track", "get_order_status"),
+    ("details for", "get_product_details"),
+    ("clear my cart", "clear_cart"),
+    ("current cart", "view_cart"),
+    ("place the order", "create_order"),
+]
+
+
+def pick_tools(prompt):
+    text = prompt.lower()
+    tools = [name for name in TOOL_LATENCY_MS if name in text]
+    for phrase, name in TOOL_TRIGGERS:
+        if phrase in text and name not in tools:
+            tools.append(name)
+    return tools
+
+
+async def sample_ms(median_ms):
+    if LATENCY_SCALE <= 0:
+        return 0.0
+    ms = median_ms * math.exp(random.gauss(0, LATENCY_SIGMA)) * LATENCY_SCALE
+    await asyncio.sleep(ms / 1000)
+    return ms
+
+
+def find_ai_session(req, session_id):
+    session = store.ai_sessions.get(session_id)
+    if not session or session["userId"] != req.user["id"]:
+        raise ApiError(404, "NOT_FOUND", "Session not found")
+    return session
+
+
+def ai_session_view(session):
+    return {"id": session["id"], "title": session["title"], "createdAt": session["createdAt"],
+            "updatedAt": session["updatedAt"]}
+
+
+@route("GET", "/ai/suggestions", "ai")
+async def ai_suggestions(req):
+    return Response({"suggestions": [
+        {"text": "What can I cook tonight?", "action": "suggest_meal"},
+        {"text": "Restock my pantry", "action": "restock"},
+        {"text": "Show my recent orders", "action": "list_orders"},
+    ]})
+
+
+@route("GET", "/ai/sessions", "ai")
+async def ai_sessions(req):
+    rows = [ai_session_view(s) for s in store.ai_sessions.values() if s["userId"] == req.user["id"]]
+    return Response({"sessions": rows})
+
+
+@route("POST", "/ai/sessions", "ai")
+async def ai_session_create(req):
+    session_id = new_id()
+    store.ai_sessions[session_id] = {
+        "id": session_id,
+        "userId": req.user["id"],
+        "title": req.json().get("title") or "New chat",
+        "createdAt": now_iso(),
+        "updatedAt": now_iso(),
+        "messages": [],
+    }
+    return Response({"session": ai_session_view(store.ai_sessions[session_id])}, status=201)
+
+
+async def chat_turn(req, session, prompt):
+    """Yield (event, data) pairs for one chat turn; the last one is ("done", response body)."""
+    # One model call to choose tools, the tools themselves, then the streamed answer.
+    tool_calls = []
+    llm_ms = await sample_ms(LLM_MS)
+    for name in pick_tools(prompt):
+        yield "tool_call", {"name": name, "arguments": {}}
+        duration = await sample_ms(TOOL_LATENCY_MS[name])
+        call = {"name": name, "arguments": {}, "durationMs": round(duration, 1)}
+        tool_calls.append(call)
+        yield "tool_result", call
+    if tool_calls:
+        llm_ms += await sample_ms(LLM_MS / 2)
+
+    if tool_calls:
+        content = (f"Done — I used {', '.join(c['name'] for c in tool_calls)}. Here is what I found for you; "
+                   "let me know if you would like to add anything to your cart or change a quantity.")
+    else:
+        content = "Sure! How can I help with your shopping today? I can search products, build a cart or track orders."
+    for word in content.split(" "):
+        yield "token", {"delta": word + " "}
+        llm_ms += await sample_ms(1000 / TOKENS_PER_SEC)
+
+    metadata = {"toolCalls": tool_calls, "timing": {"llmMs": round(llm_ms, 1)}}
+    listed = [call["name"] for call in tool_calls if call["name"].startswith(("list_", "search_"))]
+    if listed:
+        metadata["items"] = [
+            {"id": row["id"], "name": row["name"], "price": row.get("price"), "category": row.get("category", ""),
+             "inStock": True}
+            for row in in_stock("snacks")[:5]
+        ]
+    if "list_orders" in listed:
+        metadata["orders"] = [order_summary(order) for order in store.orders[req.user["id"]][:5]]
+
+    user_message = {"id": new_id(), "role": "user", "content": prompt, "messageType": "text", "metadata": None,
+                    "createdAt": now_iso()}
+    reply = {
+        "id": new_id(),
+        "role": "assistant",
+        "content": content,
+        "messageType": "product_list" if "items" in metadata else "text",
+        "metadata": metadata,
+        "createdAt": now_iso(),
+    }
+    session["messages"].extend([user_message, reply])
+    session["updatedAt"] = now_iso()
+    yield "done", {"message": reply, "session": ai_session_view(session), "model": "mock-llm"}
+
+
+@route("POST", "/ai/chat", "ai")
+async def ai_chat(req):
+    data = req.json()
+    prompt = (data.get("message") or "").strip()
+    if not prompt:
+        raise ApiError(400, "MISSING_FIELDS", "message is required")
+    session = find_ai_session(req, data.get("sessionId"))
+
+    events = chat_turn(req, session, prompt)
+    if data.get("stream") or "text/event-stream" in req.headers.get("accept", ""):
+        return StreamingResponse(events)
+    async for event, body in events:
+        if event == "done":
+            return Response(body)
+
+
+@route("GET", "/ai/history", "ai")
+async def ai_history(req):
+    session = find_ai_session(req, req.query.get("sessionId"))
+    return Response({"messages": session["messages"], "session": ai_session_view(session)})
+
+
+# ---------------------------------------------------------------------------
+# ASGI entrypoint
+# ---------------------------------------------------------------------------
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def send_json(send, status, payload, cookies=(), server_ms=None, paystack_ms=None, extra_headers=()):
+    body = json.dumps(payload, default=str).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    headers += [(b"set-cookie", cookie.encode()) for cookie in cookies]
+    headers += [(name.encode(), value.encode()) for name, value in extra_headers]
+    if server_ms is not None:
+        timing = f"app;dur={server_ms:.1f}"
+        if paystack_ms:
+            timing += f", paystack;dur={paystack_ms:.1f}"
+        headers.append((b"server-timing", timing.encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_sse(send, resp):
+    headers = [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")]
+    await send({"type": "http.response.start", "status": resp.status, "headers": headers})
+    async for event, data in resp.events:
+        chunk = f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode()
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def dispatch(req, group, auth, fn, query):
+    """Run a route behind ResponseCacheMiddleware; returns (response, X-Cache value or None)."""
+    if req.method != "GET":
+        await simulate_latency(group)
+        if auth:
+            req.user = authenticate(req)
+        return await fn(req), None
+
+    if auth:
+        req.user = authenticate(req)
+    key = f"{req.user['id']}:{req.path}?{query}" if req.user and response_cache.ttl > 0 else None
+    if key:
+        cached = response_cache.get(key)
+        if cached is not None:
+            await simulate_latency("cache")
+            return Response(*cached), "HIT"
+    if group in CACHED_GROUPS:
+        resp, state = await cached_view(req, group, fn, f"{req.path}?{query}")
+    else:
+        await simulate_latency(group)
+        resp, state = await fn(req), "MISS" if key else None
+    # Not invalidated by writes: a user's own update can read back stale for up to the TTL.
+    if key and isinstance(resp, Response) and resp.status == 200 and not resp.cookies:
+        response_cache.set(key, (snapshot(resp.body), resp.status))
+    return resp, state
+
+
+class InFlight:
+    """Requests currently inside the app, for the ConcurrencyLimitMiddleware stand-in."""
+
+    def __init__(self):
+        self.count = 0
+        self.peak = 0
+        self.shed = 0
+
+
+in_flight = InFlight()
+
+
+async def handle_http(scope, receive, send):
+    # ConcurrencyLimitMiddleware is first in the stack: shed before reading the body or routing.
+    if CONCURRENCY_LIMIT and in_flight.count >= CONCURRENCY_LIMIT:
+        in_flight.shed += 1
+        await send_json(send, 503, {"error": "Server Busy", "code": "SERVER_BUSY"},
+                        extra_headers=[("retry-after", str(BUSY_RETRY_AFTER))])
+        return
+    in_flight.count += 1
+    in_flight.peak = max(in_flight.peak, in_flight.count)
+    try:
+        await route_http(scope, receive, send)
+    finally:
+        in_flight.count -= 1
+
+
+async def route_http(scope, receive, send):
+    req = Request(scope, await read_body(receive))
+
+    matched_path = False
+    for method, regex, group, auth, fn in ROUTES:
+        match = regex.match(req.path)
+        if not match:
+            continue
+        matched_path = True
+        if method != req.method:
+            continue
+        req.params = match.groupdict()
+        start = time.perf_counter()
+        try:
+            resp, state = await dispatch(req, group, auth, fn, scope.get("query_string", b"").decode())
+        except ApiError as e:
+            server_ms = (time.perf_counter() - start) * 1000
+            await send_json(send, e.status, {"error": e.message, "code": e.code}, server_ms=server_ms,
+                            paystack_ms=req.paystack_ms)
+            return
+        if isinstance(resp, StreamingResponse):
+            await send_sse(send, resp)
+            return
+        server_ms = (time.perf_counter() - start) * 1000
+        await send_json(send, resp.status, resp.body, resp.cookies, server_ms=server_ms, paystack_ms=req.paystack_ms,
+                        extra_headers=[("x-cache", state)] if state else ())
+        return
+
+    if matched_path:
+        await send_json(send, 405, {"error": "Method not allowed", "code": "METHOD_NOT_ALLOWED"})
+    else:
+        await send_json(send, 404, {"error": "Not found", "code": "NOT_FOUND"})
+
+
+# ---------------------------------------------------------------------------
+# WebSockets (stand-in for Channels + the Redis channel layer)
+# ---------------------------------------------------------------------------
+class ChannelLayer:
+    """Named groups of per-socket queues; a full queue drops the message, as channels_redis does."""
+
+    def __init__(self, capacity=CHANNEL_CAPACITY):
+        self.capacity = capacity
+        self.groups = {}  # group -> set of asyncio.Queue
+        self.dropped = 0
+
+    def add(self, group, queue):
+        self.groups.setdefault(group, set()).add(queue)
+
+    def discard(self, group, queue):
+        members = self.groups.get(group)
+        if members is not None:
+            members.discard(queue)
+            if not members:
+                del self.groups[group]
+
+    def group_send(self, group, message):
+        for queue in self.groups.get(group, ()):
+            if queue.qsize() >= self.capacity:
+                self.dropped += 1
+            else:
+                queue.put_nowait(message)
+
+
+channels = ChannelLayer()
+
+
+def broadcast_order(user_id, order, event):
+    message = {"type": event, "order": order_summary(order)}
+    channels.group_send(f"user_{user_id}_orders", message)
+    channels.group_send("admin_orders", message)
+
+
+def socket_groups(path, user):
+    if path == "/ws/orders":
+        return [f"user_{user['id']}_orders"] + (["admin_orders"] if user["phone"] in ADMIN_PHONES else [])
+    if path == "/ws/products":
+        return ["products"]
+    if path == "/ws/notifications":
+        return [f"user_{user['id']}_notifications"]
+    return None
+
+
+async def handle_websocket(scope, receive, send):
+    await receive()  # websocket.connect
+    query = {k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+    entry = store.access_tokens.get(query.get("token", ""))
+    user = store.users[entry[0]] if entry and entry[1] >= time.time() else None
+    groups = socket_groups(scope["path"].rstrip("/"), user) if user else None
+    if groups is None:
+        await send({"type": "websocket.close", "code": 4001 if user is None else 4004})
+        return
+
+    queue = asyncio.Queue()
+    await send({"type": "websocket.accept"})
+    hello = {"type": "connected", "message": "Stream open", "groups": groups}
+    await send({"type": "websocket.send", "text": json.dumps(hello)})
+    for group in groups:
+        channels.add(group, queue)
+
+    async def pump():
+        while True:
+            message = await queue.get()
+            await send({"type": "websocket.send", "text": json.dumps(message, default=str)})
+
+    pumping = asyncio.create_task(pump())
+    try:
+        while (await receive())["type"] != "websocket.disconnect":
+            pass  # client pings and messages are ignored
+    finally:
+        pumping.cancel()
+        for group in groups:
+            channels.discard(group, queue)
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] == "http":
+        await handle_http(scope, receive, send)
+    elif scope["type"] == "websocket":
+        await handle_websocket(scope, receive, send)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for the Baza /v1 API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--otp", default=OTP_CODE, help="the only OTP accepted by otp-verify")
+    parser.add_argument("--latency-scale", type=float, default=LATENCY_SCALE,
+                        help="multiplier on the per-route median latency (0 disables)")
+    parser.add_argument("--latency-sigma", type=float, default=LATENCY_SIGMA,
+                        help="log-normal sigma of the latency distribution")
+    parser.add_argument("--wallet-balance", type=int, default=START_BALANCE,
+                        help="starting wallet balance for new users, in kobo")
+    parser.add_argument("--otp-rate-limit", type=int, default=OTP_RATE_LIMIT,
+                        help="otp-request calls allowed per phone per 10 minutes (0 disables)")
+    parser.add_argument("--paystack-url", default=PAYSTACK_URL,
+                        help="Paystack stand-in (paystack_mock.py) for top-ups, order payments and DVAs")
+    parser.add_argument("--concurrency-limit", type=int, default=CONCURRENCY_LIMIT,
+                        help="in-flight requests before 503 Server Busy (0 disables)")
+    args = parser.parse_args()
+
+    configure(
+        otp=args.otp,
+        latency_scale=args.latency_scale,
+        latency_sigma=args.latency_sigma,
+        wallet_balance=args.wallet_balance,
+        otp_rate_limit=args.otp_rate_limit,
+        paystack_url=args.paystack_url,
+        concurrency_limit=args.concurrency_limit,
+    )
+
+    from daphne.endpoints import build_endpoint_description_strings
+    from daphne.server import Server
+
+    print(f"Baza mock API on http://{args.host}:{args.port}/v1 (OTP {OTP_CODE}, latency x{LATENCY_SCALE})")
+    Server(application=app, endpoints=build_endpoint_description_strings(host=args.host, port=args.port)).run()
+
+
+if __name__ == "__main__":
+    main()
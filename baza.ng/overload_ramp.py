@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+overload_ramp.py — ConcurrencyLimitMiddleware saturation and Retry-After behaviour
+==================================================================================
+
+ConcurrencyLimitMiddleware lets 2500 requests be in flight and answers the
+rest with 503 Server Busy plus Retry-After. This test drives the API past
+that point and back:
+
+    ramp      offered load climbs from --start-rate to --peak-rate req/s
+    hold      stays at the peak for --hold seconds
+    recover   drops to --recover-rate for --recover seconds
+
+Requests are issued open-loop at the scheduled rate, whatever the response
+times. A 503 is retried according to --retry-policy:
+
+    jitter    wait Retry-After × (1 + U(0, --jitter)) — what clients should do
+    lockstep  wait exactly Retry-After, so every shed client comes back at once
+    eager     retry after 50 ms, ignoring Retry-After
+    none      give up on the first 503
+
+The report shows, per time bucket, offered load against goodput (200s/s)
+and the shed share, when shedding started and at what offered load, how
+long after the load dropped the server stopped shedding, and how bunched
+the retries were (peak/mean retries per 100 ms: ~1 is evenly spread,
+lockstep clients show up as tall spikes).
+
+Usage:
+    ACCESS_TOKEN="<token>" python overload_ramp.py --peak-rate 3000 --ramp 60 --hold 30
+    ACCESS_TOKEN="<token>" python overload_ramp.py --retry-policy lockstep       # compare with jitter
+    python mock_api.py --concurrency-limit 200 &
+    OTP=1111 BASE_URL=http://127.0.0.1:8000 python overload_ramp.py --peak-rate 1500 --max-inflight 1000
+
+Every request carries a unique query parameter so ResponseCacheMiddleware
+cannot answer it from cache.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from baza_client import BASE_URL, BazaClient
+from loadstats import percentile
+
+ACCESS_TOKEN = os.getenv("ACCESS_TOKEN", "")
+PHONE = os.getenv("PHONE", "+917204218098")
+OTP = os.getenv("OTP", "")
+
+EAGER_RETRY = 0.05
+RETRY_WINDOW = 0.1  # seconds per slot when measuring how bunched retries are
+FIELDS = ("offered", "attempts", "retries", "good", "shed", "errors", "gave_up")
+
+
+class Ramp:
+    """Offered rate at time t: linear ramp, hold at the peak, then the recovery rate."""
+
+    def __init__(self, start_rate, peak_rate, ramp, hold, recover_rate, recover):
+        self.start_rate = start_rate
+        self.peak_rate = peak_rate
+        self.ramp = ramp
+        self.hold = hold
+        self.recover_rate = recover_rate
+        self.drop_at = ramp + hold
+        self.duration = ramp + hold + recover
+
+    def rate(self, t):
+        if t < self.ramp:
+            return self.start_rate + (self.peak_rate - self.start_rate) * t / self.ramp
+        return self.peak_rate if t < self.drop_at else self.recover_rate
+
+    def phase(self, t):
+        return "ramp" if t < self.ramp else "hold" if t < self.drop_at else "recover"
+
+
+class Overload:
+    def __init__(self, client, path, ramp, policy, jitter, retries, bucket, max_inflight):
+        self.client = client
+        self.path = path
+        self.ramp = ramp
+        self.policy = policy
+        self.jitter = jitter
+        self.retries = retries
+        self.bucket = bucket
+        self.max_inflight = max_inflight
+        self.origin = 0.0
+        self.buckets = {}  # bucket index -> {field: count, "latency": [s]}
+        self.retry_times = []  # seconds since origin each retry was sent
+        self.inflight = 0
+        self.peak_inflight = 0
+
+    def slot(self, at):
+        index = int((at - self.origin) // self.bucket)
+        if index not in self.buckets:
+            self.buckets[index] = dict.fromkeys(FIELDS, 0)
+            self.buckets[index]["latency"] = []
+        return self.buckets[index]
+
+    def get(self):
+        try:
+            resp = self.client.get(self.path, params={"_": time.time_ns()})
+        except requests.RequestException:
+            return None, None
+        return resp.status_code, resp.headers.get("Retry-After")
+
+    def retry_delay(self, retry_after, attempt):
+        try:
+            wait = float(retry_after)
+        except (TypeError, ValueError):
+            wait = min(30, 2 ** attempt)
+        if self.policy == "eager":
+            return EAGER_RETRY
+        if self.policy == "jitter":
+            return wait * (1 + random.uniform(0, self.jitter))
+        return wait
+
+    async def request(self):
+        self.slot(time.perf_counter())["offered"] += 1
+        for attempt in range(self.retries + 1):
+            sent = time.perf_counter()
+            self.slot(sent)["attempts"] += 1
+            if attempt:
+                self.slot(sent)["retries"] += 1
+                self.retry_times.append(sent - self.origin)
+            self.inflight += 1
+            self.peak_inflight = max(self.peak_inflight, self.inflight)
+            status, retry_after = await asyncio.to_thread(self.get)
+            self.inflight -= 1
+            done = time.perf_counter()
+            bucket = self.slot(done)
+            if status == 200:
+                bucket["good"] += 1
+                bucket["latency"].append(done - sent)
+                return "ok" if attempt == 0 else "retried"
+            if status != 503:
+                bucket["errors"] += 1
+                return "error"
+            bucket["shed"] += 1
+            if self.policy == "none" or attempt == self.retries:
+                bucket["gave_up"] += 1
+                return "gave_up"
+            await asyncio.sleep(self.retry_delay(retry_after, attempt))
+        return "gave_up"
+
+    async def run(self):
+        # Every in-flight request holds a thread; size the pool so the client is not the bottleneck.
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=self.max_inflight))
+        self.origin = time.perf_counter()
+        tasks = set()
+        outcomes = {}
+
+        def finished(task):
+            tasks.discard(task)
+            outcomes[task.result()] = outcomes.get(task.result(), 0) + 1
+
+        t = 0.0
+        while t < self.ramp.duration:
+            delay = self.origin + t - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(self.request())
+            tasks.add(task)
+            task.add_done_callback(finished)
+            t += 1 / max(self.ramp.rate(t), 0.1)
+        if tasks:
+            await asyncio.wait(tasks)
+        return outcomes
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+def report(overload, outcomes):
+    ramp, size = overload.ramp, overload.bucket
+    rows = sorted(overload.buckets.items())
+    print(f"\n  {'t (s)':>6}  {'phase':<8} {'offered/s':>9} {'sent/s':>7} {'good/s':>7} {'shed %':>7} "
+          f"{'retries/s':>9} {'p50 ms':>7} {'p99 ms':>8}")
+    for index, b in rows:
+        t = index * size
+        latency = sorted(b["latency"])
+        shed_share = b["shed"] / max(b["good"] + b["shed"] + b["errors"], 1) * 100
+        print(f"  {t:>6.0f}  {ramp.phase(t):<8} {b['offered'] / size:>9.0f} {b['attempts'] / size:>7.0f} "
+              f"{b['good'] / size:>7.0f} {shed_share:>7.1f} {b['retries'] / size:>9.0f} "
+              f"{percentile(latency, 50) * 1000:>7.1f} {percentile(latency, 99) * 1000:>8.1f}")
+
+    shedding = [(index, b) for index, b in rows if b["shed"]]
+    print()
+    if not shedding:
+        print(f"  ✅ No 503s: the server absorbed {ramp.peak_rate:g} req/s (peak {overload.peak_inflight} in flight "
+              "from this client)")
+    else:
+        first = shedding[0][0] * size
+        print(f"  🚦 Shedding started at t={first:.0f}s, offered ≈ {ramp.rate(first):.0f} req/s, "
+              f"{sum(b['shed'] for _, b in rows):,} × 503 in total")
+        best = max(b["good"] for _, b in rows) / size
+        held = [b for index, b in rows if ramp.phase(index * size) == "hold"]
+        if held:
+            print(f"  Goodput at the peak: {sum(b['good'] for b in held) / (len(held) * size):.0f} req/s "
+                  f"for {ramp.peak_rate:g} offered (best bucket {best:.0f} req/s)")
+        last = shedding[-1][0] * size + size
+        if last <= ramp.drop_at:
+            print("  ✅ Shedding stopped before the load dropped")
+        elif last >= ramp.duration:
+            print(f"  ❌ Still shedding at the end of the {ramp.duration - ramp.drop_at:g}s recovery phase")
+        else:
+            print(f"  Recovery: last 503 {last - ramp.drop_at:.1f}s after the load dropped to "
+                  f"{ramp.recover_rate:g} req/s")
+
+    if len(overload.retry_times) > 1:
+        slots = {}
+        for at in overload.retry_times:
+            slots[int(at // RETRY_WINDOW)] = slots.get(int(at // RETRY_WINDOW), 0) + 1
+        span = max(slots) - min(slots) + 1
+        mean = len(overload.retry_times) / span
+        print(f"  Retries: {len(overload.retry_times):,}, peak {max(slots.values())} per {RETRY_WINDOW * 1000:.0f} ms "
+              f"vs mean {mean:.1f} (bunching x{max(slots.values()) / mean:.1f}, policy {overload.policy})")
+
+    total = sum(outcomes.values())
+    print(f"  Requests: {total:,} — {outcomes.get('ok', 0):,} first try, "
+          f"{outcomes.get('retried', 0):,} after retries, {outcomes.get('gave_up', 0):,} gave up, "
+          f"{outcomes.get('error', 0):,} errors")
+    if overload.peak_inflight >= overload.max_inflight:
+        print(f"  ⚠️  The client hit --max-inflight ({overload.max_inflight}); offered load was capped client-side")
+    return not outcomes.get("error")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Push past ConcurrencyLimitMiddleware and watch it shed and recover")
+    parser.add_argument("--path", default="/user/me", help="GET endpoint to load")
+    parser.add_argument("--start-rate", type=float, default=50, help="offered req/s at the start of the ramp")
+    parser.add_argument("--peak-rate", type=float, default=3000, help="offered req/s at the top of the ramp")
+    parser.add_argument("--ramp", type=float, default=60, help="seconds from start to peak")
+    parser.add_argument("--hold", type=float, default=20, help="seconds at the peak")
+    parser.add_argument("--recover-rate", type=float, default=50, help="offered req/s after the drop")
+    parser.add_argument("--recover", type=float, default=20, help="seconds at the recovery rate")
+    parser.add_argument("--retry-policy", choices=["jitter", "lockstep", "eager", "none"], default="jitter")
+    parser.add_argument("--jitter", type=float, default=1.0, help="extra wait as a share of Retry-After (jitter)")
+    parser.add_argument("--retries", type=int, default=3, help="retries per request after a 503")
+    parser.add_argument("--bucket", type=float, default=2.0, help="report bucket in seconds")
+    parser.add_argument("--max-inflight", type=int, default=4000, help="client threads (cap on open requests)")
+    args = parser.parse_args()
+
+    client = BazaClient(BASE_URL, token=ACCESS_TOKEN or None, pool_maxsize=args.max_inflight, auto_refresh=False,
+                        timeout=60)
+    if not ACCESS_TOKEN:
+        if not OTP:
+            sys.exit("Set ACCESS_TOKEN, or PHONE and OTP to log in.")
+        client.login(PHONE, OTP)
+
+    ramp = Ramp(args.start_rate, args.peak_rate, args.ramp, args.hold, args.recover_rate, args.recover)
+    overload = Overload(client, args.path, ramp, args.retry_policy, args.jitter, args.retries, args.bucket,
+                        args.max_inflight)
+    print(f"🚦 GET {args.path} on {BASE_URL}: {args.start_rate:g} → {args.peak_rate:g} req/s over {args.ramp:g}s, "
+          f"hold {args.hold:g}s, then {args.recover_rate:g} req/s for {args.recover:g}s "
+          f"(retry policy {args.retry_policy})")
+    outcomes = asyncio.run(overload.run())
+    sys.exit(0 if report(overload, outcomes) else 1)
+
+
+if __name__ == "__main__":
+    main()
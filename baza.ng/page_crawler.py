@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+page_crawler.py — Walk every page of /orders/ and /wallet/transactions
+======================================================================
+
+UserFlow.py and test_paystack.py only ever read page 1. This crawler walks
+a list endpoint to the end through the ``?page=&limit=`` convention, lazily:
+crawl() is a generator that fetches page n+1 only when page n has been
+consumed, following ``pagination.hasNext``. With --prefetch N, once page 1
+has given ``totalPages``, up to N later pages are fetched in parallel ahead
+of the consumer; pages are still yielded in order.
+
+For a heavy user (thousands of orders or transactions) LIMIT/OFFSET gets
+slower the deeper the page, since the database reads and discards every
+skipped row. The report groups page latency by depth (page 1, 2-5, 6-10,
+11-25, …), client-side and from Server-Timing, flags a slowdown when the
+deepest pages are more than --slowdown times slower than pages 1-5, and checks
+that the rows add up: every id once, as many as ``pagination.total``
+(inserts during a crawl shift OFFSET pages and show up as duplicates or
+gaps).
+
+Usage:
+    ACCESS_TOKEN="<token>" python page_crawler.py
+    ACCESS_TOKEN="<token>" python page_crawler.py --endpoint orders --limit 20 --prefetch 4
+    OTP=1111 PHONE=+2348012345678 BASE_URL=http://127.0.0.1:8000 python page_crawler.py --seed-orders 3000
+
+    from page_crawler import crawl
+
+    for page, rows, resp in crawl(client, "/orders/", "orders", limit=100):
+        ...
+
+--seed-orders creates that many unpaid Paystack orders first, so a test
+user becomes a heavy one without touching the wallet.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from baza_client import BASE_URL, BazaClient
+from http_timing import server_time_ms
+from loadstats import LatencyRecorder, percentile
+
+ACCESS_TOKEN = os.getenv("ACCESS_TOKEN", "")
+PHONE = os.getenv("PHONE", "+917204218098")
+OTP = os.getenv("OTP", "")
+
+ENDPOINTS = {"orders": ("/orders/", "orders"), "transactions": ("/wallet/transactions", "transactions")}
+DEPTHS = (1, 5, 10, 25, 50, 100, 250, 500)  # upper page of each depth bucket; deeper pages go in the last one
+SLOWDOWN = 2.0
+SEED_WORKERS = 16
+
+
+def depth_bucket(page):
+    low = 1
+    for high in DEPTHS:
+        if page <= high:
+            return f"{low}" if low == high else f"{low}-{high}"
+        low = high + 1
+    return f"{low}+"
+
+
+def fetch(client, path, key, page, limit, params):
+    # A throwaway query parameter keeps ResponseCacheMiddleware out of the measurement.
+    resp = client.get(path, params=dict(params, page=page, limit=limit, _=time.time_ns()))
+    if resp.status_code != 200:
+        raise RuntimeError(f"GET {path}?page={page} → {resp.status_code} {resp.text[:200]}")
+    return resp
+
+
+# ---------------------------------------------------------------------------
+# Crawler
+# ---------------------------------------------------------------------------
+def crawl(client, path, key, limit=100, prefetch=0, max_pages=None, **params):
+    """Yield (page, rows, response) for every page of ``path``, in order, one request at a time.
+
+    With ``prefetch`` > 0 the pages after page 1 are fetched by that many
+    threads, at most ``prefetch`` pages ahead of the consumer. Stopping the
+    iteration early cancels whatever has not been fetched yet.
+    """
+    resp = fetch(client, path, key, 1, limit, params)
+    body = resp.json()
+    yield 1, body.get(key, []), resp
+
+    pagination = body.get("pagination", {})
+    last = pagination.get("totalPages") or 1
+    if max_pages:
+        last = min(last, max_pages)
+
+    if not prefetch:
+        page = 1
+        while pagination.get("hasNext") and page < (max_pages or float("inf")):
+            page += 1
+            resp = fetch(client, path, key, page, limit, params)
+            body = resp.json()
+            pagination = body.get("pagination", {})
+            yield page, body.get(key, []), resp
+        return
+
+    pool = ThreadPoolExecutor(max_workers=prefetch)
+    pending = {}
+    try:
+        ahead = 2
+        for page in range(2, last + 1):
+            while ahead <= min(page + prefetch - 1, last):
+                pending[ahead] = pool.submit(fetch, client, path, key, ahead, limit, params)
+                ahead += 1
+            resp = pending.pop(page).result()
+            yield page, resp.json().get(key, []), resp
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def crawl_endpoint(client, name, limit, prefetch, max_pages, recorder, params):
+    """Crawl one endpoint; returns (depth rows, pages, row ids, reported total, wall seconds)."""
+    path, key = ENDPOINTS[name]
+    depths = {}  # depth bucket -> ([client s], [server ms])
+    ids = []
+    total = None
+    pages = 0
+    start = time.perf_counter()
+    for page, rows, resp in crawl(client, path, key, limit, prefetch, max_pages, **params):
+        if total is None:
+            total = resp.json().get("pagination", {}).get("total")
+        bucket = depth_bucket(page)
+        seconds = resp.timing.total_ms / 1000
+        recorder.record(f"{name} pages {bucket}", seconds)
+        latency, server = depths.setdefault(bucket, ([], []))
+        latency.append(seconds)
+        server.append(server_time_ms(resp))
+        ids.extend(row.get("id") for row in rows)
+        pages = page
+    if max_pages and pages >= max_pages:
+        total = None  # a partial crawl cannot be checked against pagination.total
+    return depths, pages, ids, total, time.perf_counter() - start
+
+
+def seed_orders(client, count):
+    item = {"name": "Pagination seed", "emoji": "📄", "qty": 1, "unitPrice": 100, "totalPrice": 100}
+
+    def create(n):
+        return client.create_order([item], 100, paymentMethod="paystack", note=f"page-crawler seed {n}").ok
+
+    with ThreadPoolExecutor(max_workers=SEED_WORKERS) as pool:
+        created = sum(pool.map(create, range(count)))
+    print(f"  🌱 Created {created:,}/{count:,} orders")
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+def report(name, depths, pages, ids, total, wall, slowdown):
+    print(f"\n  {name}: {pages:,} pages, {len(ids):,} rows in {wall:.2f}s ({len(ids) / max(wall, 1e-9):,.0f} rows/s)")
+    print(f"  {'pages':>9} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'server p50':>11}")
+    for bucket, (latency, server) in depths.items():
+        latency, server = sorted(latency), sorted(server)
+        print(f"  {bucket:>9} {len(latency):>6} {percentile(latency, 50) * 1000:>8.1f} "
+              f"{percentile(latency, 95) * 1000:>8.1f} {latency[-1] * 1000:>8.1f} {percentile(server, 50):>11.1f}")
+
+    ok = True
+    buckets = list(depths.values())
+    if len(buckets) > 1:
+        shallow = [ms for _, server in buckets[:-1][:2] for ms in server]  # pages 1-5, short of the deepest bucket
+        first, deepest = percentile(sorted(shallow), 50), percentile(sorted(buckets[-1][1]), 50)
+        ratio = deepest / first if first > 0 else 0
+        if ratio > slowdown:
+            print(f"  ⚠️  Deepest pages are x{ratio:.1f} slower server-side than the first ones "
+                  f"({first:.1f} → {deepest:.1f} ms): OFFSET cost grows with depth, consider keyset pagination")
+        else:
+            print(f"  ✅ No depth slowdown: server p50 {first:.1f} → {deepest:.1f} ms (x{ratio:.1f})")
+
+    duplicates = len(ids) - len(set(ids))
+    if duplicates:
+        ok = False
+        print(f"  ❌ {duplicates:,} rows came back twice: rows shifted between pages during the crawl")
+    if total is not None and len(set(ids)) != total:
+        print(f"  ⚠️  pagination.total says {total:,}, the pages held {len(set(ids)):,} distinct rows")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl every page of /orders/ and /wallet/transactions")
+    parser.add_argument("--endpoint", choices=["orders", "transactions", "both"], default="both")
+    parser.add_argument("--limit", type=int, default=100, help="page size (the API caps it at 100)")
+    parser.add_argument("--prefetch", type=int, default=0, help="pages fetched in parallel ahead of the reader")
+    parser.add_argument("--max-pages", type=int, help="stop after this many pages")
+    parser.add_argument("--status", help="only orders with this status (orders endpoint)")
+    parser.add_argument("--slowdown", type=float, default=SLOWDOWN,
+                        help="flag deepest/first page server p50 ratios above this")
+    parser.add_argument("--seed-orders", type=int, default=0, help="create this many unpaid orders first")
+    args = parser.parse_args()
+
+    client = BazaClient(BASE_URL, token=ACCESS_TOKEN or None, pool_maxsize=max(args.prefetch, SEED_WORKERS))
+    if not ACCESS_TOKEN:
+        if not OTP:
+            sys.exit("Set ACCESS_TOKEN, or PHONE and OTP to log in.")
+        client.login(PHONE, OTP)
+
+    names = ["orders", "transactions"] if args.endpoint == "both" else [args.endpoint]
+    print(f"📄 Crawling {', '.join(names)} on {BASE_URL} (limit {args.limit}, prefetch {args.prefetch})")
+    if args.seed_orders:
+        seed_orders(client, args.seed_orders)
+
+    recorder = LatencyRecorder()
+    start = time.perf_counter()
+    results = []
+    try:
+        for name in names:
+            params = {"status": args.status} if name == "orders" and args.status else {}
+            results.append((name, *crawl_endpoint(client, name, args.limit, args.prefetch, args.max_pages,
+                                                  recorder, params)))
+    except RuntimeError as e:
+        print(f"\n❌ FAILED: {e}")
+        sys.exit(1)
+
+    recorder.print_report(time.perf_counter() - start, title="Page latency by depth")
+    ok = all([report(*result, args.slowdown) for result in results])
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
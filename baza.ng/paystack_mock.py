@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""
+paystack_mock.py — Local stand-in for the Paystack API
+======================================================
+
+Serves the Paystack endpoints the backend uses, so top-up, order-payment and
+DVA flows can be exercised and benchmarked without touching live Paystack:
+
+    POST /transaction/initialize         -> authorization_url, access_code, reference
+    GET  /transaction/verify/<reference>  -> status ongoing / success / failed / abandoned
+    POST /customer                        -> customer_code
+    POST /dedicated_account               -> account number for a customer
+    POST /dedicated_account/assign        -> async; fires dedicatedaccount.assign.success
+    GET  /dedicated_account?customer=     -> list a customer's accounts
+
+Every initialised transaction is "paid" by a simulated customer after
+--pay-delay seconds (log-normal), unless it is drawn as abandoned (never paid)
+or declined (failed). A successful payment fires a signed charge.success
+webhook to --webhook-url, retried like Paystack does on non-2xx. Requests
+must carry ``Authorization: Bearer <secret key>``.
+
+Profiles set latency and failure rates in one go (individual flags override):
+
+    fast       30 ms, no failures, nobody abandons
+    normal     350 ms, 0.5% 5xx, 10% abandoned, 3% declined
+    slow       1.2 s, 1% 5xx, 15% abandoned, 5% declined
+    degraded   2.5 s, 10% 5xx, 20% abandoned, 10% declined
+
+--rate-limit N answers anything above N API requests per second with
+429 and a Retry-After header, the way Paystack throttles integrations.
+
+Test hooks (not part of Paystack):
+
+    POST /_sim/pay/<reference>   {"outcome": "success" | "failed"}   settle a transaction now
+    POST /_sim/transfer          {"customer_code" | "account_number", "amount"}   DVA bank transfer
+    GET  /_sim/stats             request, failure and webhook counters
+
+Usage:
+    python paystack_mock.py --port 8100 --profile normal \\
+        --webhook-url http://127.0.0.1:8000/v1/webhooks/paystack
+    python mock_api.py --paystack-url http://127.0.0.1:8100
+
+    Point a real backend at it by overriding its Paystack base URL with
+    http://127.0.0.1:8100 and using the same secret key (PAYSTACK_SECRET_KEY).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import secrets
+import time
+from datetime import datetime, timezone
+from urllib.parse import parse_qs
+
+import requests
+
+from paystack_webhooks import PAYSTACK_SECRET_KEY, dva_assigned_event, encode
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+PROFILES = {
+    "fast": {"latency_ms": 30, "failure_rate": 0.0, "abandon_rate": 0.0, "decline_rate": 0.0},
+    "normal": {"latency_ms": 350, "failure_rate": 0.005, "abandon_rate": 0.10, "decline_rate": 0.03},
+    "slow": {"latency_ms": 1200, "failure_rate": 0.01, "abandon_rate": 0.15, "decline_rate": 0.05},
+    "degraded": {"latency_ms": 2500, "failure_rate": 0.10, "abandon_rate": 0.20, "decline_rate": 0.10},
+}
+
+SETTINGS = dict(
+    PROFILES[os.getenv("PAYSTACK_MOCK_PROFILE", "normal")],
+    latency_sigma=0.35,
+    pay_delay=2.0,  # median seconds the simulated customer takes to pay (0 = only via /_sim/pay)
+    webhook_url=os.getenv("PAYSTACK_WEBHOOK_URL", ""),
+    webhook_delay=0.3,
+    secret=PAYSTACK_SECRET_KEY,
+    rate_limit=0,  # API requests per second before 429s (0 = unlimited)
+)
+WEBHOOK_RETRIES = 3
+_background = set()  # keep fire-and-forget tasks referenced until they finish
+
+
+def configure(profile=None, **overrides):
+    if profile:
+        SETTINGS.update(PROFILES[profile])
+    SETTINGS.update({key: value for key, value in overrides.items() if value is not None})
+
+
+def spawn(coro):
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def lognormal(median):
+    return median * math.exp(random.gauss(0, SETTINGS["latency_sigma"]))
+
+
+class RateLimiter:
+    """Token bucket holding one second's worth of requests."""
+
+    def __init__(self):
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+
+    def retry_after(self, rate):
+        """Take a token and return 0, or return the seconds until one is free."""
+        now = time.monotonic()
+        self.tokens = min(rate, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / rate
+
+
+limiter = RateLimiter()
+
+
+# ---------------------------------------------------------------------------
+# In-memory state
+# ---------------------------------------------------------------------------
+class Store:
+    def __init__(self):
+        self.transactions = {}  # reference -> transaction
+        self.customers = {}  # customer_code -> customer
+        self.customers_by_email = {}  # email -> customer_code
+        self.accounts = {}  # account_number -> dedicated account
+        self.accounts_by_customer = {}  # customer_code -> account_number
+        self.stats = {"requests": 0, "failures": 0, "rate_limited": 0, "webhooks_sent": 0,
+                      "webhooks_failed": 0, "paid": 0, "declined": 0, "abandoned": 0}
+
+    def customer(self, email, **fields):
+        code = self.customers_by_email.get(email)
+        if code is None:
+            code = f"CUS_{secrets.token_hex(7)}"
+            self.customers[code] = {"id": random.randint(10**6, 10**7), "customer_code": code, "email": email,
+                                    "createdAt": now_iso(), **fields}
+            self.customers_by_email[email] = code
+        return self.customers[code]
+
+    def dedicated_account(self, customer):
+        number = self.accounts_by_customer.get(customer["customer_code"])
+        if number:
+            return self.accounts[number]
+        number = "".join(random.choice("0123456789") for _ in range(10))
+        name = f"BAZA/{customer.get('first_name') or customer['email']}".upper()
+        account = {
+            "id": len(self.accounts) + 1,
+            "account_number": number,
+            "account_name": name,
+            "bank": {"name": "Test Bank", "slug": "test-bank"},
+            "assigned": True,
+            "active": True,
+            "currency": "NGN",
+            "customer": {"customer_code": customer["customer_code"], "email": customer["email"]},
+        }
+        self.accounts[number] = account
+        self.accounts_by_customer[customer["customer_code"]] = number
+        return account
+
+
+store = Store()
+
+
+# ---------------------------------------------------------------------------
+# Webhooks
+# ---------------------------------------------------------------------------
+async def send_webhook(event):
+    """POST a signed event to the app, retrying non-2xx like Paystack does."""
+    url = SETTINGS["webhook_url"]
+    if not url:
+        return
+    body, headers = encode(event, SETTINGS["secret"])
+    await asyncio.sleep(SETTINGS["webhook_delay"])
+    for attempt in range(WEBHOOK_RETRIES + 1):
+        try:
+            resp = await asyncio.to_thread(requests.post, url, data=body, headers=headers, timeout=30)
+            if resp.status_code < 300:
+                store.stats["webhooks_sent"] += 1
+                return
+        except requests.RequestException:
+            pass
+        await asyncio.sleep(2 ** attempt)
+    store.stats["webhooks_failed"] += 1
+
+
+def charge_event(txn):
+    return {"event": "charge.success", "data": {key: value for key, value in txn.items() if key != "outcome"}}
+
+
+def settle(txn, outcome):
+    if txn["status"] != "ongoing":
+        return
+    if outcome == "success":
+        txn.update(status="success", gateway_response="Approved", paid_at=now_iso())
+        store.stats["paid"] += 1
+        spawn(send_webhook(charge_event(txn)))
+    else:
+        txn.update(status="failed", gateway_response="Declined")
+        store.stats["declined"] += 1
+
+
+async def simulated_customer(txn):
+    await asyncio.sleep(lognormal(SETTINGS["pay_delay"]))
+    settle(txn, txn["outcome"])
+
+
+# ---------------------------------------------------------------------------
+# Request / response plumbing
+# ---------------------------------------------------------------------------
+class PaystackError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class Request:
+    def __init__(self, scope, body):
+        self.method = scope["method"]
+        self.path = scope["path"].rstrip("/") or "/"
+        self.query = {k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+        self.headers = {k.decode().lower(): v.decode() for k, v in scope.get("headers", [])}
+        self.raw_body = body
+        self.params = {}
+
+    def json(self):
+        try:
+            data = json.loads(self.raw_body or b"{}")
+        except ValueError:
+            raise PaystackError(400, "Invalid JSON body")
+        return data if isinstance(data, dict) else {}
+
+
+ROUTES = []
+
+
+def route(method, pattern, simulated=False):
+    """Register a handler; ``simulated`` routes skip auth, latency and failure injection."""
+    regex = re.compile("^" + re.sub(r"<(\w+)>", r"(?P<\1>[^/]+)", pattern) + "$")
+
+    def register(fn):
+        ROUTES.append((method, regex, simulated, fn))
+        return fn
+
+    return register
+
+
+def ok(message, data):
+    return {"status": True, "message": message, "data": data}
+
+
+# ---------------------------------------------------------------------------
+# Transactions
+# ---------------------------------------------------------------------------
+@route("POST", "/transaction/initialize")
+async def transaction_initialize(req):
+    data = req.json()
+    amount = data.get("amount")
+    try:
+        amount = int(amount)
+    except (TypeError, ValueError):
+        raise PaystackError(400, "Invalid Amount Sent")
+    if not data.get("email"):
+        raise PaystackError(400, "Email is required")
+    reference = data.get("reference") or secrets.token_hex(8)
+    if reference in store.transactions:
+        raise PaystackError(400, "Duplicate Transaction Reference")
+
+    metadata = data.get("metadata") or {}
+    if isinstance(metadata, str):
+        try:
+            metadata = json.loads(metadata or "{}")
+        except ValueError:
+            raise PaystackError(400, "Invalid metadata")
+    if not isinstance(metadata, dict):
+        raise PaystackError(400, "Invalid metadata")
+    roll = random.random()
+    outcome = ("abandoned" if roll < SETTINGS["abandon_rate"]
+               else "failed" if roll < SETTINGS["abandon_rate"] + SETTINGS["decline_rate"]
+               else "success")
+    access_code = secrets.token_hex(8)
+    txn = {
+        "id": random.randint(10**9, 10**10),
+        "domain": "test",
+        "status": "ongoing",
+        "reference": reference,
+        "amount": amount,
+        "currency": "NGN",
+        "channel": "card",
+        "gateway_response": None,
+        "paid_at": None,
+        "created_at": now_iso(),
+        "metadata": metadata,
+        "customer": store.customer(data["email"]),
+        "authorization": {"channel": "card", "card_type": "visa", "last4": "4081", "bank": "TEST BANK"},
+        "outcome": outcome,
+    }
+    store.transactions[reference] = txn
+    if outcome == "abandoned":
+        store.stats["abandoned"] += 1
+        txn["status"] = "abandoned"
+    elif SETTINGS["pay_delay"] > 0:
+        spawn(simulated_customer(txn))
+
+    return ok("Authorization URL created", {
+        "authorization_url": f"https://checkout.paystack.com/{access_code}",
+        "access_code": access_code,
+        "reference": reference,
+    })
+
+
+@route("GET", "/transaction/verify/<reference>")
+async def transaction_verify(req):
+    txn = store.transactions.get(req.params["reference"])
+    if txn is None:
+        raise PaystackError(400, "Transaction reference not found")
+    return ok("Verification successful", {key: value for key, value in txn.items() if key != "outcome"})
+
+
+# ---------------------------------------------------------------------------
+# Customers & dedicated accounts
+# ---------------------------------------------------------------------------
+@route("POST", "/customer")
+async def customer_create(req):
+    data = req.json()
+    if not data.get("email"):
+        raise PaystackError(400, "Email is required")
+    fields = {key: data[key] for key in ("first_name", "last_name", "phone") if data.get(key)}
+    return ok("Customer created", store.customer(data["email"], **fields))
+
+
+@route("POST", "/dedicated_account")
+async def dedicated_account_create(req):
+    code = str(req.json().get("customer", ""))
+    customer = store.customers.get(code) or next(
+        (c for c in store.customers.values() if str(c["id"]) == code), None)
+    if customer is None:
+        raise PaystackError(404, "Customer not found")
+    return ok("NUBAN successfully created", store.dedicated_account(customer))
+
+
+@route("POST", "/dedicated_account/assign")
+async def dedicated_account_assign(req):
+    data = req.json()
+    if not data.get("email"):
+        raise PaystackError(400, "Email is required")
+    customer = store.customer(data["email"], **{k: data[k] for k in ("first_name", "last_name", "phone") if data.get(k)})
+    account = store.dedicated_account(customer)
+    spawn(send_webhook(dva_assigned_event(
+        customer["customer_code"], account["account_number"], account["account_name"],
+        account["bank"]["name"], customer["email"],
+    )))
+    return {"status": True, "message": "Assign dedicated account in progress"}
+
+
+@route("GET", "/dedicated_account")
+async def dedicated_account_list(req):
+    code = req.query.get("customer")
+    rows = [a for a in store.accounts.values() if not code or a["customer"]["customer_code"] == code]
+    return ok("Managed accounts successfully retrieved", rows)
+
+
+# ---------------------------------------------------------------------------
+# Simulation hooks
+# ---------------------------------------------------------------------------
+@route("POST", "/_sim/pay/<reference>", simulated=True)
+async def sim_pay(req):
+    txn = store.transactions.get(req.params["reference"])
+    if txn is None:
+        raise PaystackError(404, "Transaction reference not found")
+    settle(txn, req.json().get("outcome", "success"))
+    return ok("Settled", {"reference": txn["reference"], "status": txn["status"]})
+
+
+@route("POST", "/_sim/transfer", simulated=True)
+async def sim_transfer(req):
+    data = req.json()
+    account = store.accounts.get(data.get("account_number"))
+    code = data.get("customer_code") or (account and account["customer"]["customer_code"])
+    customer = store.customers.get(code)
+    if customer is None:
+        raise PaystackError(404, "Customer not found")
+    account = account or store.dedicated_account(customer)
+    reference = data.get("reference") or f"dva_{secrets.token_hex(8)}"
+    txn = {
+        "id": random.randint(10**9, 10**10),
+        "domain": "test",
+        "status": "success",
+        "reference": reference,
+        "amount": int(data.get("amount", 0)),
+        "currency": "NGN",
+        "channel": "dedicated_nuban",
+        "gateway_response": "Approved",
+        "paid_at": now_iso(),
+        "created_at": now_iso(),
+        "metadata": {},
+        "customer": {"customer_code": customer["customer_code"], "email": customer["email"]},
+        "authorization": {"channel": "dedicated_nuban", "receiver_bank_account_number": account["account_number"],
+                          "receiver_bank": account["bank"]["name"], "sender_bank": "Test Bank"},
+    }
+    store.transactions[reference] = txn
+    store.stats["paid"] += 1
+    spawn(send_webhook(charge_event(txn)))
+    return ok("Transfer queued", {"reference": reference})
+
+
+@route("GET", "/_sim/stats", simulated=True)
+async def sim_stats(req):
+    return ok("Stats", dict(store.stats, transactions=len(store.transactions), customers=len(store.customers)))
+
+
+# ---------------------------------------------------------------------------
+# ASGI app
+# ---------------------------------------------------------------------------
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def send_json(send, status, payload, extra_headers=None):
+    body = json.dumps(payload, default=str).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    headers += [(key.encode(), str(value).encode()) for key, value in (extra_headers or {}).items()]
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def handle_http(scope, receive, send):
+    req = Request(scope, await read_body(receive))
+    for method, regex, simulated, fn in ROUTES:
+        match = regex.match(req.path)
+        if not match or method != req.method:
+            continue
+        req.params = match.groupdict()
+        try:
+            if not simulated:
+                store.stats["requests"] += 1
+                if req.headers.get("authorization") != f"Bearer {SETTINGS['secret']}":
+                    raise PaystackError(401, "Invalid key")
+                wait = SETTINGS["rate_limit"] and limiter.retry_after(SETTINGS["rate_limit"])
+                if wait:
+                    store.stats["rate_limited"] += 1
+                    raise PaystackError(429, "Rate limit exceeded", {"retry-after": math.ceil(wait)})
+                await asyncio.sleep(lognormal(SETTINGS["latency_ms"]) / 1000)
+                if random.random() < SETTINGS["failure_rate"]:
+                    store.stats["failures"] += 1
+                    raise PaystackError(random.choice([500, 502, 503]), "An error occurred")
+            payload = await fn(req)
+        except PaystackError as e:
+            await send_json(send, e.status, {"status": False, "message": e.message}, e.headers)
+            return
+        await send_json(send, 200, payload)
+        return
+    await send_json(send, 404, {"status": False, "message": "Not found"})
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] == "http":
+        await handle_http(scope, receive, send)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Paystack API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--profile", choices=sorted(PROFILES), help="latency / failure preset (default normal)")
+    parser.add_argument("--latency-ms", type=float, help="median API latency")
+    parser.add_argument("--latency-sigma", type=float, help="log-normal sigma of API latency and pay delay")
+    parser.add_argument("--failure-rate", type=float, help="fraction of API calls answered with a 5xx")
+    parser.add_argument("--abandon-rate", type=float, help="fraction of transactions never paid")
+    parser.add_argument("--decline-rate", type=float, help="fraction of transactions declined")
+    parser.add_argument("--pay-delay", type=float, help="median seconds until the customer pays (0 = /_sim/pay only)")
+    parser.add_argument("--webhook-url", help="where to POST signed webhooks (the app's /v1/webhooks/paystack)")
+    parser.add_argument("--webhook-delay", type=float, help="seconds between a payment and its webhook")
+    parser.add_argument("--secret", help="secret key expected in Authorization and used to sign webhooks")
+    parser.add_argument("--rate-limit", type=float, help="API requests per second before answering 429")
+    args = parser.parse_args()
+
+    configure(
+        profile=args.profile,
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        failure_rate=args.failure_rate,
+        abandon_rate=args.abandon_rate,
+        decline_rate=args.decline_rate,
+        pay_delay=args.pay_delay,
+        webhook_url=args.webhook_url,
+        webhook_delay=args.webhook_delay,
+        secret=args.secret,
+        rate_limit=args.rate_limit,
+    )
+
+    from daphne.endpoints import build_endpoint_description_strings
+    from daphne.server import Server
+
+    print(f"Paystack stand-in on http://{args.host}:{args.port} "
+          f"({SETTINGS['latency_ms']:.0f} ms, {SETTINGS['failure_rate']:.1%} 5xx, "
+          f"{SETTINGS['abandon_rate']:.0%} abandoned; webhooks → {SETTINGS['webhook_url'] or 'off'})")
+    Server(application=app, endpoints=build_endpoint_description_strings(host=args.host, port=args.port)).run()
+
+
+if __name__ == "__main__":
+    main()
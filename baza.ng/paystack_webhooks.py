@@ -0,0 +1,111 @@
+"""
+paystack_webhooks.py — Signed Paystack webhook payloads
+=======================================================
+
+Builds the charge.success events Paystack sends to /v1/webhooks/paystack and
+signs them the way Paystack does: HMAC-SHA512 of the raw request body with
+the secret key, hex-encoded in the ``x-paystack-signature`` header.
+
+Usage:
+    from paystack_webhooks import card_topup_event, post_event
+
+    event = card_topup_event("topup_abc", 500000, user_id, email)
+    resp = post_event(session, "http://localhost:8000/v1/webhooks/paystack", event, secret)
+
+The payloads carry the fields the backend reads: reference, amount (kobo),
+channel, customer.customer_code / email and metadata.user_id / purpose.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import secrets
+from datetime import datetime, timezone
+
+PAYSTACK_SECRET_KEY = os.getenv("PAYSTACK_SECRET_KEY", "sk_test_mockbaza000000000000000000000000")
+SIGNATURE_HEADER = "x-paystack-signature"
+
+
+def sign(body, secret=PAYSTACK_SECRET_KEY):
+    return hmac.new(secret.encode(), body, hashlib.sha512).hexdigest()
+
+
+def verify(body, signature, secret=PAYSTACK_SECRET_KEY):
+    return hmac.compare_digest(sign(body, secret), signature or "")
+
+
+def _paid_at():
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _charge(reference, amount, channel, customer, metadata=None, authorization=None):
+    return {
+        "event": "charge.success",
+        "data": {
+            "id": secrets.randbelow(10**10),
+            "domain": "test",
+            "status": "success",
+            "reference": reference,
+            "amount": amount,
+            "currency": "NGN",
+            "channel": channel,
+            "gateway_response": "Approved",
+            "paid_at": _paid_at(),
+            "metadata": metadata or {},
+            "customer": customer,
+            "authorization": authorization or {"channel": channel},
+        },
+    }
+
+
+def card_topup_event(reference, amount, user_id, email, purpose="wallet_topup", **metadata):
+    """Card/inline payment; the backend finds the user from metadata.user_id."""
+    return _charge(
+        reference, amount, "card",
+        customer={"email": email, "customer_code": None},
+        metadata={"user_id": user_id, "purpose": purpose, **metadata},
+        authorization={"channel": "card", "card_type": "visa", "last4": "4081", "bank": "TEST BANK"},
+    )
+
+
+def dva_credit_event(reference, amount, customer_code, account_number=None, email=None):
+    """Bank transfer into a dedicated virtual account; the backend matches customer_code."""
+    return _charge(
+        reference, amount, "dedicated_nuban",
+        customer={"email": email, "customer_code": customer_code},
+        authorization={
+            "channel": "dedicated_nuban",
+            "sender_bank": "Test Bank",
+            "sender_name": "LOAD TEST",
+            "receiver_bank_account_number": account_number,
+            "receiver_bank": "Test Bank",
+        },
+    )
+
+
+def dva_assigned_event(customer_code, account_number, account_name, bank_name="Test Bank", email=None):
+    return {
+        "event": "dedicatedaccount.assign.success",
+        "data": {
+            "customer": {"email": email, "customer_code": customer_code},
+            "dedicated_account": {
+                "account_number": account_number,
+                "account_name": account_name,
+                "bank": {"name": bank_name},
+                "assigned": True,
+                "active": True,
+            },
+        },
+    }
+
+
+def encode(event, secret=PAYSTACK_SECRET_KEY):
+    """Serialise ``event`` once and return (body, headers) so the signature matches the bytes sent."""
+    body = json.dumps(event, separators=(",", ":")).encode()
+    return body, {"Content-Type": "application/json", SIGNATURE_HEADER: sign(body, secret)}
+
+
+def post_event(session, url, event, secret=PAYSTACK_SECRET_KEY, **kwargs):
+    body, headers = encode(event, secret)
+    return session.post(url, data=body, headers=headers, **kwargs)
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+reconcile_payments.py — Verify pending Paystack references in bulk
+==================================================================
+
+After a Paystack outage, top-ups and paystack/paystack_inline orders are left
+PENDING until someone calls verify on them. This script streams the pending
+references and verifies them concurrently: top-ups through
+/wallet/verify-topup, orders through /orders/verify-payment. Each reference
+ends up in one of three buckets:
+
+    credited   verify succeeded (wallet credited / order confirmed)
+    failed     Paystack says failed or abandoned, or the reference is unknown
+    pending    still ongoing, or the server kept erroring after every retry
+
+Usage:
+    ACCESS_TOKEN="<token>" python reconcile_payments.py --input pending.jsonl
+    ACCESS_TOKEN="<token>" python reconcile_payments.py --pending-orders
+    ACCESS_TOKEN="<token>" python reconcile_payments.py --input refs.txt --kind topup \\
+        --concurrency 16 --rate 50 --pending-out still-pending.jsonl
+
+Input (--input, '-' for stdin) is read one line at a time:
+    JSONL   {"reference": "topup_ab12", "kind": "topup"}
+            {"reference": "order_cd34", "kind": "order", "orderId": "...", "token": "..."}
+    CSV     header row with reference[,kind,orderId,token]
+    text    one reference per line (kind from --kind)
+
+"kind" defaults to "order" for references starting with order_ and
+"topup" otherwise. A per-row "token" verifies the reference as that user;
+rows without one use ACCESS_TOKEN. --pending-orders also walks the
+ACCESS_TOKEN user's PENDING orders. --pending-out writes the still-pending
+rows back in the input format, ready for the next pass.
+
+Rate limits:
+    --rate caps requests per second across all workers. A 429 pauses every
+    worker for Retry-After (or an exponential backoff with jitter) and
+    halves the rate; it climbs back 10% after every 50 clean responses.
+    5xx and connection errors are retried with the same backoff.
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from baza_client import BazaClient
+from loadstats import LatencyRecorder
+
+
+API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000/v1")
+ACCESS_TOKEN = os.getenv("ACCESS_TOKEN", "")
+
+CONCURRENCY = int(os.getenv("RECONCILE_CONCURRENCY", "8"))
+RATE = float(os.getenv("RECONCILE_RATE", "20"))  # requests/s; Paystack verify is the bottleneck
+RETRIES = 5
+MAX_BACKOFF = 30
+RECOVER_AFTER = 50
+ROW_FIELDS = ["reference", "kind", "orderId", "token"]
+FAILED_STATUSES = ("failed", "abandoned", "reversed")
+
+
+# ---------------------------------------------------------------------------
+# Input
+# ---------------------------------------------------------------------------
+def iter_references(path, default_kind=None):
+    """Yield {"reference", "kind", "orderId"?, "token"?} rows without loading the file."""
+    fh = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        first = fh.readline()
+        if not first:
+            return
+        if first.lstrip().startswith("{"):
+            lines = (json.loads(line) for line in _chain(first, fh) if line.strip())
+        elif "reference" in first.split(","):
+            lines = csv.DictReader(_chain(first, fh))
+        else:
+            lines = ({"reference": line.strip()} for line in _chain(first, fh) if line.strip())
+        for row in lines:
+            row = {key: value for key, value in row.items() if value}
+            row["kind"] = row.get("kind") or default_kind or (
+                "order" if row["reference"].startswith("order_") else "topup")
+            yield row
+    finally:
+        if fh is not sys.stdin:
+            fh.close()
+
+
+def _chain(first, fh):
+    yield first
+    yield from fh
+
+
+def iter_pending_orders(client):
+    page = 1
+    while True:
+        resp = client.orders(page=page, limit=100, status="PENDING")
+        resp.raise_for_status()
+        body = resp.json()
+        for order in body.get("orders", []):
+            if order.get("paymentReference"):
+                yield {"reference": order["paymentReference"], "kind": "order", "orderId": order["id"]}
+        if not body.get("pagination", {}).get("hasNext"):
+            return
+        page += 1
+
+
+# ---------------------------------------------------------------------------
+# Rate limiting
+# ---------------------------------------------------------------------------
+class Throttle:
+    """Shared request pacing: a fixed rate that halves on 429 and recovers slowly."""
+
+    def __init__(self, rate):
+        self.ceiling = rate
+        self.rate = rate
+        self.next_slot = time.monotonic()
+        self.clean = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + 1 / self.rate
+        time.sleep(max(0.0, slot - now))
+
+    def ok(self):
+        with self.lock:
+            self.clean += 1
+            if self.clean >= RECOVER_AFTER and self.rate < self.ceiling:
+                self.rate = min(self.ceiling, self.rate * 1.1)
+                self.clean = 0
+
+    def limited(self, seconds):
+        """Every worker holds off for ``seconds``; the pace afterwards is halved."""
+        with self.lock:
+            self.rate = max(self.ceiling / 64, self.rate / 2)
+            self.clean = 0
+            self.next_slot = max(self.next_slot, time.monotonic() + seconds)
+
+
+def backoff(attempt):
+    return min(MAX_BACKOFF, 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def retry_after(resp, attempt):
+    try:
+        return float(resp.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return backoff(attempt)
+
+
+# ---------------------------------------------------------------------------
+# Verification
+# ---------------------------------------------------------------------------
+def classify(resp):
+    """Map a verify response to (outcome, detail); outcome None means retry."""
+    if resp.status_code == 200:
+        return "credited", ""
+    try:
+        body = resp.json()
+    except ValueError:
+        body = {}
+    code, message = body.get("code", ""), body.get("error") or body.get("message") or resp.text[:120]
+    if resp.status_code == 429 or resp.status_code >= 500 and code != "PAYSTACK_ERROR":
+        return None, f"{resp.status_code} {code}".strip()
+    if code == "PAYMENT_NOT_SUCCESSFUL":
+        failed = any(status in message.lower() for status in FAILED_STATUSES)
+        return ("failed" if failed else "pending"), message
+    if resp.status_code == 502 and "not found" not in message.lower():
+        return None, f"502 {code}: {message}"  # Paystack itself is struggling
+    return "failed", f"{resp.status_code} {code}: {message}"
+
+
+def verify(client, throttle, row, timeout):
+    """Verify one reference, retrying 429/5xx; returns (outcome, detail, attempts)."""
+    detail = ""
+    for attempt in range(RETRIES + 1):
+        throttle.wait()
+        try:
+            if row["kind"] == "order":
+                params = {"reference": row["reference"]}
+                if row.get("orderId"):
+                    params["orderId"] = row["orderId"]
+                resp = client.get("/orders/verify-payment", params=params, token=row.get("token"),
+                                  timeout=timeout)
+            else:
+                resp = client.get("/wallet/verify-topup", params={"reference": row["reference"]},
+                                  token=row.get("token"), timeout=timeout)
+        except requests.RequestException as e:
+            detail = f"{type(e).__name__}: {e}"
+            time.sleep(backoff(attempt))
+            continue
+        outcome, detail = classify(resp)
+        if outcome:
+            throttle.ok()
+            return outcome, detail, attempt + 1
+        if resp.status_code == 429:
+            throttle.limited(retry_after(resp, attempt))
+        else:
+            time.sleep(backoff(attempt))
+    return "pending", f"gave up: {detail}", RETRIES + 1
+
+
+def reconcile(client, rows, concurrency, rate, timeout, pending_out=None):
+    stats = {"credited": 0, "failed": 0, "pending": 0, "retries": 0}
+    failures = []
+    recorder = LatencyRecorder()
+    throttle = Throttle(rate)
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(concurrency * 2)  # the input stays a stream
+    start = time.perf_counter()
+
+    def work(row):
+        try:
+            began = time.perf_counter()
+            outcome, detail, attempts = verify(client, throttle, row, timeout)
+            recorder.record(f"{row['kind']}: {outcome}", time.perf_counter() - began)
+            with lock:
+                stats[outcome] += 1
+                stats["retries"] += attempts - 1
+                if outcome == "failed":
+                    failures.append((row["reference"], detail))
+                elif outcome == "pending" and pending_out:
+                    pending_out.write(json.dumps(row) + "\n")
+                done = stats["credited"] + stats["failed"] + stats["pending"]
+                if done % 100 == 0:
+                    print(f"  … {done:,} verified ({done / (time.perf_counter() - start):.1f}/s, "
+                          f"pace {throttle.rate:.1f}/s)")
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for row in rows:
+            slots.acquire()
+            pool.submit(work, row)
+
+    wall = time.perf_counter() - start
+    recorder.print_report(wall, title="Verify latency (including retries and waits)")
+    return stats, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify pending Paystack top-up and order references")
+    parser.add_argument("--input", help="JSONL, CSV or text file of references ('-' for stdin)")
+    parser.add_argument("--kind", choices=["topup", "order"], help="kind for rows that do not say")
+    parser.add_argument("--pending-orders", action="store_true",
+                        help="also verify every PENDING order of the ACCESS_TOKEN user")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="parallel verify requests")
+    parser.add_argument("--rate", type=float, default=RATE, help="max verify requests per second")
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    parser.add_argument("--pending-out", help="write still-pending rows here (JSONL) for the next pass")
+    args = parser.parse_args()
+
+    if not args.input and not args.pending_orders:
+        parser.error("give --input and/or --pending-orders")
+    if not ACCESS_TOKEN and args.pending_orders:
+        sys.exit("Set ACCESS_TOKEN to walk the user's pending orders.")
+
+    client = BazaClient(API_BASE_URL, token=ACCESS_TOKEN or None, pool_maxsize=args.concurrency,
+                        auto_refresh=False)
+    sources = []
+    if args.input:
+        sources.append(iter_references(args.input, args.kind))
+    if args.pending_orders:
+        sources.append(iter_pending_orders(client))
+    rows = (row for source in sources for row in source)
+
+    print(f"🔎 Reconciling against {API_BASE_URL} — {args.concurrency} workers, ≤{args.rate:g} req/s")
+    pending_out = open(args.pending_out, "w") if args.pending_out else None
+    try:
+        stats, failures = reconcile(client, rows, args.concurrency, args.rate, args.timeout, pending_out)
+    finally:
+        if pending_out:
+            pending_out.close()
+
+    total = stats["credited"] + stats["failed"] + stats["pending"]
+    print(f"\n{'═' * 50}")
+    print(f"  {total:,} references: ✅ {stats['credited']:,} credited  ❌ {stats['failed']:,} failed  "
+          f"⏳ {stats['pending']:,} still pending  ({stats['retries']:,} retries)")
+    print(f"{'═' * 50}")
+    for reference, detail in failures[:20]:
+        print(f"  ✗ {reference}: {detail}")
+    if len(failures) > 20:
+        print(f"  … and {len(failures) - 20:,} more failed")
+    if args.pending_out and stats["pending"]:
+        print(f"\n📝 {stats['pending']:,} still-pending rows → {args.pending_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+response_cache_bench.py — Does ResponseCacheMiddleware pay off?
+===============================================================
+
+ResponseCacheMiddleware keeps every GET /v1/ response per user for a short
+window (5s in production). This benchmark measures what that buys and what
+it costs, as one user:
+
+    replay      the GET bursts UserFlow.py and the app produce (/user/me,
+                /wallet/balance, /orders/ … repeated within seconds), with
+                idle gaps between screens; hit ratio and latency per endpoint
+    cold/warm   the same endpoint with a fresh query string (always a miss)
+                against an immediate repeat (a hit inside the window)
+    coalescing  --burst identical requests fired at once on a cold key: one
+                miss means concurrent misses are coalesced, N misses means
+                every request went to the database
+    staleness   PUT /user/profile, then GET /user/me until the new name shows;
+                how long and how many reads served the old profile
+
+A response is a hit when it says X-Cache: HIT, or, without that header,
+when its Server-Timing handler time is under --hit-ms. The middleware is
+assumed to key on the full path, so a throwaway query parameter gives a
+cold read; the cold/warm section shows whether that holds.
+
+Usage:
+    OTP=1111 PHONE=+2348012345678 python response_cache_bench.py
+    ACCESS_TOKEN="<token>" python response_cache_bench.py --rounds 30 --idle 6 --burst 50
+    ACCESS_TOKEN="<token>" python response_cache_bench.py --window 10   # idle gaps sized for a 10s window
+
+The profile name is restored at the end.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from baza_client import BASE_URL, BazaClient
+from http_timing import cache_hit
+from loadstats import LatencyRecorder, percentile
+
+ACCESS_TOKEN = os.getenv("ACCESS_TOKEN", "")
+PHONE = os.getenv("PHONE", "+917204218098")
+OTP = os.getenv("OTP", "")
+
+WINDOW = 5.0  # ResponseCacheMiddleware TTL in production
+HIT_MS = 20.0
+
+# One "screen": the GETs the app and UserFlow.py fire within a second or two.
+SCREEN = [
+    ("/user/me", {}),
+    ("/wallet/balance", {}),
+    ("/orders/", {"page": 1, "limit": 20}),
+    ("/user/me", {}),
+    ("/wallet/transactions", {"page": 1, "limit": 20}),
+    ("/wallet/balance", {}),
+    ("/orders/", {"page": 1, "limit": 20}),
+    ("/user/me", {}),
+]
+ENDPOINTS = list(dict.fromkeys(path for path, _ in SCREEN))
+
+
+def bust(params):
+    return dict(params, _=time.time_ns())
+
+
+def timed_get(client, path, params, hit_ms):
+    """GET ``path``; returns (seconds, hit, response)."""
+    resp = client.get(path, params=params)
+    if resp.status_code != 200:
+        raise RuntimeError(f"GET {path} → {resp.status_code} {resp.text[:200]}")
+    return resp.timing.total_ms / 1000, cache_hit(resp, hit_ms), resp
+
+
+# ---------------------------------------------------------------------------
+# Sections
+# ---------------------------------------------------------------------------
+def replay(client, rounds, gap, idle, hit_ms):
+    recorder = LatencyRecorder()
+    hits = {path: [0, 0] for path in ENDPOINTS}
+    start = time.perf_counter()
+    for n in range(rounds):
+        for path, params in SCREEN:
+            seconds, hit, _ = timed_get(client, path, params, hit_ms)
+            recorder.record(f"{path} ({'hit' if hit else 'miss'})", seconds)
+            hits[path][0] += hit
+            hits[path][1] += 1
+            time.sleep(gap)
+        if n < rounds - 1:
+            time.sleep(idle)
+    recorder.print_report(time.perf_counter() - start, title=f"Replayed screens ({rounds} x {len(SCREEN)} GETs)")
+    print()
+    for path, (hit, total) in hits.items():
+        print(f"  {path:<22} hit ratio {hit / total * 100:5.1f}%  ({hit}/{total})")
+    total_hits = sum(h for h, _ in hits.values())
+    total = sum(t for _, t in hits.values())
+    print(f"  {'all':<22} hit ratio {total_hits / total * 100:5.1f}%")
+    return hits
+
+
+def cold_warm(client, samples, hit_ms):
+    print(f"\n  {'endpoint':<22} {'cold p50':>9} {'cold p95':>9} {'warm p50':>9} {'warm p95':>9} "
+          f"{'speedup':>8}  {'cold hits':>9} {'warm hits':>9}")
+    for path in ENDPOINTS:
+        params = dict(SCREEN)[path]
+        cold, warm = [], []
+        cold_hits = warm_hits = 0
+        for _ in range(samples):
+            key = bust(params)
+            seconds, hit, _ = timed_get(client, path, key, hit_ms)
+            cold.append(seconds)
+            cold_hits += hit
+            seconds, hit, _ = timed_get(client, path, key, hit_ms)
+            warm.append(seconds)
+            warm_hits += hit
+        cold.sort()
+        warm.sort()
+        speedup = percentile(cold, 50) / percentile(warm, 50) if percentile(warm, 50) else 0
+        print(f"  {path:<22} {percentile(cold, 50) * 1000:>9.1f} {percentile(cold, 95) * 1000:>9.1f} "
+              f"{percentile(warm, 50) * 1000:>9.1f} {percentile(warm, 95) * 1000:>9.1f} {speedup:>7.1f}x  "
+              f"{cold_hits:>5}/{samples:<3} {warm_hits:>5}/{samples:<3}")
+        if cold_hits:
+            print(f"    ⚠️  {cold_hits} cold reads were hits: the cache key ignores the query string")
+
+
+def coalescing(client, burst, hit_ms):
+    print(f"\n  {'endpoint':<22} {'burst':>6} {'misses':>7} {'p50 ms':>8} {'max ms':>8}")
+    for path in ENDPOINTS:
+        params = bust(dict(SCREEN)[path])
+        gate = threading.Barrier(burst)
+
+        def fire(_):
+            gate.wait()
+            return timed_get(client, path, params, hit_ms)
+
+        with ThreadPoolExecutor(max_workers=burst) as pool:
+            results = list(pool.map(fire, range(burst)))
+        latencies = sorted(seconds for seconds, _, _ in results)
+        misses = sum(1 for _, hit, _ in results if not hit)
+        verdict = "coalesced" if misses <= 1 else "not coalesced"
+        print(f"  {path:<22} {burst:>6} {misses:>7} {percentile(latencies, 50) * 1000:>8.1f} "
+              f"{latencies[-1] * 1000:>8.1f}  {verdict}")
+
+
+def staleness(client, writes, window, hit_ms):
+    original = client.get("/user/me").json().get("name") or "Baza User"
+    recorder = LatencyRecorder()
+    stale_reads = 0
+    worst = 0.0
+    start = time.perf_counter()
+    try:
+        for n in range(writes):
+            timed_get(client, "/user/me", {}, hit_ms)  # the app has just shown the profile
+            name = f"Cache probe {n} {time.time_ns() % 100000}"
+            resp = client.put("/user/profile", json={"name": name})
+            if resp.status_code != 200:
+                raise RuntimeError(f"PUT /user/profile → {resp.status_code} {resp.text[:200]}")
+            written = time.perf_counter()
+            while True:
+                _, _, resp = timed_get(client, "/user/me", {}, hit_ms)
+                if resp.json().get("name") == name:
+                    break
+                stale_reads += 1
+                if time.perf_counter() - written > window * 3:
+                    print(f"  ❌ /user/me still stale {window * 3:g}s after the write")
+                    break
+                time.sleep(0.1)
+            fresh_after = time.perf_counter() - written
+            worst = max(worst, fresh_after)
+            recorder.record("PUT /user/profile → fresh GET /user/me", fresh_after)
+    finally:
+        client.put("/user/profile", json={"name": original})
+
+    recorder.print_report(time.perf_counter() - start, title="Read-your-writes")
+    if stale_reads:
+        print(f"  ⚠️  {stale_reads} stale reads of /user/me after {writes} profile writes; "
+              f"worst {worst:.2f}s until the new name showed")
+    else:
+        print(f"  ✅ Every read after PUT /user/profile showed the new name ({writes} writes)")
+    return stale_reads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ResponseCacheMiddleware hit ratio, coalescing and staleness")
+    parser.add_argument("--rounds", type=int, default=10, help="screens to replay")
+    parser.add_argument("--gap", type=float, default=0.15, help="seconds between GETs within a screen")
+    parser.add_argument("--window", type=float, default=WINDOW, help="cache window being tested, in seconds")
+    parser.add_argument("--idle", type=float, help="seconds between screens (default: window + 1)")
+    parser.add_argument("--samples", type=int, default=10, help="cold/warm pairs per endpoint")
+    parser.add_argument("--burst", type=int, default=20, help="identical concurrent GETs per endpoint")
+    parser.add_argument("--writes", type=int, default=5, help="profile writes for the staleness check")
+    parser.add_argument("--hit-ms", type=float, default=HIT_MS,
+                        help="handler time under which a response counts as a hit when there is no X-Cache header")
+    args = parser.parse_args()
+    idle = args.window + 1 if args.idle is None else args.idle
+
+    client = BazaClient(BASE_URL, token=ACCESS_TOKEN or None, pool_maxsize=args.burst)
+    if not ACCESS_TOKEN:
+        if not OTP:
+            sys.exit("Set ACCESS_TOKEN, or PHONE and OTP to log in.")
+        client.login(PHONE, OTP)
+
+    print("=" * 60)
+    print("  RESPONSE CACHE BENCHMARK")
+    print(f"  Base URL: {BASE_URL}")
+    print(f"  Window: {args.window:g}s  Screens: {args.rounds} (idle {idle:g}s)  Burst: {args.burst}")
+    print("=" * 60)
+    try:
+        replay(client, args.rounds, args.gap, idle, args.hit_ms)
+        print("\n  Cold (fresh key) vs warm (repeat inside the window), ms:")
+        cold_warm(client, args.samples, args.hit_ms)
+        print("\n  Concurrent identical GETs on a cold key:")
+        coalescing(client, args.burst, args.hit_ms)
+        staleness(client, args.writes, args.window, args.hit_ms)
+    except RuntimeError as e:
+        print(f"\n❌ FAILED: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
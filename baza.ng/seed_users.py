@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+seed_users.py — Production-sized user, wallet and order data
+============================================================
+
+Boots Django the same way test_wallet_creation.py does and fills the
+database with N users, each with a wallet history, delivery addresses and
+past orders (with items and the DEBIT_ORDER that paid for them). Everything
+goes in with bulk_create, one transaction per batch of users, while the
+product/order signals are switched off the way seed_catalog does
+(SIGNALS_DISABLED), so no WebSocket broadcasts or cache invalidations fire.
+Wallet balances always equal credits minus debits.
+
+Usage (from the backend directory, next to manage.py):
+    python seed_users.py --users 10000
+    python seed_users.py --users 100000 --orders 12 --batch-size 1000 --seed 7
+    python seed_users.py --clear          # delete every seeded user and their rows
+
+Seeded users get phones from --phone-base upwards (default +2347000000000)
+and names ending in "(seed)", so --clear only ever touches seeded data.
+Their passwords are unusable; log in with OTP as usual.
+"""
+
+import argparse
+import importlib
+import importlib.util
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+PHONE_BASE = os.getenv("SEED_PHONE_BASE", "+2347000000000")
+SIGNAL_MODULES = ("products.signals", "orders.signals")
+
+FIRST_NAMES = ["Ada", "Chidi", "Ngozi", "Tunde", "Bola", "Emeka", "Funmi", "Ifeoma", "Kemi", "Musa",
+               "Nneka", "Segun", "Tolu", "Uche", "Yemi", "Zainab", "Aisha", "Dayo", "Obi", "Sade"]
+LAST_NAMES = ["Okafor", "Adeyemi", "Balogun", "Eze", "Ibrahim", "Nwosu", "Ogunleye", "Okonkwo",
+              "Bello", "Adebayo", "Chukwu", "Danjuma", "Lawal", "Oyelaran", "Uzor"]
+STREETS = ["Akin Adesola Street, Victoria Island", "Admiralty Way, Lekki Phase 1", "Allen Avenue, Ikeja",
+           "Adeola Odeku Street, Victoria Island", "Awolowo Road, Ikoyi", "Herbert Macaulay Way, Yaba",
+           "Bode Thomas Street, Surulere", "Opebi Road, Ikeja", "Chevron Drive, Lekki", "Ozumba Mbadiwe Avenue, VI"]
+LANDMARKS = ["Near Access Bank", "Opposite Shoprite", "Beside the filling station", "Next to the church", ""]
+LABELS = ["Home", "Office", "Mum's place", "Gym"]
+# Share of orders by final status; wallet-paid orders carry a DEBIT_ORDER.
+ORDER_STATUSES = [("DELIVERED", 0.70), ("CONFIRMED", 0.10), ("DISPATCHED", 0.05),
+                  ("CANCELLED", 0.05), ("PENDING", 0.10)]
+
+
+def setup_django():
+    django.setup()
+    global User, Address, Order, OrderItem, WalletTransaction, transaction, make_password
+    from django.contrib.auth.hashers import make_password
+    from django.db import transaction
+    from users.models import User
+    from addresses.models import Address
+    from orders.models import Order, OrderItem
+    from wallet.models import WalletTransaction
+
+
+@contextmanager
+def signals_disabled():
+    """Flip SIGNALS_DISABLED on every signals module that has one, like seed_catalog."""
+    flipped = []
+    for name in SIGNAL_MODULES:
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            continue
+        if hasattr(module, "SIGNALS_DISABLED"):
+            flipped.append((module, module.SIGNALS_DISABLED))
+            module.SIGNALS_DISABLED = True
+    try:
+        yield [module.__name__ for module, _ in flipped]
+    finally:
+        for module, previous in flipped:
+            module.SIGNALS_DISABLED = previous
+
+
+_fields = {}
+
+
+def build(model, **values):
+    """Instantiate ``model`` with only the fields it defines, so schema drift does not break seeding."""
+    if model not in _fields:
+        _fields[model] = {name for field in model._meta.concrete_fields for name in (field.name, field.attname)}
+    if values.get("id") is None:
+        values.pop("id", None)  # let the model's own default (cuid, auto id) apply
+    return model(**{key: value for key, value in values.items() if key in _fields[model]})
+
+
+def new_pk(model, rng):
+    """UUID primary keys are set up front so children can point at them before the insert."""
+    if model._meta.pk.get_internal_type() == "UUIDField":
+        return uuid.UUID(int=rng.getrandbits(128), version=4)
+    return None  # AutoField: bulk_create fills it in (PostgreSQL returns the ids)
+
+
+def load_products():
+    """Item snapshots come from the restock list in add-smallducuts.py."""
+    path = Path(__file__).with_name("add-smallducuts.py")
+    spec = importlib.util.spec_from_file_location("add_smallducuts", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.PRODUCTS
+
+
+# ---------------------------------------------------------------------------
+# Generator
+# ---------------------------------------------------------------------------
+def user_rows(rng, number, phone_base, orders_per_user, products, unusable_password):
+    """One user and everything hanging off them; returns (user, addresses, orders, items, txns)."""
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    phone = f"+{int(phone_base.lstrip('+')) + number}"
+    user = build(
+        User, id=new_pk(User, rng), phone=phone,
+        name=f"{first} {last} (seed)", email=f"{first}.{last}.{number}@seed.baza.ng".lower(),
+        password=unusable_password, referral_code=f"SD{number:08X}", is_active=True,
+    )
+
+    addresses = [
+        build(Address, id=new_pk(Address, rng), user=user, label=label,
+              address=f"{rng.randint(1, 250)} {rng.choice(STREETS)}",
+              landmark=rng.choice(LANDMARKS), is_default=index == 0)
+        for index, label in enumerate(rng.sample(LABELS, rng.randint(1, 3)))
+    ]
+
+    txns, orders, items = [], [], []
+    balance = 0
+    for _ in range(rng.randint(1, 4)):
+        amount = rng.choice([500000, 1000000, 2000000, 5000000])
+        kind = rng.choice(["CREDIT_CARD", "CREDIT_TRANSFER"])
+        txns.append(build(WalletTransaction, user=user, amount=amount, type=kind, status="SUCCESS",
+                          description="Card top-up" if kind == "CREDIT_CARD" else "Bank transfer",
+                          reference=f"seed_{rng.getrandbits(64):016x}"))
+        balance += amount
+
+    statuses, weights = zip(*ORDER_STATUSES)
+    for _ in range(rng.randint(0, orders_per_user * 2)):
+        lines = []
+        for product in rng.sample(products, rng.randint(1, 5)):
+            qty = rng.randint(1, 3)
+            lines.append((product, qty))
+        total = sum(product["price"] * qty for product, qty in lines)
+        status = rng.choices(statuses, weights)[0]
+        wallet_paid = status != "PENDING"
+        if wallet_paid and total > balance:
+            continue  # a real wallet would have refused it
+        order = build(
+            Order, id=new_pk(Order, rng), user=user, total=total, status=status,
+            note=rng.choice(["", "", "Leave at the gate", "Call on arrival"]), eta="Tomorrow by 10am",
+            address_id=rng.choice(addresses).pk,
+            payment_method="wallet" if wallet_paid else "paystack",
+            payment_reference=None if wallet_paid else f"order_{rng.getrandbits(64):016x}",
+        )
+        orders.append(order)
+        items.extend(
+            build(OrderItem, order=order, item_type="product", product_id=None, name=product["name"],
+                  emoji=product["emoji"], qty=qty, unit_price=product["price"], total_price=product["price"] * qty)
+            for product, qty in lines
+        )
+        if wallet_paid:
+            balance -= total
+            reference = f"seed_{rng.getrandbits(64):016x}"
+            txns.append(build(WalletTransaction, user=user, amount=total, type="DEBIT_ORDER", status="SUCCESS",
+                              description=f"Order {reference[5:13]}", reference=reference, order=order))
+
+    user.wallet_balance = balance
+    return user, addresses, orders, items, txns
+
+
+# ---------------------------------------------------------------------------
+# Seeding
+# ---------------------------------------------------------------------------
+def insert_batch(batch, batch_size, counts):
+    users, addresses, orders, items, txns = [], [], [], [], []
+    for user, user_addresses, user_orders, user_items, user_txns in batch:
+        users.append(user)
+        addresses.extend(user_addresses)
+        orders.extend(user_orders)
+        items.extend(user_items)
+        txns.extend(user_txns)
+
+    with transaction.atomic():
+        # Parents first; bulk_create fills in the primary keys the children point at.
+        for model, rows in ((User, users), (Address, addresses), (Order, orders),
+                            (OrderItem, items), (WalletTransaction, txns)):
+            start = time.perf_counter()
+            model.objects.bulk_create(rows, batch_size=batch_size)
+            counts[model.__name__][0] += len(rows)
+            counts[model.__name__][1] += time.perf_counter() - start
+
+
+def seed(count, orders_per_user, batch_size, phone_base, seed_value):
+    rng = random.Random(seed_value)
+    products = load_products()
+    unusable_password = make_password(None)
+    counts = {model.__name__: [0, 0.0] for model in (User, Address, Order, OrderItem, WalletTransaction)}
+    start = time.perf_counter()
+
+    with signals_disabled() as flipped:
+        print(f"🔕 Signals disabled: {', '.join(flipped) or 'none found'}")
+        batch = []
+        for number in range(count):
+            batch.append(user_rows(rng, number, phone_base, orders_per_user, products, unusable_password))
+            if len(batch) == batch_size or number == count - 1:
+                insert_batch(batch, batch_size, counts)
+                batch = []
+                done = number + 1
+                rows = sum(n for n, _ in counts.values())
+                elapsed = time.perf_counter() - start
+                print(f"  ✓ {done:,}/{count:,} users — {rows:,} rows, {rows / elapsed:,.0f} rows/s")
+
+    wall = time.perf_counter() - start
+    total = sum(n for n, _ in counts.values())
+    print(f"\n{'═' * 60}")
+    print(f"  {'table':<20} {'rows':>10} {'insert s':>10} {'rows/s':>12}")
+    for name, (rows, seconds) in counts.items():
+        print(f"  {name:<20} {rows:>10,} {seconds:>10.2f} {rows / seconds if seconds else 0:>12,.0f}")
+    print(f"  {'total':<20} {total:>10,} {wall:>10.2f} {total / wall:>12,.0f}   (wall, incl. generation)")
+    print(f"{'═' * 60}")
+
+
+def clear(phone_base):
+    """Delete seeded users (name ends in "(seed)") and every row that points at them."""
+    users = User.objects.filter(phone__gte=phone_base, name__endswith="(seed)")
+    with signals_disabled(), transaction.atomic():
+        deleted = {}
+        for model in (OrderItem, WalletTransaction, Order, Address):
+            lookup = "order__user__in" if model is OrderItem else "user__in"
+            deleted[model.__name__] = model.objects.filter(**{lookup: users}).delete()[0]
+        deleted["User"] = users.delete()[0]
+    print("🧹 Deleted " + ", ".join(f"{n:,} {name}" for name, n in deleted.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-seed users, wallets, addresses and orders")
+    parser.add_argument("--users", type=int, default=1000, help="number of users to create")
+    parser.add_argument("--orders", type=int, default=6, help="average orders per user")
+    parser.add_argument("--batch-size", type=int, default=500, help="users per transaction / bulk_create")
+    parser.add_argument("--phone-base", default=PHONE_BASE, help="first seeded phone number")
+    parser.add_argument("--seed", type=int, default=42, help="random seed (same seed, same data)")
+    parser.add_argument("--clear", action="store_true", help="delete previously seeded users and exit")
+    args = parser.parse_args()
+
+    setup_django()
+    if args.clear:
+        clear(args.phone_base)
+        return
+    seed(args.users, args.orders, args.batch_size, args.phone_base, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -25,7 +25,7 @@ Optional:
 import os
 import sys
 
-import requests
+from baza_client import BazaClient
 
 
 BASE = os.getenv("BASE_URL", "https://baza-chi.vercel.app").rstrip("/")
@@ -34,6 +34,10 @@ AUTH_TOKEN = os.getenv("AUTH_TOKEN", "").strip()
 TEST_OTP = os.getenv("TEST_OTP", "").strip()
 REQUIRE_ALL_TOOLS = os.getenv("REQUIRE_ALL_TOOLS", "false").strip().lower() == "true"
 
+# One pooled client for the whole run: every chat turn reuses the same
+# keep-alive connection instead of paying a fresh TCP/TLS handshake.
+client = BazaClient(BASE, timeout=45)
+
 EXPECTED_TOOLS = {
     "search_products",
     "list_bundles",
@@ -80,38 +84,21 @@ def step(name, fn):
 
 
 def _req(method: str, path: str, token: str, **kwargs):
-    headers = kwargs.pop("headers", {})
-    headers.update(
-        {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-        }
-    )
-    return requests.request(method, f"{BASE}{path}", headers=headers, timeout=45, **kwargs)
+    return client.request(method, path, token=token, **kwargs)
 
 
 def get_token() -> str:
     if AUTH_TOKEN:
         return AUTH_TOKEN
 
-    r = requests.post(
-        f"{BASE}/v1/auth/otp-request",
-        headers={"Content-Type": "application/json"},
-        json={"phone": TEST_PHONE},
-        timeout=30,
-    )
+    r = client.request_otp(TEST_PHONE)
     assert r.status_code == 200, f"otp-request failed: {r.status_code} {r.text}"
 
     otp_candidates = [TEST_OTP] if TEST_OTP else ["111111", "1111"]
     last_response = None
 
     for code in otp_candidates:
-        r2 = requests.post(
-            f"{BASE}/v1/auth/otp-verify",
-            headers={"Content-Type": "application/json"},
-            json={"phone": TEST_PHONE, "otp": code},
-            timeout=30,
-        )
+        r2 = client.verify_otp(TEST_PHONE, code)
         last_response = r2
         if r2.status_code == 200:
             body = r2.json()
@@ -128,7 +115,7 @@ def get_token() -> str:
 
 
 def test_suggestions(token: str):
-    r = _req("GET", "/v1/ai/suggestions", token)
+    r = _req("GET", "/ai/suggestions", token)
     assert r.status_code == 200, f"expected 200 got {r.status_code}: {r.text}"
     body = r.json()
     assert isinstance(body.get("suggestions"), list), f"invalid suggestions response: {body}"
@@ -136,7 +123,7 @@ def test_suggestions(token: str):
 
 
 def test_sessions_list(token: str):
-    r = _req("GET", "/v1/ai/sessions", token)
+    r = _req("GET", "/ai/sessions", token)
     assert r.status_code == 200, f"expected 200 got {r.status_code}: {r.text}"
     body = r.json()
     assert isinstance(body.get("sessions"), list), f"invalid sessions response: {body}"
@@ -145,7 +132,7 @@ def test_sessions_list(token: str):
 
 def test_session_create(token: str):
     global session_id
-    r = _req("POST", "/v1/ai/sessions", token, json={"title": "Full Tool Coverage Chat"})
+    r = _req("POST", "/ai/sessions", token, json={"title": "Full Tool Coverage Chat"})
     assert r.status_code == 201, f"expected 201 got {r.status_code}: {r.text}"
     body = r.json()
     session_id = body.get("session", {}).get("id")
@@ -159,7 +146,7 @@ def send_chat(token: str, prompt: str):
 
     r = _req(
         "POST",
-        "/v1/ai/chat",
+        "/ai/chat",
         token,
         json={"sessionId": session_id, "message": prompt},
     )
@@ -320,7 +307,7 @@ def test_full_conversation(token: str):
 
 def test_history(token: str):
     assert session_id, "session_id missing"
-    r = _req("GET", f"/v1/ai/history?sessionId={session_id}", token)
+    r = _req("GET", f"/ai/history?sessionId={session_id}", token)
     assert r.status_code == 200, f"expected 200 got {r.status_code}: {r.text}"
     body = r.json()
     messages = body.get("messages")
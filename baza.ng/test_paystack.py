@@ -21,24 +21,58 @@ Usage:
     - GET /v1/wallet/transactions → wallet transaction history
     - POST /v1/wallet/topup → initialises a Paystack transaction (server-init flow)
     - GET /v1/wallet/verify-topup?reference=xxx → verifies payment status
+
+Webhook flood (idempotency under load):
+  export PAYSTACK_SECRET_KEY=sk_test_...   # the key the backend verifies with
+  python test_paystack.py --webhook-flood 5000 --rate 200 --duplicates 0.3
+
+  Logs in --users test users from --phone-base (OTP from TEST_OTP), then
+  posts signed charge.success events to POST /v1/webhooks/paystack at
+  --rate events/s: card top-ups (metadata.user_id) and, for --dva-share of
+  them, dedicated_nuban bank transfers (matched by customer_code). A
+  --duplicates fraction of events is delivered again, some back-to-back
+  (racing the original) and some at the end (late retries). Afterwards every
+  wallet must have grown by exactly the sum of its unique references, with
+  one transaction per reference; anything more is a double credit.
+
+  DVA events need each user's Paystack customer code: it is read from
+  paystackCustomerCode on GET /v1/user/me, or from --customers FILE
+  (CSV lines of phone,customer_code).
+
+Checkout benchmark (offline, against the Paystack stand-in):
+  python paystack_mock.py --port 8100 --webhook-url http://127.0.0.1:8000/v1/webhooks/paystack &
+  python mock_api.py --paystack-url http://127.0.0.1:8100 &
+  BASE_URL=http://127.0.0.1:8000 python test_paystack.py --checkout-bench 200 --concurrency 20
+  ... --flow order      # paystack order payments instead of wallet top-ups
+
+  Each checkout initialises a payment, then polls verify until it is paid,
+  declined, abandoned or --give-up seconds pass. Latency is split into the
+  app's own time and Paystack's share using the ``Server-Timing:
+  paystack;dur=`` metric when the backend reports it.
 """
 
+import argparse
+import csv
 import json
 import os
+import random
+import secrets
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
-import requests
+from baza_client import BazaClient
+from http_timing import server_timings
+from loadstats import LatencyRecorder
+from paystack_webhooks import PAYSTACK_SECRET_KEY, card_topup_event, dva_credit_event, post_event
 
 BASE = os.getenv("BASE_URL", "https://baza-chi.vercel.app").rstrip("/")
 TOKEN = os.getenv("AUTH_TOKEN", "")
-if not TOKEN:
-    print("ERROR: Set AUTH_TOKEN env var to a valid JWT access token.")
-    sys.exit(1)
+TEST_OTP = os.getenv("TEST_OTP", "1111")
 
-HEADERS = {
-    "Authorization": f"Bearer {TOKEN}",
-    "Content-Type": "application/json",
-}
+client = BazaClient(BASE, token=TOKEN)
 
 passed = 0
 failed = 0
@@ -61,7 +95,7 @@ def step(name, fn):
 # ── 1. Paystack Config ──────────────────────────────────────────────────────
 
 def test_paystack_config():
-    r = requests.get(f"{BASE}/v1/wallet/paystack-config", headers=HEADERS, timeout=15)
+    r = client.get("/wallet/paystack-config", timeout=15)
     assert r.status_code == 200, f"expected 200 got {r.status_code}: {r.text}"
     body = r.json()
     assert "publicKey" in body, f"response missing publicKey: {body}"
@@ -73,7 +107,7 @@ def test_paystack_config():
 # ── 2. Get current wallet balance ───────────────────────────────────────────
 
 def test_wallet_balance():
-    r = requests.get(f"{BASE}/v1/wallet/balance", headers=HEADERS, timeout=15)
+    r = client.get("/wallet/balance", timeout=15)
     assert r.status_code == 200, f"expected 200 got {r.status_code}: {r.text}"
     body = r.json()
     assert "balance" in body, f"response missing balance: {body}"
@@ -83,7 +117,7 @@ def test_wallet_balance():
 # ── 3. Wallet Account (DVA) ─────────────────────────────────────────────────
 
 def test_wallet_account():
-    r = requests.get(f"{BASE}/v1/wallet/account", headers=HEADERS, timeout=30)
+    r = client.get("/wallet/account", timeout=30)
     assert r.status_code == 200, f"expected 200 got {r.status_code}: {r.text}"
     body = r.json()
     assert "accountNumber" in body, f"response missing accountNumber: {body}"
@@ -101,7 +135,7 @@ def test_wallet_account():
 # ── 4. Wallet Transactions ──────────────────────────────────────────────────
 
 def test_wallet_transactions():
-    r = requests.get(f"{BASE}/v1/wallet/transactions", headers=HEADERS, timeout=15)
+    r = client.get("/wallet/transactions", timeout=15)
     assert r.status_code == 200, f"expected 200 got {r.status_code}: {r.text}"
     body = r.json()
     assert "transactions" in body, f"response missing transactions: {body}"
@@ -118,9 +152,8 @@ topup_reference = None
 
 def test_topup_init():  # noqa: C901
     global topup_reference
-    r = requests.post(
-        f"{BASE}/v1/wallet/topup",
-        headers=HEADERS,
+    r = client.post(
+        "/wallet/topup",
         json={"amount": 50000, "callbackUrl": "https://baza.ng/callback"},  # ₦500
         timeout=30,
     )
@@ -140,9 +173,8 @@ def test_topup_init():  # noqa: C901
 def test_verify_pending():
     if not topup_reference:
         raise AssertionError("skipped — no reference from topup")
-    r = requests.get(
-        f"{BASE}/v1/wallet/verify-topup?reference={topup_reference}",
-        headers=HEADERS,
+    r = client.get(
+        f"/wallet/verify-topup?reference={topup_reference}",
         timeout=15,
     )
     # Expecting either 400 (payment not successful) or 502 (Paystack says abandoned)
@@ -157,9 +189,8 @@ def test_verify_pending():
 # ── 7. Verify with bogus reference (should handle gracefully) ──────────────
 
 def test_verify_bogus():
-    r = requests.get(
-        f"{BASE}/v1/wallet/verify-topup?reference=bogus_ref_12345",
-        headers=HEADERS,
+    r = client.get(
+        "/wallet/verify-topup?reference=bogus_ref_12345",
         timeout=15,
     )
     body = r.json()
@@ -173,9 +204,8 @@ def test_verify_bogus():
 # ── 8. Verify without reference param ──────────────────────────────────────
 
 def test_verify_no_ref():
-    r = requests.get(
-        f"{BASE}/v1/wallet/verify-topup",
-        headers=HEADERS,
+    r = client.get(
+        "/wallet/verify-topup",
         timeout=15,
     )
     assert r.status_code == 400, f"expected 400 got {r.status_code}: {r.text}"
@@ -183,9 +213,278 @@ def test_verify_no_ref():
     assert body.get("code") == "MISSING_REFERENCE", f"unexpected code: {body}"
 
 
+# ── Webhook flood ───────────────────────────────────────────────────────────
+
+def load_customers(path):
+    if not path:
+        return {}
+    with open(path, newline="") as fh:
+        return {row[0].strip(): row[1].strip() for row in csv.reader(fh) if len(row) >= 2}
+
+
+def fresh_balance(user_client):
+    # A throwaway query parameter so ResponseCacheMiddleware cannot answer with a balance up to 5s old.
+    return user_client.get("/wallet/balance", params={"_": time.time_ns()}).json()["balance"]
+
+
+def login_flood_user(phone, customers, provision=False):
+    """Log ``phone`` in; ``provision`` also fetches (and so provisions) its DVA, for DVA deliveries."""
+    user_client = BazaClient(BASE)
+    user_client.login(phone, TEST_OTP)
+    me = user_client.me().json()
+    account = user_client.wallet_account().json() if provision else {}
+    return {
+        "phone": phone,
+        "client": user_client,
+        "id": me["id"],
+        "email": me.get("email") or f"{phone.lstrip('+')}@baza.ng",
+        "customer_code": customers.get(phone) or me.get("paystackCustomerCode"),
+        "account_number": account.get("accountNumber"),
+        "before": fresh_balance(user_client),
+    }
+
+
+def plan_deliveries(users, events, dva_share, duplicates):
+    """Unique events plus their redeliveries, in send order."""
+    deliveries, late = [], []
+    for n in range(events):
+        user = random.choice(users)
+        amount = random.randint(1, 500) * 10000  # ₦100 – ₦50,000
+        if user["customer_code"] and random.random() < dva_share:
+            reference = f"flood_dva_{secrets.token_hex(8)}"
+            event = dva_credit_event(reference, amount, user["customer_code"], user["account_number"], user["email"])
+            kind = "dva"
+        else:
+            reference = f"flood_card_{secrets.token_hex(8)}"
+            event = card_topup_event(reference, amount, user["id"], user["email"])
+            kind = "card"
+        item = {"user": user, "reference": reference, "amount": amount, "event": event, "kind": kind}
+        deliveries.append(item)
+        if random.random() < duplicates:
+            for _ in range(random.randint(1, 3)):
+                retry = dict(item, kind=f"{kind} duplicate")
+                # Half race the original, half arrive as late retries.
+                (deliveries if random.random() < 0.5 else late).append(retry)
+    random.shuffle(late)
+    return deliveries + late
+
+
+def wallet_references(user_client, prefix="flood_"):
+    """reference -> number of wallet transactions carrying it."""
+    counts, page = {}, 1
+    while True:
+        body = user_client.wallet_transactions(page=page, limit=100).json()
+        for txn in body.get("transactions", []):
+            reference = txn.get("reference") or ""
+            if reference.startswith(prefix):
+                counts[reference] = counts.get(reference, 0) + 1
+        if not body.get("pagination", {}).get("hasNext"):
+            return counts
+        page += 1
+
+
+def run_webhook_flood(args):
+    print(f"\n🌊 Paystack Webhook Flood\n   Base: {BASE}\n   Events: {args.webhook_flood} "
+          f"@ {args.rate or 'max'}/s, duplicates {args.duplicates:.0%}, DVA share {args.dva_share:.0%}\n")
+
+    customers = load_customers(args.customers)
+    first_phone = int(args.phone_base.lstrip("+"))
+    phones = [f"+{first_phone + i}" for i in range(args.users)]
+    with ThreadPoolExecutor(max_workers=min(args.users, 20)) as pool:
+        users = list(pool.map(lambda phone: login_flood_user(phone, customers, provision=True), phones))
+    if args.dva_share and not any(user["customer_code"] for user in users):
+        print("  ⚠ No customer codes found (user/me or --customers); sending card events only")
+    print(f"  👥 {len(users)} users logged in")
+
+    deliveries = plan_deliveries(users, args.webhook_flood, args.dva_share, args.duplicates)
+    sender = BazaClient(BASE, pool_maxsize=args.concurrency, timeout=30)
+    url = f"{sender.api}/webhooks/paystack"
+    latency = LatencyRecorder()
+    accepted = {}  # reference -> delivery, once any delivery got a 2xx
+    statuses = {}
+    lock = threading.Lock()
+
+    def deliver(item):
+        try:
+            resp = post_event(sender.session, url, item["event"], PAYSTACK_SECRET_KEY)
+            status, seconds = resp.status_code, resp.timing.total_ms / 1000
+        except Exception as err:
+            status, seconds = type(err).__name__, 0.0
+        ok = isinstance(status, int) and status < 300
+        latency.record(item["kind"], seconds, ok=ok)
+        with lock:
+            statuses[status] = statuses.get(status, 0) + 1
+            if ok:
+                accepted[item["reference"]] = item
+
+    # Open loop: delivery i is due at start + i / rate whether or not earlier ones finished.
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for i, item in enumerate(deliveries):
+            if args.rate:
+                delay = start + i / args.rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(deliver, item)
+    wall = time.perf_counter() - start
+
+    latency.print_report(wall, title="Webhook delivery latency")
+    print(f"  Deliveries: {len(deliveries)} ({len(deliveries) - args.webhook_flood} duplicates)  "
+          f"Statuses: {dict(sorted(statuses.items(), key=str))}")
+
+    expected = {user["id"]: 0 for user in users}
+    for item in accepted.values():
+        expected[item["user"]["id"]] += item["amount"]
+
+    # Handlers may credit asynchronously; give balances --settle seconds to catch up.
+    deadline = time.perf_counter() + args.settle
+    while True:
+        gained = {u["id"]: fresh_balance(u["client"]) - u["before"] for u in users}
+        if gained == expected or time.perf_counter() > deadline:
+            break
+        time.sleep(1)
+
+    over, under, duplicate_txns = [], [], 0
+    for user in users:
+        diff = gained[user["id"]] - expected[user["id"]]
+        if diff > 0:
+            over.append((user["phone"], diff))
+        elif diff < 0:
+            under.append((user["phone"], -diff))
+        duplicate_txns += sum(n - 1 for n in wallet_references(user["client"]).values() if n > 1)
+
+    print(f"\n  Unique references accepted: {len(accepted)}/{args.webhook_flood}")
+    print(f"  Webhook throughput: {len(deliveries) / wall:.1f} deliveries/s")
+    if over or duplicate_txns:
+        print(f"  ❌ DOUBLE CREDIT: {len(over)} wallets over-credited, {duplicate_txns} duplicate transactions")
+        for phone, diff in over[:10]:
+            print(f"     {phone}: +{diff} kobo too much")
+    else:
+        print("  ✅ No wallet was double-credited")
+    if under:
+        print(f"  ⚠ {len(under)} wallets are missing credits for accepted webhooks:")
+        for phone, diff in under[:10]:
+            print(f"     {phone}: -{diff} kobo")
+    return not over and not duplicate_txns and not under
+
+
+# ── Checkout benchmark ──────────────────────────────────────────────────────
+
+def timed(recorder, label, resp, shares):
+    """Record a call and how much of its server time was spent waiting on Paystack."""
+    total = resp.timing.total_ms
+    paystack = server_timings(resp).get("paystack", 0.0)
+    recorder.record(label, total / 1000, ok=resp.status_code < 500)
+    if paystack:
+        recorder.record(f"{label} · paystack", paystack / 1000)
+    entry = shares.setdefault(label, [0.0, 0.0])
+    entry[0] += total
+    entry[1] += paystack
+
+
+def run_checkout(user, flow, amount, recorder, shares, args):
+    """One top-up or order payment, from initialise to credited/confirmed. Returns the outcome."""
+    user_client = user["client"]
+    start = time.perf_counter()
+    if flow == "order":
+        item = {"itemType": "product", "name": "Checkout bench", "emoji": "🧪", "qty": 1,
+                "unitPrice": amount, "totalPrice": amount}
+        resp = user_client.create_order([item], amount, paymentMethod="paystack")
+        timed(recorder, "order create", resp, shares)
+        if resp.status_code != 201:
+            return f"init {resp.status_code}"
+        reference, order_id = resp.json()["reference"], resp.json()["order"]["id"]
+        verify = partial(user_client.verify_order_payment, reference, order_id)
+    else:
+        resp = user_client.topup(amount)
+        timed(recorder, "topup init", resp, shares)
+        if resp.status_code != 200:
+            return f"init {resp.status_code}"
+        reference = resp.json()["reference"]
+        verify = partial(user_client.verify_topup, reference)
+
+    label = "verify-payment" if flow == "order" else "verify-topup"
+    while time.perf_counter() - start < args.give_up:
+        time.sleep(args.poll)
+        resp = verify()
+        timed(recorder, label, resp, shares)
+        if resp.status_code == 200:
+            recorder.record("checkout (init → paid)", time.perf_counter() - start)
+            return "paid"
+        text = resp.text.lower()
+        for outcome in ("abandoned", "failed"):
+            if outcome in text:
+                return outcome
+    return "timed out"
+
+
+def run_checkout_bench(args):
+    print(f"\n💳 Paystack Checkout Benchmark\n   Base: {BASE}\n   Flow: {args.flow}  "
+          f"Checkouts: {args.checkout_bench}  Concurrency: {args.concurrency}\n")
+
+    first_phone = int(args.phone_base.lstrip("+"))
+    phones = [f"+{first_phone + i}" for i in range(args.users)]
+    with ThreadPoolExecutor(max_workers=min(args.users, 20)) as pool:
+        users = list(pool.map(lambda phone: login_flood_user(phone, {}), phones))
+
+    recorder, shares, outcomes = LatencyRecorder(), {}, {}
+    lock = threading.Lock()
+
+    def worker(n):
+        try:
+            outcome = run_checkout(users[n % len(users)], args.flow, random.randint(1, 100) * 10000,
+                                   recorder, shares, args)
+        except Exception as err:
+            outcome = type(err).__name__
+        with lock:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(worker, range(args.checkout_bench)))
+    wall = time.perf_counter() - start
+
+    recorder.print_report(wall, title=f"Checkout latency ({args.flow})")
+    print(f"  Outcomes: {dict(sorted(outcomes.items()))}")
+    for label, (total, paystack) in shares.items():
+        if total:
+            print(f"  {label}: {paystack / total:.0%} of client-observed time was Paystack")
+    return outcomes.get("paid", 0) > 0
+
+
 # ── Run tests ───────────────────────────────────────────────────────────────
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Paystack integration test")
+    parser.add_argument("--webhook-flood", type=int, default=0, metavar="EVENTS",
+                        help="post EVENTS signed charge.success webhooks and check idempotency")
+    parser.add_argument("--rate", type=float, default=100, help="target deliveries per second (0 = max)")
+    parser.add_argument("--duplicates", type=float, default=0.2, help="fraction of events delivered again")
+    parser.add_argument("--dva-share", type=float, default=0.3, help="fraction of events that are DVA transfers")
+    parser.add_argument("--users", type=int, default=10, help="wallets to spread events over")
+    parser.add_argument("--phone-base", default=os.getenv("PHONE_BASE", "+2348000000000"))
+    parser.add_argument("--customers", help="CSV of phone,customer_code for DVA events")
+    parser.add_argument("--concurrency", type=int, default=50, help="parallel webhook deliveries")
+    parser.add_argument("--settle", type=float, default=10, help="seconds to wait for balances to converge")
+    parser.add_argument("--checkout-bench", type=int, default=0, metavar="N",
+                        help="run N Paystack checkouts (initialise → verify) and split out Paystack latency")
+    parser.add_argument("--flow", choices=["topup", "order"], default="topup", help="checkout flow to benchmark")
+    parser.add_argument("--poll", type=float, default=1.0, help="seconds between verify calls")
+    parser.add_argument("--give-up", type=float, default=30, help="seconds before an unpaid checkout counts as timed out")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.webhook_flood:
+        sys.exit(0 if run_webhook_flood(args) else 1)
+    if args.checkout_bench:
+        sys.exit(0 if run_checkout_bench(args) else 1)
+
+    if not TOKEN:
+        print("ERROR: Set AUTH_TOKEN env var to a valid JWT access token.")
+        sys.exit(1)
+
     print(f"\n🔧 Paystack Integration Test\n   Base: {BASE}\n")
 
     step("1. GET paystack-config", test_paystack_config)
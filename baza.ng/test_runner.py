@@ -1,18 +1,20 @@
 #!/usr/bin/env python3
-"""Run all test steps against the live Vercel API."""
+"""Run all test steps against the live Vercel API (or BASE_URL).
+
+Set TIMINGS_OUT=run.jsonl (or .csv) to export per-request timings.
+"""
 import json
-import requests
+import os
 
-API = "https://baza-chi.vercel.app/v1"
-PHONE = "+917204218098"
-OTP = "1111"
-s = requests.Session()
+from baza_client import BazaClient
+from http_timing import TimingLog
 
-def h(token=None):
-    hd = {"Content-Type": "application/json"}
-    if token:
-        hd["Authorization"] = f"Bearer {token}"
-    return hd
+BASE_URL = os.getenv("BASE_URL", "https://baza-chi.vercel.app").rstrip("/")
+PHONE = os.getenv("PHONE", "+917204218098")
+OTP = os.getenv("OTP", "1111")
+TIMINGS_OUT = os.getenv("TIMINGS_OUT", "")
+timings = TimingLog()
+client = BazaClient(BASE_URL, timing_log=timings)
 
 def p(label, resp):
     try:
@@ -20,107 +22,111 @@ def p(label, resp):
     except Exception:
         body = resp.text[:300]
     icon = "✅" if 200 <= resp.status_code < 300 else "❌"
-    print(f"\n{icon} {label}: {resp.status_code}")
+    print(f"\n{icon} {label}: {resp.status_code}  ⏱  {resp.timing.describe()}")
     print(json.dumps(body, indent=2, default=str)[:600])
     return body
 
 # Step 2: Verify OTP
 print("=" * 50)
 print("Step 2: OTP Verify")
-resp = s.post(f"{API}/auth/otp-verify", json={"phone": PHONE, "otp": OTP, "name": "Test User"}, headers=h())
+resp = client.post("/auth/otp-verify", json={"phone": PHONE, "otp": OTP, "name": "Test User"})
 body = p("otp-verify", resp)
 if resp.status_code != 200:
     print("FAILED - stopping")
     exit(1)
 
-TOKEN = body["accessToken"]
+TOKEN = client.access_token = body["accessToken"]
 print(f"Token: {TOKEN[:30]}...")
 
 # Step 3: GET /user/me
-resp = s.get(f"{API}/user/me", headers=h(TOKEN))
+resp = client.get("/user/me")
 p("GET /user/me", resp)
 
 # Step 4: PUT /user/profile
-resp = s.put(f"{API}/user/profile", json={"name": "Baza Tester", "email": "tester@baza.ng"}, headers=h(TOKEN))
+resp = client.put("/user/profile", json={"name": "Baza Tester", "email": "tester@baza.ng"})
 p("PUT /user/profile", resp)
 
 # Step 5: PUT /user/notifications
-resp = s.put(f"{API}/user/notifications", json={"orders": True, "delivery": True, "deals": False, "reminders": True, "newsletter": False}, headers=h(TOKEN))
+resp = client.put("/user/notifications", json={"orders": True, "delivery": True, "deals": False, "reminders": True, "newsletter": False})
 p("PUT /user/notifications", resp)
 
 # Step 6: POST address
-resp = s.post(f"{API}/user/addresses/create", json={"label": "Home", "address": "14 Akin Adesola St, VI Lagos", "landmark": "Near Access Bank"}, headers=h(TOKEN))
+resp = client.post("/user/addresses/create", json={"label": "Home", "address": "14 Akin Adesola St, VI Lagos", "landmark": "Near Access Bank"})
 addr = p("POST /user/addresses/create", resp)
 addr_id = addr.get("id")
 
 # Step 7: GET addresses
-resp = s.get(f"{API}/user/addresses/", headers=h(TOKEN))
+resp = client.get("/user/addresses/")
 p("GET /user/addresses/", resp)
 
 # Step 8: PUT address
 if addr_id:
-    resp = s.put(f"{API}/user/addresses/{addr_id}", json={"label": "Home Updated", "landmark": "Opposite GTBank"}, headers=h(TOKEN))
+    resp = client.put(f"/user/addresses/{addr_id}", json={"label": "Home Updated", "landmark": "Opposite GTBank"})
     p(f"PUT /user/addresses/{addr_id}", resp)
 
     # Step 9: PATCH default
-    resp = s.patch(f"{API}/user/addresses/{addr_id}/default", headers=h(TOKEN))
+    resp = client.patch(f"/user/addresses/{addr_id}/default")
     p(f"PATCH default", resp)
 
 # Step 10: Products
 for name, path in [("bundles", "/products/bundles"), ("mealpacks", "/products/mealpacks"), ("readyeat", "/products/readyeat"), ("snacks", "/products/snacks"), ("restock", "/products/restock")]:
-    resp = s.get(f"{API}{path}", headers=h(TOKEN))
+    resp = client.get(path)
     p(f"GET {path}", resp)
 
 # Step 11: Wallet balance
-resp = s.get(f"{API}/wallet/balance", headers=h(TOKEN))
+resp = client.get("/wallet/balance")
 p("GET /wallet/balance", resp)
 
 # Step 12: Wallet transactions
-resp = s.get(f"{API}/wallet/transactions", headers=h(TOKEN))
+resp = client.get("/wallet/transactions")
 p("GET /wallet/transactions", resp)
 
 # Step 13: Create order
-resp = s.post(f"{API}/orders/create", json={
+resp = client.post("/orders/create", json={
     "items": [{"itemType": "product", "productId": "r1", "name": "Test Product", "emoji": "🧪", "qty": 1, "unitPrice": 100000, "totalPrice": 100000}],
     "total": 100000,
     "note": "Test order from test_runner.py",
     "addressId": addr_id,
-}, headers=h(TOKEN))
+})
 order_body = p("POST /orders/create", resp)
 
 # Step 14: List orders
-resp = s.get(f"{API}/orders/", headers=h(TOKEN))
+resp = client.get("/orders/")
 p("GET /orders/", resp)
 
 # Step 15: Order detail
 order_id = None
 if isinstance(order_body, dict) and "order" in order_body:
     order_id = order_body["order"]["id"]
-    resp = s.get(f"{API}/orders/{order_id}", headers=h(TOKEN))
+    resp = client.get(f"/orders/{order_id}")
     p(f"GET /orders/{order_id}", resp)
 
 # Step 16: Referral stats
-resp = s.get(f"{API}/referral/stats", headers=h(TOKEN))
+resp = client.get("/referral/stats")
 p("GET /referral/stats", resp)
 
 # Step 17: Support thread
-resp = s.get(f"{API}/support/thread", headers=h(TOKEN))
+resp = client.get("/support/thread")
 p("GET /support/thread", resp)
 
 # Step 18: Send support message
-resp = s.post(f"{API}/support/message", json={"text": "Hello, question about delivery time."}, headers=h(TOKEN))
+resp = client.post("/support/message", json={"text": "Hello, question about delivery time."})
 p("POST /support/message", resp)
 
 # Step 19: Refresh
-resp = s.post(f"{API}/auth/refresh", headers=h(TOKEN))
+resp = client.post("/auth/refresh")
 refresh_body = p("POST /auth/refresh", resp)
 if resp.status_code == 200:
-    TOKEN = refresh_body.get("accessToken", TOKEN)
+    TOKEN = client.access_token = refresh_body.get("accessToken", TOKEN)
 
 # Step 20: Logout
-resp = s.post(f"{API}/auth/logout", headers=h(TOKEN))
+resp = client.post("/auth/logout")
 p("POST /auth/logout", resp)
 
+timings.print_breakdown()
+if TIMINGS_OUT:
+    print(f"\n📝 {timings.export(TIMINGS_OUT)} request timings → {TIMINGS_OUT}")
+
 print("\n" + "=" * 50)
 print("✨ ALL STEPS COMPLETE")
 print("=" * 50)
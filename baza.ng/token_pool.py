@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+token_pool.py — Pre-minted auth tokens for load runs
+====================================================
+
+Logging in through otp-request/otp-verify on every load run makes the auth
+path (and SMS sending) the thing being measured. The pool logs a range of
+test phones in once, stores each access token and refresh token with their
+expiry in a JSON file, and keeps them fresh through /auth/refresh in a
+background thread. Load workers draw ready-made tokens with no auth calls
+on the hot path.
+
+Usage:
+    OTP=1111 python token_pool.py mint --users 500 --phone-base +2348100000000
+    python token_pool.py status
+    python token_pool.py refresh --watch      # keep the file fresh while runs come and go
+
+    from token_pool import TokenPool
+
+    pool = TokenPool.load()                   # TOKEN_POOL, default .token_pool.json
+    pool.start()                              # background refresh
+    client = pool.client(7)                   # BazaClient whose bearer always comes from the pool
+    client.wallet_balance()
+    pool.stop()
+
+Refresh tokens rotate on every use, so only the pool refreshes them: pooled
+clients never call /auth/refresh themselves. Access expiry comes from the
+JWT's exp claim (TOKEN_POOL_ACCESS_TTL seconds when the token is opaque),
+refresh expiry from the baza_refresh cookie; a 401 on a pooled client still
+rotates that user's tokens at once and retries. The file holds live
+credentials and is written with mode 600.
+
+Several processes can share the file, e.g. ``refresh --watch`` next to the
+runs. Saves take a lock on <file>.lock and merge with what is on disk, and
+an entry rotated by another process (later refreshExpires) wins over the
+copy in memory. Before rotating a token, and again before giving up on one
+whose refresh failed, a pool re-reads the file. So a refresh token the
+watcher has already rotated is replaced by its successor instead of being
+re-minted or marked dead.
+"""
+
+import argparse
+import base64
+import fcntl
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from baza_client import BASE_URL, BazaClient
+
+POOL_PATH = os.getenv("TOKEN_POOL", ".token_pool.json")
+OTP = os.getenv("OTP", "")
+ACCESS_TTL = int(os.getenv("TOKEN_POOL_ACCESS_TTL", str(15 * 60)))
+REFRESH_TTL = 30 * 24 * 3600
+REFRESH_MARGIN = 120  # refresh access tokens this many seconds before they expire
+CHECK_INTERVAL = 5
+CONCURRENCY = 16
+
+
+def jwt_expiry(token):
+    """The exp claim of a JWT, or None for opaque tokens."""
+    try:
+        payload = token.split(".")[1]
+        return float(json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))["exp"])
+    except (IndexError, ValueError, KeyError, TypeError):
+        return None
+
+
+def refresh_cookie(jar):
+    """(value, expires) of the baza_refresh cookie in ``jar``, or (None, None)."""
+    for cookie in jar:
+        if cookie.name == "baza_refresh" and cookie.value:
+            return cookie.value, float(cookie.expires or time.time() + REFRESH_TTL)
+    return None, None
+
+
+class PooledClient(BazaClient):
+    """A BazaClient whose bearer token is always the pool's current one for ``phone``."""
+
+    def __init__(self, pool, phone, **kwargs):
+        kwargs.setdefault("auto_refresh", False)
+        super().__init__(pool.base_url, **kwargs)
+        self.pool = pool
+        self.phone = phone
+
+    def headers(self, token=None):
+        return super().headers(token or self.pool.token(self.phone))
+
+    def request(self, method, path, token=None, headers=None, **kwargs):
+        resp = super().request(method, path, token=token, headers=headers, **kwargs)
+        if resp.status_code == 401 and token is None and not path.startswith("/auth/"):
+            # The server expired it earlier than we thought (opaque token, clock skew): rotate and retry once.
+            self.pool.refresh(self.phone, force=True)
+            resp = super().request(method, path, headers=headers, **kwargs)
+        return resp
+
+
+class TokenPool:
+    def __init__(self, path=POOL_PATH, base_url=BASE_URL, otp=OTP or None, margin=REFRESH_MARGIN):
+        self.path = path
+        self.base_url = base_url.rstrip("/")
+        self.otp = otp
+        self.margin = margin
+        self.entries = {}  # phone -> entry
+        self.http = BazaClient(self.base_url, auto_refresh=False, pool_maxsize=CONCURRENCY)
+        self.stats = {"minted": 0, "refreshed": 0, "reminted": 0, "dead": 0}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._next = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._disk = (None, {})  # (mtime_ns, phone -> entry) of the last read of the file
+
+    # -----------------------------------------------------------------------
+    # Persistence
+    # -----------------------------------------------------------------------
+    @classmethod
+    def load(cls, path=POOL_PATH, base_url=None, **kwargs):
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+        pool = cls(path, base_url or data["baseUrl"], **kwargs)
+        if pool.base_url != data["baseUrl"].rstrip("/"):
+            raise RuntimeError(f"{path} holds tokens for {data['baseUrl']}, not {pool.base_url}")
+        pool.entries = {entry["phone"]: entry for entry in data["tokens"]}
+        return pool
+
+    @contextmanager
+    def _file_lock(self):
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _read_file(self):
+        """phone -> entry as currently on disk; parsed again only when the file has changed."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if self._disk[0] != mtime:
+            with open(self.path, encoding="utf-8") as fh:
+                self._disk = (mtime, {entry["phone"]: entry for entry in json.load(fh)["tokens"]})
+        return self._disk[1]
+
+    @staticmethod
+    def _newer(entry, than):
+        """Whether ``entry`` comes from a later rotation than ``than`` (on a tie, the one marked dead)."""
+        return (entry["refreshExpires"] or 0, bool(entry.get("dead"))) > \
+            (than["refreshExpires"] or 0, bool(than.get("dead")))
+
+    def _adopt(self, phone, disk=None):
+        """Take ``phone``'s entry from the file if another process rotated it since; returns whether it did."""
+        theirs = (self._read_file() if disk is None else disk).get(phone)
+        with self._lock:
+            mine = self.entries.get(phone)
+            if theirs is None or mine is not None and not self._newer(theirs, mine):
+                return False
+            if mine is None:
+                self.entries[phone] = dict(theirs)
+            else:
+                mine.clear()  # in place: refresh() and token() may hold a reference to it
+                mine.update(theirs)
+            return True
+
+    def save(self):
+        with self._file_lock():
+            disk = self._read_file()
+            for phone in disk:
+                self._adopt(phone, disk)
+            with self._lock:
+                data = {"baseUrl": self.base_url, "savedAt": time.time(), "tokens": list(self.entries.values())}
+            tmp = f"{self.path}.tmp"
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(data, fh, indent=1)
+            os.replace(tmp, self.path)
+
+    # -----------------------------------------------------------------------
+    # Minting & refreshing
+    # -----------------------------------------------------------------------
+    def _entry_lock(self, phone):
+        with self._lock:
+            return self._locks.setdefault(phone, threading.Lock())
+
+    def mint_one(self, phone):
+        client = BazaClient(self.base_url, auto_refresh=False)
+        try:
+            access = client.login(phone, self.otp)
+            refresh, refresh_expires = refresh_cookie(client.session.cookies)
+            user_id = client.me().json().get("id")
+        finally:
+            client.close()
+        entry = {
+            "phone": phone,
+            "userId": user_id,
+            "accessToken": access,
+            "accessExpires": jwt_expiry(access) or time.time() + ACCESS_TTL,
+            "refreshToken": refresh,
+            "refreshExpires": refresh_expires,
+            "mintedAt": time.time(),
+        }
+        with self._lock:
+            self.entries[phone] = entry
+            self.stats["minted"] += 1
+        return entry
+
+    def mint(self, phones, concurrency=CONCURRENCY):
+        """Log in every phone that has no usable entry; returns the phones that failed."""
+        if not self.otp:
+            raise RuntimeError("Set OTP (or pass otp=) to mint tokens")
+        todo = [phone for phone in phones if not self.usable(self.entries.get(phone))]
+
+        def work(phone):
+            try:
+                self.mint_one(phone)
+            except Exception as e:  # one bad phone should not sink the batch
+                return phone, f"{type(e).__name__}: {e}"
+            return None
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            failed = [result for result in pool.map(work, todo) if result]
+        self.save()
+        return failed
+
+    def usable(self, entry):
+        return bool(entry and not entry.get("dead") and entry["refreshToken"]
+                    and entry["refreshExpires"] > time.time() + self.margin)
+
+    def refresh(self, phone, force=False):
+        """Rotate ``phone``'s tokens through /auth/refresh (re-minting if the refresh token is dead)."""
+        used = self.entries[phone]["accessToken"]
+        with self._entry_lock(phone):
+            self._adopt(phone)
+            entry = self.entries[phone]
+            if entry["accessToken"] != used or not force and entry["accessExpires"] - time.time() > self.margin:
+                return entry  # someone else refreshed it while we waited
+            resp = self.http.post("/auth/refresh", cookies={"baza_refresh": entry["refreshToken"] or ""})
+            refresh, refresh_expires = refresh_cookie(resp.cookies)
+            if resp.status_code == 200 and refresh:
+                access = resp.json()["accessToken"]
+                entry.update(accessToken=access, accessExpires=jwt_expiry(access) or time.time() + ACCESS_TTL,
+                             refreshToken=refresh, refreshExpires=refresh_expires, dead=False)
+                self.stats["refreshed"] += 1
+                return entry
+            if self._adopt(phone):
+                return self.entries[phone]  # another process rotated it between our read and our refresh
+            if self.otp:
+                self.stats["reminted"] += 1
+                return self.mint_one(phone)
+            entry["dead"] = True
+            self.stats["dead"] += 1
+            return entry
+
+    def refresh_due(self, concurrency=CONCURRENCY):
+        """Refresh every entry that expires within the margin; returns how many were due."""
+        due = [phone for phone, entry in list(self.entries.items())
+               if not entry.get("dead") and entry["accessExpires"] - time.time() <= self.margin]
+        if due:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(self._refresh_quietly, due))
+            self.save()
+        return len(due)
+
+    def _refresh_quietly(self, phone):
+        try:
+            self.refresh(phone)
+        except Exception as e:  # keep the background thread alive; the entry is retried next pass
+            print(f"  ⚠ refresh {phone}: {type(e).__name__}: {e}", file=sys.stderr)
+
+    # -----------------------------------------------------------------------
+    # Background refresh
+    # -----------------------------------------------------------------------
+    def start(self, interval=CHECK_INTERVAL):
+        self.refresh_due()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="token-pool", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            self.refresh_due()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.save()
+
+    # -----------------------------------------------------------------------
+    # Drawing tokens
+    # -----------------------------------------------------------------------
+    @property
+    def phones(self):
+        return [phone for phone, entry in self.entries.items() if not entry.get("dead")]
+
+    def __len__(self):
+        return len(self.phones)
+
+    def token(self, phone):
+        """``phone``'s access token; refreshed on the spot if the background thread fell behind."""
+        entry = self.entries[phone]
+        if entry["accessExpires"] <= time.time():
+            entry = self.refresh(phone)
+        return entry["accessToken"]
+
+    def draw(self):
+        """Next phone, round-robin over the live entries."""
+        phones = self.phones
+        if not phones:
+            raise RuntimeError(f"No live tokens in {self.path}; run token_pool.py mint")
+        with self._lock:
+            self._next += 1
+            return phones[(self._next - 1) % len(phones)]
+
+    def client(self, which=None, **kwargs):
+        """A PooledClient for phone ``which``, the ``which``-th live phone, or the next one drawn."""
+        if which is None:
+            phone = self.draw()
+        elif isinstance(which, int):
+            phones = self.phones
+            phone = phones[which % len(phones)]
+        else:
+            phone = which
+        return PooledClient(self, phone, **kwargs)
+
+
+def print_status(pool):
+    now = time.time()
+    entries = list(pool.entries.values())
+    dead = sum(1 for e in entries if e.get("dead"))
+    expired = sum(1 for e in entries if not e.get("dead") and e["accessExpires"] <= now)
+    expiring = sum(1 for e in entries if not e.get("dead") and 0 < e["accessExpires"] - now <= pool.margin)
+    print(f"🔑 {pool.path}: {len(entries)} tokens for {pool.base_url}")
+    print(f"   fresh {len(entries) - dead - expired - expiring}  expiring {expiring}  expired {expired}  dead {dead}")
+    live = [e for e in entries if not e.get("dead")]
+    if live:
+        soonest = min(e["accessExpires"] for e in live) - now
+        refresh_left = min(e["refreshExpires"] for e in live) - now
+        print(f"   next access expiry in {soonest:.0f}s, refresh tokens good for {refresh_left / 86400:.1f} more days")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-minted, self-refreshing auth tokens for load runs")
+    parser.add_argument("command", choices=["mint", "status", "refresh"])
+    parser.add_argument("--pool", default=POOL_PATH, help="token file (default: TOKEN_POOL or .token_pool.json)")
+    parser.add_argument("--users", type=int, default=100, help="mint: number of phones")
+    parser.add_argument("--phone-base", default="+2348100000000", help="mint: first phone number")
+    parser.add_argument("--otp", default=OTP or None, help="OTP for the test phones (default: OTP env)")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="parallel logins / refreshes")
+    parser.add_argument("--watch", action="store_true", help="refresh: keep running and refresh as tokens age")
+    args = parser.parse_args()
+
+    if args.command == "mint":
+        pool = (TokenPool.load(args.pool, BASE_URL, otp=args.otp) if os.path.exists(args.pool)
+                else TokenPool(args.pool, BASE_URL, otp=args.otp))
+        first = int(args.phone_base.lstrip("+"))
+        start = time.perf_counter()
+        failed = pool.mint([f"+{first + n}" for n in range(args.users)], args.concurrency)
+        print(f"✅ Minted {pool.stats['minted']} tokens in {time.perf_counter() - start:.1f}s "
+              f"({args.users - pool.stats['minted'] - len(failed)} already valid) → {args.pool}")
+        for phone, error in failed[:10]:
+            print(f"  ✗ {phone}: {error}")
+        print_status(pool)
+        sys.exit(1 if failed else 0)
+
+    pool = TokenPool.load(args.pool, otp=args.otp)
+    if args.command == "status":
+        print_status(pool)
+        return
+
+    print(f"🔄 Refreshed {pool.refresh_due(args.concurrency)} tokens")
+    if args.watch:
+        pool.start()
+        try:
+            while True:
+                time.sleep(60)
+                print(f"  … {pool.stats['refreshed']} refreshed, {pool.stats['reminted']} re-minted, "
+                      f"{pool.stats['dead']} dead")
+        except KeyboardInterrupt:
+            pool.stop()
+    print_status(pool)
+
+
+if __name__ == "__main__":
+    main()
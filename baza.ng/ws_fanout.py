@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+ws_fanout.py — WebSocket fan-out latency and loss for ws/orders/ and ws/products/
+=================================================================================
+
+Opens thousands of authenticated sockets (?token=<accessToken>) spread over
+many users, then triggers real changes through the API and times how long
+each broadcast takes to reach the sockets that should see it:
+
+    product event   POST /products/import-smallproducts with one restock row
+                    → product_created on every ws/products/ socket
+    order event     POST /orders/create (paystack, so no balance is needed)
+                    → order_created on the owner's ws/orders/ sockets
+
+Every trigger carries a marker (the product id / the order note), so a
+message is matched to its trigger no matter what else is on the channel.
+The report gives, per event kind, the latency from trigger to the first and
+to the last socket, every single delivery, the API write itself, and the
+share of expected deliveries that never arrived. Channels drops messages
+for a consumer whose queue is full (channels_redis capacity, 100 by
+default), so loss climbs once sockets read slower than events arrive.
+
+Usage:
+    python mock_api.py --port 8000
+    python ws_fanout.py --sockets 2000 --users 200 --events 50
+    python ws_fanout.py --sockets 5000 --token-pool .token_pool.json --channel products --interval 0.05
+    BASE_URL=https://baza-chi.vercel.app OTP=111111 python ws_fanout.py --sockets 500 --users 50
+
+The socket URL is BASE_URL with http(s) swapped for ws(s); --ws-url
+overrides it. The "WS bench" marker products are delisted (quantityInStock 0)
+once the sockets are closed; --keep leaves them listed. Needs the websockets
+package (pip install websockets).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+from baza_client import BASE_URL, BazaClient
+from loadstats import LatencyRecorder
+from token_pool import TokenPool
+
+ACCESS_TOKEN = os.getenv("ACCESS_TOKEN", "")  # product imports run as this user if set
+OTP = os.getenv("OTP", "1111")
+PHONE_BASE = os.getenv("WS_PHONE_BASE", "+2348300000000")
+CONNECT_CONCURRENCY = 200
+CHANNELS = {"orders": "/ws/orders/", "products": "/ws/products/"}
+
+
+def raise_fd_limit(sockets):
+    """Every socket is a file descriptor; lift the soft limit as far as the hard one allows."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = sockets + 256
+    if soft < wanted:
+        target = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        soft = target
+    if soft < wanted:
+        print(f"⚠️  File descriptor limit is {soft:,}; expect connect failures past that (ulimit -n)")
+
+
+# ---------------------------------------------------------------------------
+# Users
+# ---------------------------------------------------------------------------
+def login_users(base_url, count, phone_base, otp):
+    """OTP-login ``count`` users from ``phone_base`` upwards; returns [(phone, client)]."""
+    def login(index):
+        phone = f"+{int(phone_base.lstrip('+')) + index}"
+        client = BazaClient(base_url)
+        client.login(phone, otp)
+        return phone, client
+
+    with ThreadPoolExecutor(max_workers=min(32, count)) as pool:
+        return list(pool.map(login, range(count)))
+
+
+def pool_users(pool, count):
+    phones = pool.phones[:count]
+    return [(phone, pool.client(phone)) for phone in phones]
+
+
+# ---------------------------------------------------------------------------
+# Sockets
+# ---------------------------------------------------------------------------
+class Fanout:
+    def __init__(self, ws_url, prefix):
+        self.ws_url = ws_url.rstrip("/")
+        self.prefix = prefix
+        self.recorder = LatencyRecorder()
+        self.sockets = []  # (channel, phone, websocket)
+        self.by_user = {}  # phone -> number of ws/orders/ sockets
+        self.received = {}  # marker -> [perf_counter of each delivery]
+        self.sent = {}  # marker -> (kind, perf_counter before the write, expected deliveries)
+        self.failed_connects = []
+        self.dropped = 0
+        self.readers = []
+
+    async def open(self, channel, phone, token, slots):
+        async with slots:
+            start = time.perf_counter()
+            try:
+                ws = await connect(f"{self.ws_url}{CHANNELS[channel]}?token={token}", open_timeout=30,
+                                   max_queue=None, ping_interval=None)
+                hello = json.loads(await asyncio.wait_for(ws.recv(), 30))
+            except (OSError, asyncio.TimeoutError, ConnectionClosed, ValueError) as e:
+                self.recorder.record(f"connect {CHANNELS[channel]}", time.perf_counter() - start, ok=False)
+                self.failed_connects.append(f"{type(e).__name__}: {e}")
+                return
+            self.recorder.record(f"connect {CHANNELS[channel]}", time.perf_counter() - start,
+                                 ok=hello.get("type") == "connected")
+        self.sockets.append((channel, phone, ws))
+        if channel == "orders":
+            self.by_user[phone] = self.by_user.get(phone, 0) + 1
+        self.readers.append(asyncio.create_task(self.read(ws)))
+
+    async def read(self, ws):
+        try:
+            async for raw in ws:
+                now = time.perf_counter()
+                message = json.loads(raw)
+                marker = (message.get("product") or {}).get("id") or (message.get("order") or {}).get("note")
+                if isinstance(marker, str) and marker.startswith(self.prefix):
+                    self.received.setdefault(marker, []).append(now)
+        except ConnectionClosed:
+            self.dropped += 1
+
+    def product_sockets(self):
+        return sum(1 for channel, _, _ in self.sockets if channel == "products")
+
+    def trigger_product(self, admin, marker):
+        start = time.perf_counter()
+        self.sent[marker] = ("product", start, self.product_sockets())
+        resp = admin.import_products([bench_row(marker)])
+        self.recorder.record("write POST /products/import-smallproducts", time.perf_counter() - start,
+                             ok=resp.ok)
+        return resp.ok
+
+    def trigger_order(self, phone, client, marker):
+        start = time.perf_counter()
+        self.sent[marker] = ("order", start, self.by_user.get(phone, 0))
+        resp = client.create_order([{"name": "WS bench", "emoji": "📡", "qty": 1, "unitPrice": 100,
+                                     "totalPrice": 100}], 100, paymentMethod="paystack", note=marker)
+        self.recorder.record("write POST /orders/create", time.perf_counter() - start, ok=resp.ok)
+        return resp.ok
+
+    def latencies(self):
+        """Fan-out samples and {kind: [expected, received]} from what the readers saw."""
+        delivery = {"order": [0, 0], "product": [0, 0]}
+        for marker, (kind, start, expected) in self.sent.items():
+            times = sorted(self.received.get(marker, []))
+            delivery[kind][0] += expected
+            delivery[kind][1] += min(len(times), expected)
+            if not times:
+                continue
+            self.recorder.record(f"{kind}: first socket", times[0] - start)
+            self.recorder.record(f"{kind}: last socket", times[-1] - start, ok=len(times) >= expected)
+            for received in times:
+                self.recorder.record(f"{kind}: every delivery", received - start)
+        return delivery
+
+
+def bench_row(marker, in_stock=True):
+    return {"id": marker, "name": f"WS bench {marker[-6:]}", "emoji": "📡", "price": 100,
+            "unit": "1 pc", "category": "Bench", "quantityInStock": 1 if in_stock else 0}
+
+
+async def run(args, users, admin):
+    raise_fd_limit(args.sockets)
+    fanout = Fanout(args.ws_url, f"ws-bench-{uuid.uuid4().hex[:8]}-")
+    channels = ["orders", "products"] if args.channel == "both" else [args.channel]
+
+    def owner(n):
+        # Independent of the channel index, so every user gets sockets on every channel.
+        return users[(n // len(channels)) % len(users)]
+
+    print(f"🔌 Opening {args.sockets:,} sockets on {fanout.ws_url} ({', '.join(channels)}) for {len(users):,} users")
+    slots = asyncio.Semaphore(CONNECT_CONCURRENCY)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        fanout.open(channels[n % len(channels)], owner(n)[0],
+                    owner(n)[1].headers()["Authorization"].split()[-1], slots)
+        for n in range(args.sockets)))
+    opened = time.perf_counter() - start
+    print(f"  ✅ {len(fanout.sockets):,} open in {opened:.1f}s ({len(fanout.sockets) / opened:,.0f}/s), "
+          f"{len(fanout.failed_connects):,} failed")
+    if not fanout.sockets:
+        return fanout, opened
+
+    kinds = [kind for kind, channel in (("product", "products"), ("order", "orders")) if channel in channels]
+    # Only users holding ws/orders/ sockets make order events worth timing.
+    listeners = [(phone, client) for phone, client in users if fanout.by_user.get(phone)]
+    if "order" in kinds and not listeners:
+        kinds.remove("order")
+        print("  ⚠️  No ws/orders/ socket opened; skipping order events")
+    if not kinds:
+        return fanout, opened
+    print(f"📣 Triggering {args.events} events ({' + '.join(kinds)}), one every {args.interval:g}s")
+    writes = []
+    for n in range(args.events):
+        kind = kinds[n % len(kinds)]
+        marker = f"{fanout.prefix}{n:06d}"
+        if kind == "product":
+            write = asyncio.to_thread(fanout.trigger_product, admin, marker)
+        else:
+            phone, client = random.choice(listeners)
+            write = asyncio.to_thread(fanout.trigger_order, phone, client, marker)
+        writes.append(asyncio.create_task(write))  # writes overlap; the trigger pace stays fixed
+        await asyncio.sleep(args.interval)
+    failed_writes = (await asyncio.gather(*writes)).count(False)
+    if failed_writes:
+        print(f"  ⚠️  {failed_writes} trigger writes failed")
+
+    await asyncio.sleep(args.drain)
+    for _, _, ws in fanout.sockets:
+        await ws.close()
+    await asyncio.gather(*fanout.readers)
+
+    # After the sockets close, so the delisting broadcasts are not counted as deliveries.
+    markers = [marker for marker, (kind, _, _) in fanout.sent.items() if kind == "product"]
+    if markers and not args.keep:
+        resp = await asyncio.to_thread(admin.import_products, [bench_row(m, in_stock=False) for m in markers])
+        if resp.ok:
+            print(f"🧹 Delisted {len(markers)} WS bench marker products")
+        else:
+            print(f"  ⚠️  Delisting the WS bench marker products failed: {resp.status_code}")
+    return fanout, opened
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket fan-out latency and message loss")
+    parser.add_argument("--sockets", type=int, default=1000, help="sockets to hold open")
+    parser.add_argument("--users", type=int, default=100, help="users the sockets are spread over")
+    parser.add_argument("--channel", choices=["orders", "products", "both"], default="both")
+    parser.add_argument("--events", type=int, default=40, help="changes to trigger")
+    parser.add_argument("--interval", type=float, default=0.25, help="seconds between triggers")
+    parser.add_argument("--drain", type=float, default=3, help="seconds to wait for stragglers afterwards")
+    parser.add_argument("--phone-base", default=PHONE_BASE, help="first test phone (OTP logins)")
+    parser.add_argument("--token-pool", metavar="PATH", help="take users from a token_pool.py file instead")
+    parser.add_argument("--ws-url", help="socket base URL (default: BASE_URL with ws:// or wss://)")
+    parser.add_argument("--keep", action="store_true", help="leave the marker products listed afterwards")
+    args = parser.parse_args()
+    args.ws_url = args.ws_url or BASE_URL.replace("http", "ws", 1)
+
+    if args.token_pool:
+        pool = TokenPool.load(args.token_pool)
+        users = pool_users(pool, args.users)
+    else:
+        print(f"🔐 Logging in {args.users} users from {args.phone_base}")
+        users = login_users(BASE_URL, args.users, args.phone_base, OTP)
+    if not users:
+        sys.exit("No users to open sockets for.")
+    admin = BazaClient(BASE_URL, token=ACCESS_TOKEN) if ACCESS_TOKEN else users[0][1]
+
+    start = time.perf_counter()
+    fanout, opened = asyncio.run(run(args, users, admin))
+    delivery = fanout.latencies()
+    fanout.recorder.print_report(time.perf_counter() - start, title="WebSocket connect, write and fan-out latency")
+
+    print(f"\n  Sockets: {len(fanout.sockets):,} open, {len(fanout.failed_connects):,} failed to connect, "
+          f"{fanout.dropped:,} closed by the server mid-run")
+    for kind, (expected, received) in delivery.items():
+        if expected:
+            loss = (expected - received) / expected * 100
+            print(f"  {'❌' if loss else '✅'} {kind} events: {received:,}/{expected:,} deliveries, {loss:.2f}% lost")
+    for error in fanout.failed_connects[:5]:
+        print(f"    - {error}")
+    if fanout.failed_connects or any(expected > received for expected, received in delivery.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()